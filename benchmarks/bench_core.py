@@ -0,0 +1,202 @@
+"""
+Бенчмарки ядра: генерация, сохранение/загрузка БД, CSV, потоковая генерация.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_core --sizes 100 1000 10000
+    python -m benchmarks.bench_core --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_core --baseline benchmarks/baseline.json --tolerance 0.2
+
+Каждый размер каталога прогоняется в отдельном процессе на своей временной
+БД, поэтому пиковый RSS относится только к этому размеру. Потоковая генерация
+(core.pipeline) идёт в ещё одном процессе: её пиковый RSS не должен расти
+с размером — это и есть проверка постоянной памяти.
+Результат — JSON (пропускная способность, p50/p99, пиковый RSS).
+При сравнении с базовой линией код выхода 1, если что-то стало хуже
+больше чем на tolerance; метрики, которых нет в одном из прогонов, не
+сравниваются и перечисляются отдельно.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core import pipeline
+from core.generator import SystemManager
+
+try:
+    import resource  # только Unix
+except ImportError:
+    resource = None
+
+
+def _peak_rss_mb():
+    """Пиковый RSS процесса в МБ с его запуска (None, если недоступно)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт КБ, macOS — байты
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    idx = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def _timed(fn, count):
+    """Вызывает fn(i) count раз; возвращает метрики по задержкам."""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    return {
+        "ops": count,
+        "total_s": round(total, 4),
+        "throughput_per_s": round(count / total, 1) if total else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_size(size, csv_ops, load_repeats):
+    """Все сценарии на каталоге из size систем."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SystemManager(db_file=os.path.join(tmp, "bench.sqlite"))
+
+        # generate_random_system (включает сохранение в БД)
+        results["generate_random_system"] = _timed(lambda i: manager.generate_random_system(), size)
+
+        # save_system_to_db — пересохранение уже сгенерированных систем
+        systems = list(manager.systems)
+        results["save_system_to_db"] = _timed(
+            lambda i: manager.save_system_to_db(systems[i % len(systems)]), size
+        )
+
+        # load_all_systems_from_db — весь каталог за одну операцию
+        res = _timed(lambda i: manager.load_all_systems_from_db(), load_repeats)
+        res["systems_per_s"] = round(size * res["throughput_per_s"], 1) if res["throughput_per_s"] else None
+        results["load_all_systems_from_db"] = res
+
+        # CSV: сохранение + загрузка (загрузка тоже пишет систему в БД)
+        csv_path = os.path.join(tmp, "system.csv")
+
+        def round_trip(i):
+            manager.save_system_to_csv(csv_path, systems[i % len(systems)])
+            manager.load_system_from_csv(csv_path)
+
+        results["csv_round_trip"] = _timed(round_trip, min(size, csv_ops))
+    return results
+
+
+def run_pipeline(size):
+    """Потоковая генерация size систем в БД и JSON Lines, как python -m core.pipeline --db --jsonl."""
+    with tempfile.TemporaryDirectory() as tmp:
+        sinks = [pipeline.SqliteSink(os.path.join(tmp, "stream.sqlite"), replace=False),
+                 pipeline.JsonLinesSink(os.path.join(tmp, "stream.jsonl"))]
+        start = time.perf_counter()
+        total = pipeline.run(pipeline.random_systems(size), sinks)
+        elapsed = time.perf_counter() - start
+    return {
+        "ops": total,
+        "total_s": round(elapsed, 4),
+        "throughput_per_s": round(total / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _isolated(fn, *args):
+    """fn(*args) в новом процессе (spawn): пиковый RSS не копится между замерами."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def compare(current, baseline, tolerance):
+    """
+    (регрессии, пропущенные метрики) относительно базовой линии.
+    Метрика, которой нет (или она None) в одном из прогонов, не сравнивается.
+    """
+    regressions, missing = [], []
+    for size, benches in current["results"].items():
+        for name, cur in benches.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base:
+                missing.append(f"{size}/{name}: нет в базовой линии")
+                continue
+            for metric in ("throughput_per_s", "p99_ms"):
+                if metric not in cur and metric not in base:
+                    continue
+                value, expected = cur.get(metric), base.get(metric)
+                if value is None or expected is None:
+                    where = "текущем прогоне" if value is None else "базовой линии"
+                    missing.append(f"{size}/{name}: нет {metric} в {where}")
+                elif not expected:
+                    continue
+                elif metric == "throughput_per_s" and value < expected * (1 - tolerance):
+                    regressions.append(f"{size}/{name}: throughput {value} < {expected}")
+                elif metric == "p99_ms" and value > expected * (1 + tolerance):
+                    regressions.append(f"{size}/{name}: p99 {value} ms > {expected} ms")
+    return regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки ядра Star System Generator")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="размеры каталога (число систем), до 1000000")
+    parser.add_argument("--csv-ops", type=int, default=1000, help="максимум CSV-операций на размер")
+    parser.add_argument("--load-repeats", type=int, default=3, help="повторов полной загрузки из БД")
+    parser.add_argument("--output", help="куда записать JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON базовой линии для сравнения")
+    parser.add_argument("--save-baseline", help="сохранить результат как базовую линию")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение (доля)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = _isolated(run_size, size, args.csv_ops, args.load_repeats)
+        results[str(size)]["pipeline"] = _isolated(run_pipeline, size)
+        print(f"[INFO] Размер {size}: готово", file=sys.stderr)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, missing = compare(report, baseline, args.tolerance)
+        for m in missing:
+            print(f"[SKIP] {m}", file=sys.stderr)
+        for r in regressions:
+            print(f"[REGRESSION] {r}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
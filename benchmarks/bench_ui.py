@@ -0,0 +1,206 @@
+"""
+Отзывчивость интерфейса: сценарий, который управляет MainWindow без экрана.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_ui --sizes 100 1000 5000
+    python -m benchmarks.bench_ui --save-baseline benchmarks/ui_baseline.json
+    python -m benchmarks.bench_ui --baseline benchmarks/ui_baseline.json --tolerance 0.3
+
+Окно работает на временной БД. Каталог растёт до каждого размера из --sizes
+(системы добавляются кнопкой «Сгенерировать систему»), и на каждом размере
+замеряются действия пользователя: генерация, переключение систем, открытие
+карточки планеты, импорт CSV, просмотр БД — и время кадра SystemView.
+
+Задержка действия — от вызова обработчика до момента, когда окно снова готово:
+обработчик вернулся и очередь событий (включая перерисовку) обработана, либо
+появился модальный диалог (его содержимое уже посчитано). Диалоги закрываются
+автоматически. Отчёт и сравнение с базовой линией — как в bench_core.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QTimer, qInstallMessageHandler
+from PyQt6.QtWidgets import QApplication
+
+from benchmarks.bench_core import _peak_rss_mb, _percentile, compare
+from core.generator import SystemManager
+from ui.main_window import MainWindow
+
+
+def _qt_message(mode, context, message):
+    # offscreen-плагин предупреждает об этом на каждом диалоге
+    if "propagateSizeHints" not in message:
+        print(message, file=sys.stderr)
+
+
+def _stats(latencies):
+    """Метрики по задержкам (секунды) в формате bench_core."""
+    return {
+        "ops": len(latencies),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+class Driver:
+    """Вызывает действия окна и меряет их задержку; модальные диалоги закрывает сам."""
+
+    def __init__(self, app):
+        self.app = app
+        self._modal_at = None
+        # срабатывает и внутри exec() модального диалога
+        self._watcher = QTimer()
+        self._watcher.setInterval(1)
+        self._watcher.timeout.connect(self._dismiss_modal)
+        self._watcher.start()
+
+    def _dismiss_modal(self):
+        modal = QApplication.activeModalWidget()
+        if modal is not None:
+            if self._modal_at is None:
+                self._modal_at = time.perf_counter()
+            modal.close()
+
+    def run(self, action, *args):
+        """Задержка action(*args), с."""
+        self._modal_at = None
+        t0 = time.perf_counter()
+        action(*args)
+        if self._modal_at is None:
+            self.app.processEvents()
+        end = self._modal_at if self._modal_at is not None else time.perf_counter()
+        # диалог и то, что он оставил в очереди, не должны попасть в следующий замер
+        self.app.processEvents()
+        return end - t0
+
+    def measure(self, action, args_list):
+        return _stats([self.run(action, *args) for args in args_list])
+
+
+def make_csv_files(directory, count):
+    """count CSV-файлов с новыми системами (генерируются на отдельной БД)."""
+    scratch = SystemManager(db_file=os.path.join(directory, "scratch.sqlite"), preload=False)
+    paths = []
+    for i in range(count):
+        system = scratch.generate_random_system()
+        path = os.path.join(directory, f"import_{i}.csv")
+        scratch.save_system_to_csv(path, system)
+        paths.append(path)
+    return paths
+
+
+def frame_times(window, count):
+    """Время отрисовки кадра SystemView (синхронный repaint), с."""
+    view = window.system_view
+    times = []
+    for _ in range(count):
+        view.tick()
+        t0 = time.perf_counter()
+        view.repaint()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def run_scenario(sizes, ops, frames, browse_db_limit, seed=0):
+    """Все действия на каждом размере каталога; {размер: {действие: метрики}}."""
+    rng = random.Random(seed)
+    qInstallMessageHandler(_qt_message)
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        window = MainWindow(db_file=os.path.join(tmp, "bench_ui.sqlite"))
+        window.maintenance.stop()  # фоновое обслуживание БД не должно попадать в замеры
+        window.show()
+        driver = Driver(app)
+        csv_files = iter(make_csv_files(tmp, ops * len(sizes)))
+
+        generated = []
+        for size in sorted(sizes):
+            # рост каталога до size: каждая система — нажатие «Сгенерировать систему»
+            while len(window.manager.systems) < size:
+                generated.append(driver.run(window.on_generate))
+            res = {"generate": _stats(generated[-ops:])}
+
+            # запас пополняется в фоне — остальные замеры без него, чтобы не ловить его шум
+            with window.pool.paused():
+                count = len(window.manager.systems)
+                res["switch_system"] = driver.measure(window.switch_system,
+                                                      [(rng.randrange(count),) for _ in range(ops)])
+
+                latencies = []
+                for _ in range(ops):
+                    window.switch_system(rng.randrange(count))
+                    planets = window.manager.system.planets
+                    if planets:
+                        latencies.append(driver.run(window.show_planet_info, rng.randrange(len(planets))))
+                        driver.run(window.back_to_system)
+                res["open_planet_info"] = _stats(latencies)
+
+                res["import_csv"] = driver.measure(window.import_csv, [(next(csv_files),) for _ in range(ops)])
+                res["paint_frame"] = _stats(frame_times(window, frames))
+                if size <= browse_db_limit:
+                    res["browse_db"] = driver.measure(window.show_database_contents, [()] * max(1, ops // 10))
+
+            results[str(size)] = res
+            print(f"[INFO] Размер {size}: готово", file=sys.stderr)
+        window.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Задержки интерфейса Star System Generator (offscreen)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000],
+                        help="размеры каталога (число систем), на которых делаются замеры")
+    parser.add_argument("--ops", type=int, default=30, help="повторов каждого действия на размер")
+    parser.add_argument("--frames", type=int, default=200, help="кадров SystemView на размер")
+    parser.add_argument("--browse-db-limit", type=int, default=2000,
+                        help="до какого размера открывать просмотр БД (он показывает все строки)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="куда записать JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON базовой линии для сравнения")
+    parser.add_argument("--save-baseline", help="сохранить результат как базовую линию")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="допустимое ухудшение (доля)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "qt_platform": os.environ["QT_QPA_PLATFORM"],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": run_scenario(args.sizes, args.ops, args.frames, args.browse_db_limit, args.seed),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, missing = compare(report, baseline, args.tolerance)
+        for m in missing:
+            print(f"[SKIP] {m}", file=sys.stderr)
+        for r in regressions:
+            print(f"[REGRESSION] {r}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
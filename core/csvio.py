@@ -0,0 +1,123 @@
+"""
+CSV-формат одной системы (разделитель ';', UTF-8 с BOM).
+
+Первые пять строк — поля системы «ключ;значение», шестая — заголовок,
+дальше по строке на планету.
+"""
+import csv
+import logging
+import re
+from core.planet import Planet
+from core.system import StarSystem
+
+log = logging.getLogger(__name__)
+
+PLANET_HEADER = [
+    "#PlanetName", "Temperature_C", "Size_Earth", "Mass_Earth",
+    "Orbital_Radius_AU", "Orbital_Period_Days", "Planet_Type",
+    "Atmosphere", "Life_Probability", "Satellites",
+    "Sat_Names", "Image_Path", "Description"
+]
+
+
+def csv_file_name(system_name):
+    """Имя файла для системы: всё, кроме букв, цифр и '-', заменяется на '_'."""
+    return re.sub(r"[^\w\-]+", "_", system_name).strip("_") + ".csv"
+
+
+def write_csv(path, system):
+    """Записывает систему в CSV-файл."""
+    with open(path, "w", encoding="utf-8-sig", newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+
+        # данные о системе
+        writer.writerow(["SystemName", system.name])
+        writer.writerow(["StarName", system.star_name])
+        writer.writerow(["StarType", system.star_type])
+        writer.writerow(["StarTempK", system.star_temperature_k])
+        writer.writerow(["StarRadiusSolar", system.star_radius_solar])
+        writer.writerow(PLANET_HEADER)
+
+        # планеты
+        for pl in system.planets:
+            writer.writerow([
+                pl.name,
+                round(pl.temperature_c, 2),
+                round(pl.size_earth, 2),
+                round(pl.mass_earth, 2),
+                round(pl.orbital_radius_au, 3),
+                round(pl.orbital_period_days, 1),
+                pl.planet_type,
+                pl.atmosphere,
+                round(pl.life_probability, 2),
+                int(pl.satellites),
+                pl.image_path or "",
+                pl.description or ""
+            ])
+
+
+def read_csv(path, strict=False):
+    """
+    Читает систему из CSV-файла. Битые строки планет пропускаются с предупреждением,
+    а при strict=True — вызывают ValueError.
+    """
+    with open(path, "r", encoding="utf-8-sig") as f:
+        reader = csv.reader(f, delimiter=';')
+        rows = [r for r in reader if r]
+
+    if len(rows) < 6:
+        raise ValueError("CSV-файл не содержит достаточных данных.")
+
+    sys_name = rows[0][1] if len(rows[0]) > 1 else "Безымянная система"
+    star_name = rows[1][1] if len(rows[1]) > 1 else "Звезда"
+    star_type = rows[2][1] if len(rows[2]) > 1 else "Неизвестный тип"
+    star_temp = float(rows[3][1]) if len(rows[3]) > 1 else 5778.0
+    star_radius = float(rows[4][1]) if len(rows[4]) > 1 else 1.0
+
+    planets = []
+    for r in rows[6:]:
+        if not r or len(r) < 10:
+            if strict:
+                raise ValueError(f"Неполная строка планеты: {r}")
+            continue
+        try:
+            name = r[0]
+            temp = float(r[1])
+            size = float(r[2])
+            mass = float(r[3])
+            orbit = float(r[4])
+            period = float(r[5])
+            ptype = r[6]
+            atm = r[7]
+            life = float(r[8])
+            sats = int(float(r[9]))
+            img = r[10] if len(r) > 10 and r[10] else ""
+            desc = r[11] if len(r) > 11 else ""
+            pl = Planet(
+                name=name,
+                temperature_c=temp,
+                size_earth=size,
+                mass_earth=mass,
+                orbital_radius_au=orbit,
+                orbital_period_days=period,
+                planet_type=ptype,
+                atmosphere=atm,
+                life_probability=life,
+                satellites=sats,
+                image_path=img,
+                description=desc
+            )
+            planets.append(pl)
+        except Exception as e:
+            if strict:
+                raise ValueError(f"Некорректная строка планеты ({e}): {r}")
+            log.warning(f"Пропуск строки CSV ({e}): {r}")
+
+    return StarSystem(
+        name=sys_name,
+        star_name=star_name,
+        star_type=star_type,
+        star_temperature_k=star_temp,
+        star_radius_solar=star_radius,
+        planets=planets
+    )
@@ -1,47 +1,717 @@
+import logging
 import sqlite3
+from core.procedural import SeededSystem
 
 DB_FILE = "data/systems.sqlite"
 
-def get_connection():
-    return sqlite3.connect(DB_FILE)
+log = logging.getLogger(__name__)
 
-def init_db():
-    """Создаёт таблицы, если их ещё нет."""
-    conn = get_connection()
-    cur = conn.cursor()
+# Версия схемы (PRAGMA user_version):
+#   1 (или 0) — таблицы systems / planets со строками в каждой записи;
+#   2 — компактная схема: целые ключи систем, справочники для категорий,
+#       описания как шаблон + поля планеты. systems / planets остались
+#       представлениями с прежними колонками, поэтому чтение не изменилось.
+SCHEMA_VERSION = 2
 
-    # Таблица систем
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS systems (
+# Справочники: таблица -> колонка значения
+LOOKUPS = {
+    "star_types": "name",
+    "planet_types": "name",
+    "atmospheres": "name",
+    "images": "path",
+}
+
+# Плейсхолдеры в шаблонах описаний (подставляются поля самой планеты)
+TEMPLATE_TEMPERATURE = "{t}"
+TEMPLATE_ATMOSPHERE = "{a}"
+
+
+class NameTaken(sqlite3.IntegrityError):
+    """Имя новой системы уже есть в базе (например, его выдал аллокатор другого процесса)."""
+
+    def __init__(self, name):
+        super().__init__(f"Система с именем '{name}' уже есть в базе.")
+        self.name = name
+
+
+def _render_description(row, atmosphere):
+    """SQL-выражение описания по шаблону (row — псевдоним строки planet_data)."""
+    return (f"CASE WHEN d.params THEN replace(replace(d.template, '{TEMPLATE_TEMPERATURE}', {row}.temperature_c), "
+            f"'{TEMPLATE_ATMOSPHERE}', {atmosphere}) ELSE d.template END")
+
+
+TABLES = [
+    *(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, {column} TEXT UNIQUE)"
+      for table, column in LOOKUPS.items()),
+    """
+        CREATE TABLE IF NOT EXISTS description_templates (
+            id INTEGER PRIMARY KEY,
+            template TEXT,
+            params INTEGER,
+            UNIQUE (template, params)
+        )
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS system_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT UNIQUE,
             star_name TEXT,
-            star_type TEXT,
+            star_type_id INTEGER NOT NULL,
             star_temperature REAL,
             star_radius REAL,
             planet_count INTEGER
         )
-    """)
-
-    # Таблица планет
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS planets (
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS planet_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            system_name TEXT,
+            system_id INTEGER NOT NULL,
             name TEXT,
             temperature_c REAL,
             size_earth REAL,
             mass_earth REAL,
             orbital_radius_au REAL,
             orbital_period_days REAL,
-            planet_type TEXT,
-            atmosphere TEXT,
+            type_id INTEGER NOT NULL,
+            atmosphere_id INTEGER NOT NULL,
             life_probability REAL,
             satellites INTEGER,
-            image_path TEXT,
-            description TEXT
+            image_id INTEGER NOT NULL,
+            description_id INTEGER NOT NULL
         )
-    """)
+    """,
+    # прежние таблицы — теперь представления с теми же колонками
+    """
+        CREATE VIEW IF NOT EXISTS systems AS
+        SELECT s.id, s.name, s.star_name, t.name AS star_type, s.star_temperature, s.star_radius, s.planet_count
+        FROM system_data s JOIN star_types t ON t.id = s.star_type_id
+    """,
+    f"""
+        CREATE VIEW IF NOT EXISTS planets AS
+        SELECT p.id, s.name AS system_name, p.name, p.temperature_c, p.size_earth, p.mass_earth,
+               p.orbital_radius_au, p.orbital_period_days, t.name AS planet_type, a.name AS atmosphere,
+               p.life_probability, p.satellites, i.path AS image_path,
+               {_render_description("p", "a.name")} AS description
+        FROM planet_data p
+        JOIN system_data s ON s.id = p.system_id
+        JOIN planet_types t ON t.id = p.type_id
+        JOIN atmospheres a ON a.id = p.atmosphere_id
+        JOIN images i ON i.id = p.image_id
+        JOIN description_templates d ON d.id = p.description_id
+    """,
+    # Процедурные системы: хранится только (версия генератора, seed)
+    """
+        CREATE TABLE IF NOT EXISTS seeded_systems (
+            name TEXT PRIMARY KEY,
+            generator_version INTEGER,
+            seed INTEGER
+        )
+    """,
+    # Правки пользователя поверх сгенерированных планет (например, image_path)
+    """
+        CREATE TABLE IF NOT EXISTS planet_overrides (
+            system_name TEXT,
+            planet_index INTEGER,
+            field TEXT,
+            value TEXT,
+            PRIMARY KEY (system_name, planet_index, field)
+        )
+    """,
+]
+
+# Индексы под типовые запросы (core.query): фильтры по диапазонам и категориям
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_planets_system ON planet_data (system_id)",
+    "CREATE INDEX IF NOT EXISTS idx_planets_type_life ON planet_data (type_id, life_probability)",
+    "CREATE INDEX IF NOT EXISTS idx_planets_atm_life ON planet_data (atmosphere_id, life_probability)",
+    "CREATE INDEX IF NOT EXISTS idx_planets_life ON planet_data (life_probability)",
+    "CREATE INDEX IF NOT EXISTS idx_planets_temp ON planet_data (temperature_c)",
+    "CREATE INDEX IF NOT EXISTS idx_planets_orbit ON planet_data (orbital_radius_au)",
+    "CREATE INDEX IF NOT EXISTS idx_systems_star_temp ON system_data (star_temperature)",
+    "CREATE INDEX IF NOT EXISTS idx_systems_star_type ON system_data (star_type_id)",
+]
+
+# Агрегаты одной или всех систем (для пересчёта system_stats)
+STATS_SELECT = """
+    SELECT s.name, count(*), sum(p.temperature_c), min(p.temperature_c), max(p.temperature_c),
+           max(p.life_probability), sum(p.satellites), sum(p.mass_earth)
+    FROM planet_data p JOIN system_data s ON s.id = p.system_id
+    WHERE {where} GROUP BY p.system_id
+"""
+
+
+def get_connection(db_file=None):
+    return sqlite3.connect(db_file or DB_FILE)
+
+
+def schema_version(cur):
+    """Версия схемы открытой базы (пустая база — текущая версия)."""
+    version = cur.execute("PRAGMA user_version").fetchone()[0]
+    if version:
+        return version
+    legacy = cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'planets'").fetchone()
+    return 1 if legacy else SCHEMA_VERSION
+
+
+def init_db(db_file=None):
+    """Создаёт таблицы, если их ещё нет; базу старой схемы переводит на текущую."""
+    conn = get_connection(db_file)
+    cur = conn.cursor()
+
+    if schema_version(cur) < SCHEMA_VERSION:
+        migrate(conn)
+        conn.close()
+        return
+
+    # новый файл: освобождённые страницы можно возвращать без полного VACUUM (core.maintenance)
+    if cur.execute("PRAGMA page_count").fetchone()[0] == 0:
+        cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    for sql in TABLES:
+        cur.execute(sql)
+    _init_derived(cur)
+    cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
     conn.commit()
     conn.close()
+
+
+def _init_derived(cur):
+    """
+    Индексы, сводная статистика, полнотекстовый индекс и индекс признаков
+    (заполняются, если создаются впервые).
+    """
+    for sql in INDEXES:
+        cur.execute(sql)
+
+    _init_stats(cur)
+
+    try:
+        _init_fts(cur)
+    except sqlite3.OperationalError as e:
+        # сборка SQLite без FTS5 — полнотекстовый поиск будет недоступен
+        log.warning(f"FTS5 недоступен: {e}")
+
+    try:
+        _init_features(cur)
+    except sqlite3.OperationalError as e:
+        # сборка SQLite без R*Tree — поиск похожих пойдёт полным просмотром
+        log.warning(f"R*Tree недоступен: {e}")
+
+
+# Триггеры производных данных (статистика, FTS, признаки). Массовые операции снимают их
+# на время своей транзакции и обновляют производные данные целыми множествами строк.
+DERIVED_TRIGGERS = (
+    "planets_fts_insert", "planets_fts_delete", "planets_fts_update",
+    "planets_stats_insert", "planets_stats_delete", "planets_stats_update",
+    "planets_features_insert", "planets_features_delete", "planets_features_update",
+    "systems_features_insert", "systems_features_update", "systems_features_delete",
+)
+
+
+def drop_derived_triggers(cur):
+    """Снимает триггеры статистики, FTS и признаков (вызывать внутри транзакции массовой операции)."""
+    for name in DERIVED_TRIGGERS:
+        cur.execute(f"DROP TRIGGER IF EXISTS main.{name}")
+
+
+def delete_systems_bulk(cur, names):
+    """
+    Удаляет системы, имена которых выдаёт подзапрос names, вместе с их статистикой,
+    записями FTS и признаками. Триггеры должны быть сняты (drop_derived_triggers).
+    """
+    ids = f"SELECT id FROM main.system_data WHERE name IN ({names})"
+    if has_fts(cur):
+        cur.execute(f"""
+            INSERT INTO main.planets_fts (planets_fts, rowid, description)
+            SELECT 'delete', id, description FROM main.planets
+            WHERE id IN (SELECT id FROM main.planet_data WHERE system_id IN ({ids}))
+        """)
+    if has_features(cur):
+        cur.execute(f"""
+            DELETE FROM main.planet_features
+            WHERE id IN (SELECT id FROM main.planet_data WHERE system_id IN ({ids}))
+        """)
+        cur.execute(f"DELETE FROM main.system_features WHERE id IN ({ids})")
+    cur.execute(f"DELETE FROM main.system_stats WHERE system_name IN ({names})")
+    cur.execute(f"DELETE FROM main.system_type_stats WHERE system_id IN ({ids})")
+    cur.execute(f"DELETE FROM main.planet_data WHERE system_id IN ({ids})")
+    cur.execute(f"DELETE FROM main.system_data WHERE name IN ({names})")
+    cur.execute(f"DELETE FROM main.seeded_systems WHERE name IN ({names})")
+    cur.execute(f"DELETE FROM main.planet_overrides WHERE system_name IN ({names})")
+
+
+def restore_derived(cur, after_system_id, after_planet_id):
+    """
+    Досчитывает статистику, FTS и признаки для систем и планет, добавленных при снятых
+    триггерах (их id больше переданных), и возвращает триггеры на место.
+    """
+    where = f"p.system_id > {int(after_system_id)}"
+    cur.execute(f"INSERT INTO main.system_stats {STATS_SELECT.replace('{where}', where)}")
+    cur.execute(f"""
+        INSERT INTO main.system_type_stats
+        SELECT system_id, type_id, count(*) FROM main.planet_data p WHERE {where} GROUP BY system_id, type_id
+    """)
+    if has_fts(cur):
+        cur.execute(f"""
+            INSERT INTO main.planets_fts (rowid, description)
+            SELECT p.id, {_render_description("p", "a.name")}
+            FROM main.planet_data p
+            JOIN main.description_templates d ON d.id = p.description_id
+            JOIN main.atmospheres a ON a.id = p.atmosphere_id
+            WHERE p.id > ?
+        """, (after_planet_id,))
+    if has_features(cur):
+        cur.execute(f"INSERT INTO main.planet_features {PLANET_FEATURES_SELECT} WHERE p.id > ?", (after_planet_id,))
+        cur.execute(f"INSERT INTO main.system_features {SYSTEM_FEATURES_SELECT} WHERE s.id > ?", (after_system_id,))
+    _init_derived(cur)
+
+
+def _init_fts(cur):
+    """Полнотекстовый индекс по описаниям планет (FTS5) и триггеры синхронизации."""
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'planets_fts'")
+    exists = cur.fetchone() is not None
+
+    # содержимое берётся из представления planets, текст описания собирается по шаблону
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS planets_fts
+        USING fts5(description, content='planets', content_rowid='id', columnsize=0)
+    """)
+
+    def description(row):
+        return (f"(SELECT {_render_description(row, 'a.name')} FROM description_templates d, atmospheres a "
+                f"WHERE d.id = {row}.description_id AND a.id = {row}.atmosphere_id)")
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS planets_fts_insert AFTER INSERT ON planet_data BEGIN
+            INSERT INTO planets_fts (rowid, description) VALUES (new.id, {description("new")});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS planets_fts_delete AFTER DELETE ON planet_data BEGIN
+            INSERT INTO planets_fts (planets_fts, rowid, description)
+            VALUES ('delete', old.id, {description("old")});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS planets_fts_update
+        AFTER UPDATE OF description_id, temperature_c, atmosphere_id ON planet_data BEGIN
+            INSERT INTO planets_fts (planets_fts, rowid, description)
+            VALUES ('delete', old.id, {description("old")});
+            INSERT INTO planets_fts (rowid, description) VALUES (new.id, {description("new")});
+        END
+    """)
+
+    # индекс создан впервые — заполняем его уже существующими строками
+    if not exists:
+        cur.execute("INSERT INTO planets_fts (planets_fts) VALUES ('rebuild')")
+
+
+# Признаки для поиска похожих планет и систем (core.similarity): R*Tree по исходным
+# значениям — нормировка монотонна, поэтому куб поиска строится при запросе.
+# R*Tree держит не больше 5 измерений: у планет пятое — код «тип + атмосфера»
+# (CATEGORY_CODE), а вероятность жизни в индекс не входит и учитывается при подсчёте расстояния
+CATEGORY_CODE = "coalesce(p.type_id, 0) * 1000 + coalesce(p.atmosphere_id, 0)"
+PLANET_FEATURES_SELECT = f"""
+    SELECT p.id, coalesce(p.temperature_c, 0), coalesce(p.temperature_c, 0),
+           coalesce(p.size_earth, 0), coalesce(p.size_earth, 0), coalesce(p.mass_earth, 0), coalesce(p.mass_earth, 0),
+           coalesce(p.orbital_radius_au, 0), coalesce(p.orbital_radius_au, 0),
+           {CATEGORY_CODE}, {CATEGORY_CODE}
+    FROM planet_data p
+"""
+SYSTEM_FEATURES_SELECT = """
+    SELECT s.id, coalesce(s.star_temperature, 0), coalesce(s.star_temperature, 0),
+           coalesce(s.star_radius, 0), coalesce(s.star_radius, 0), st.planet_count, st.planet_count,
+           st.sum_temperature / st.planet_count, st.sum_temperature / st.planet_count,
+           coalesce(st.max_life_probability, 0), coalesce(st.max_life_probability, 0)
+    FROM system_stats st JOIN system_data s ON s.name = st.system_name
+"""
+
+
+def has_features(conn):
+    """Есть ли в базе индекс признаков (R*Tree)."""
+    cur = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'planet_features'")
+    return cur.fetchone() is not None
+
+
+def _init_features(cur):
+    """
+    Индексы признаков планет и систем (R*Tree). Планеты синхронизируются триггерами
+    на planet_data, системы — на system_stats (их признаки — звезда и агрегаты планет).
+    """
+    exists = has_features(cur)
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS planet_features USING rtree(
+            id, temperature_lo, temperature_hi, size_lo, size_hi, mass_lo, mass_hi,
+            orbit_lo, orbit_hi, category_lo, category_hi
+        )
+    """)
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS system_features USING rtree(
+            id, star_temperature_lo, star_temperature_hi, star_radius_lo, star_radius_hi,
+            planets_lo, planets_hi, temperature_lo, temperature_hi, life_lo, life_hi
+        )
+    """)
+
+    planet_row = f"INSERT INTO planet_features {PLANET_FEATURES_SELECT} WHERE p.id = new.id;"
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS planets_features_insert AFTER INSERT ON planet_data BEGIN
+            {planet_row}
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS planets_features_delete AFTER DELETE ON planet_data BEGIN
+            DELETE FROM planet_features WHERE id = old.id;
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS planets_features_update AFTER UPDATE OF
+            temperature_c, size_earth, mass_earth, orbital_radius_au, type_id, atmosphere_id
+        ON planet_data BEGIN
+            DELETE FROM planet_features WHERE id = old.id;
+            {planet_row}
+        END
+    """)
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS systems_features_insert AFTER INSERT ON system_stats BEGIN
+            INSERT INTO system_features {SYSTEM_FEATURES_SELECT} WHERE st.system_name = new.system_name;
+        END
+    """)
+    # сохранение системы обновляет её статистику на каждой планете — строку R*Tree
+    # меняем на месте (INSERT OR REPLACE R*Tree не поддерживает)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS systems_features_update AFTER UPDATE ON system_stats BEGIN
+            UPDATE system_features SET
+                planets_lo = new.planet_count, planets_hi = new.planet_count,
+                temperature_lo = new.sum_temperature / new.planet_count,
+                temperature_hi = new.sum_temperature / new.planet_count,
+                life_lo = coalesce(new.max_life_probability, 0), life_hi = coalesce(new.max_life_probability, 0)
+            WHERE id = (SELECT id FROM system_data WHERE name = new.system_name);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS systems_features_delete AFTER DELETE ON system_stats BEGIN
+            DELETE FROM system_features WHERE id = (SELECT id FROM system_data WHERE name = old.system_name);
+        END
+    """)
+
+    # индексы созданы впервые — заполняем их уже существующими строками
+    if not exists:
+        cur.execute(f"INSERT INTO planet_features {PLANET_FEATURES_SELECT}")
+        cur.execute(f"INSERT INTO system_features {SYSTEM_FEATURES_SELECT}")
+
+
+def _init_stats(cur):
+    """
+    Сводная статистика по системам (system_stats, system_type_counts).
+    Обновляется триггерами на planet_data: вставка — инкрементально,
+    удаление и изменение — пересчётом по одной системе (min/max не вычитаются);
+    при удалении всей системы статистика удаляется один раз (delete_system_rows).
+    """
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'system_stats'")
+    exists = cur.fetchone() is not None
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS system_stats (
+            system_name TEXT PRIMARY KEY,
+            planet_count INTEGER,
+            sum_temperature REAL,
+            min_temperature REAL,
+            max_temperature REAL,
+            max_life_probability REAL,
+            total_satellites INTEGER,
+            total_mass REAL
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS system_type_stats (
+            system_id INTEGER,
+            type_id INTEGER,
+            planet_count INTEGER,
+            PRIMARY KEY (system_id, type_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE VIEW IF NOT EXISTS system_type_counts AS
+        SELECT s.name AS system_name, t.name AS planet_type, c.planet_count
+        FROM system_type_stats c
+        JOIN system_data s ON s.id = c.system_id
+        JOIN planet_types t ON t.id = c.type_id
+    """)
+
+    def system_name(row):
+        return f"(SELECT name FROM system_data WHERE id = {row}.system_id)"
+
+    def recompute(row):
+        return f"""
+            DELETE FROM system_stats WHERE system_name = {system_name(row)};
+            INSERT INTO system_stats SELECT * FROM ({STATS_SELECT.replace("{where}", f"p.system_id = {row}.system_id")});
+        """
+
+    def add_type(row):
+        return f"""
+            INSERT INTO system_type_stats VALUES ({row}.system_id, {row}.type_id, 1)
+            ON CONFLICT (system_id, type_id) DO UPDATE SET planet_count = planet_count + 1;
+        """
+
+    def remove_type(row):
+        return f"""
+            UPDATE system_type_stats SET planet_count = planet_count - 1
+            WHERE system_id = {row}.system_id AND type_id = {row}.type_id;
+            DELETE FROM system_type_stats
+            WHERE system_id = {row}.system_id AND type_id = {row}.type_id AND planet_count <= 0;
+        """
+
+    add_stats = f"""
+        INSERT INTO system_stats VALUES (
+            {system_name("new")}, 1, new.temperature_c, new.temperature_c, new.temperature_c,
+            new.life_probability, new.satellites, new.mass_earth
+        )
+        ON CONFLICT (system_name) DO UPDATE SET
+            planet_count = planet_count + 1,
+            sum_temperature = sum_temperature + excluded.sum_temperature,
+            min_temperature = min(min_temperature, excluded.min_temperature),
+            max_temperature = max(max_temperature, excluded.max_temperature),
+            max_life_probability = max(max_life_probability, excluded.max_life_probability),
+            total_satellites = total_satellites + excluded.total_satellites,
+            total_mass = total_mass + excluded.total_mass;
+        {add_type("new")}
+    """
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS planets_stats_insert AFTER INSERT ON planet_data BEGIN {add_stats} END")
+    # удаление системы целиком (delete_system_rows) сначала снимает её статистику —
+    # тогда триггер не пересчитывает систему на каждой удаляемой планете.
+    # Пересоздаётся при каждом init_db: в базах прежних версий он был без WHEN
+    cur.execute("DROP TRIGGER IF EXISTS planets_stats_delete")
+    cur.execute(f"""
+        CREATE TRIGGER planets_stats_delete AFTER DELETE ON planet_data
+        WHEN EXISTS (SELECT 1 FROM system_stats WHERE system_name = {system_name("old")})
+        BEGIN
+            {recompute("old")} {remove_type("old")}
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS planets_stats_update AFTER UPDATE OF
+            system_id, temperature_c, mass_earth, type_id, life_probability, satellites
+        ON planet_data BEGIN
+            {recompute("old")} {recompute("new")} {remove_type("old")} {add_type("new")}
+        END
+    """)
+
+    # таблицы созданы впервые — заполняем по уже существующим планетам
+    if not exists:
+        cur.execute(f"INSERT INTO system_stats {STATS_SELECT.replace('{where}', '1')}")
+        cur.execute("""
+            INSERT INTO system_type_stats
+            SELECT system_id, type_id, count(*) FROM planet_data GROUP BY system_id, type_id
+        """)
+
+
+def migrate(conn):
+    """
+    Переводит базу схемы 1 на компактную схему одной транзакцией (id систем и планет
+    сохраняются), затем сжимает файл (VACUUM).
+    """
+    cur = conn.cursor()
+    log.info("Перевод базы на компактную схему...")
+    cur.execute("BEGIN")
+    try:
+        # старые триггеры, индексы и производные таблицы пересоздаются заново
+        for name, kind in cur.execute("""
+            SELECT name, type FROM sqlite_master
+            WHERE type IN ('trigger', 'index') AND tbl_name IN ('planets', 'systems') AND sql IS NOT NULL
+        """).fetchall():
+            cur.execute(f"DROP {kind.upper()} {name}")
+        for table in ("planets_fts", "system_stats", "system_type_counts"):
+            cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.execute("ALTER TABLE systems RENAME TO legacy_systems")
+        cur.execute("ALTER TABLE planets RENAME TO legacy_planets")
+
+        for sql in TABLES:
+            cur.execute(sql)
+
+        _intern(cur, "star_types", (r[0] for r in cur.execute("SELECT DISTINCT star_type FROM legacy_systems")))
+        cur.execute("""
+            INSERT INTO system_data (id, name, star_name, star_type_id, star_temperature, star_radius, planet_count)
+            SELECT s.id, s.name, s.star_name, t.id, s.star_temperature, s.star_radius, s.planet_count
+            FROM legacy_systems s JOIN star_types t ON t.name IS coalesce(s.star_type, '')
+        """)
+
+        rows = cur.execute("""
+            SELECT p.id, s.id, p.name, p.temperature_c, p.size_earth, p.mass_earth, p.orbital_radius_au,
+                   p.orbital_period_days, p.planet_type, p.atmosphere, p.life_probability, p.satellites,
+                   p.image_path, p.description
+            FROM legacy_planets p JOIN system_data s ON s.name = p.system_name
+        """).fetchall()
+        _write_planet_rows(cur, rows)
+
+        cur.execute("DROP TABLE legacy_planets")
+        cur.execute("DROP TABLE legacy_systems")
+        _init_derived(cur)
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")  # вступает в силу при VACUUM
+    cur.execute("VACUUM")
+    log.info(f"База переведена на схему {SCHEMA_VERSION}.")
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def _intern(cur, table, values):
+    """Добавляет в справочник недостающие значения."""
+    column = LOOKUPS[table]
+    cur.executemany(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", [(_text(v),) for v in set(values)])
+
+
+def description_template(description, temperature_c, atmosphere):
+    """
+    Описание -> (шаблон, params). Если в тексте встречаются температура и атмосфера
+    планеты, они заменяются плейсхолдерами (params = 1), так что описания,
+    собранные Planet.generate_description, сводятся к нескольким шаблонам.
+    """
+    description = _text(description)
+    if TEMPLATE_TEMPERATURE in description or TEMPLATE_ATMOSPHERE in description:
+        return description, 0
+    template = description
+    # число подставляется так, как его печатает SQLite: годятся только короткие записи без экспоненты
+    temperature = repr(float(temperature_c))
+    if "e" not in temperature and len(temperature.strip("-").replace(".", "")) <= 15:
+        template = template.replace(temperature, TEMPLATE_TEMPERATURE)
+    if atmosphere:
+        template = template.replace(atmosphere, TEMPLATE_ATMOSPHERE)
+    rendered = template.replace(TEMPLATE_TEMPERATURE, temperature).replace(TEMPLATE_ATMOSPHERE, _text(atmosphere))
+    if template == description or rendered != description:
+        return description, 0
+    return template, 1
+
+
+def _write_planet_rows(cur, rows):
+    """
+    Пишет планеты в planet_data. rows — кортежи (id или None, id системы, имя, 5 чисел,
+    тип, атмосфера, жизнь, спутники, картинка, описание).
+    """
+    templates = [description_template(r[13], r[3], r[9]) for r in rows]
+    _intern(cur, "planet_types", (r[8] for r in rows))
+    _intern(cur, "atmospheres", (r[9] for r in rows))
+    _intern(cur, "images", (r[12] for r in rows))
+    cur.executemany("INSERT OR IGNORE INTO description_templates (template, params) VALUES (?, ?)", set(templates))
+    cur.executemany("""
+        INSERT INTO planet_data (
+            id, system_id, name, temperature_c, size_earth, mass_earth,
+            orbital_radius_au, orbital_period_days, type_id, atmosphere_id,
+            life_probability, satellites, image_id, description_id
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?,
+                (SELECT id FROM planet_types WHERE name = ?), (SELECT id FROM atmospheres WHERE name = ?),
+                ?, ?, (SELECT id FROM images WHERE path = ?),
+                (SELECT id FROM description_templates WHERE template = ? AND params = ?))
+    """, [(*r[:8], _text(r[8]), _text(r[9]), r[10], r[11], _text(r[12]), *template)
+          for r, template in zip(rows, templates)])
+
+
+def has_fts(conn):
+    """Есть ли в базе полнотекстовый индекс описаний."""
+    cur = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'planets_fts'")
+    return cur.fetchone() is not None
+
+
+def delete_system_rows(cur, name):
+    """Удаляет все записи системы с этим именем (обычной и процедурной)."""
+    # статистика системы снимается целиком, а не пересчитывается на каждой планете
+    cur.execute("DELETE FROM system_stats WHERE system_name = ?", (name,))
+    cur.execute("DELETE FROM system_type_stats WHERE system_id = (SELECT id FROM system_data WHERE name = ?)", (name,))
+    cur.execute("DELETE FROM planet_data WHERE system_id = (SELECT id FROM system_data WHERE name = ?)", (name,))
+    cur.execute("DELETE FROM system_data WHERE name = ?", (name,))
+    cur.execute("DELETE FROM seeded_systems WHERE name = ?", (name,))
+    cur.execute("DELETE FROM planet_overrides WHERE system_name = ?", (name,))
+
+
+def clear_catalog(cur):
+    """
+    Удаляет все системы (обычные и процедурные), правки и справочники (без commit).
+    Триггеры снимаются, поэтому DELETE без WHERE очищает таблицы целиком,
+    а не построчно; производные данные очищаются так же.
+    """
+    drop_derived_triggers(cur)
+    for table in ("planet_data", "system_data", "seeded_systems", "planet_overrides",
+                  "system_stats", "system_type_stats", "description_templates", *LOOKUPS):
+        cur.execute(f"DELETE FROM main.{table}")
+    if has_fts(cur):
+        cur.execute("INSERT INTO main.planets_fts (planets_fts) VALUES ('delete-all')")
+    if has_features(cur):
+        cur.execute("DELETE FROM main.planet_features")
+        cur.execute("DELETE FROM main.system_features")
+    _init_derived(cur)
+
+
+def system_exists(cur, name):
+    """Есть ли в базе система (обычная или процедурная) с этим именем."""
+    return cur.execute(
+        "SELECT 1 FROM system_data WHERE name = ? UNION ALL SELECT 1 FROM seeded_systems WHERE name = ?",
+        (name, name)
+    ).fetchone() is not None
+
+
+def write_system(cur, system, replace=True):
+    """
+    Записывает систему (без commit). replace=True — одноимённая система заменяется
+    (пересохранение, импорт); replace=False — система новая, и если имя уже занято,
+    ничего не пишется и поднимается NameTaken.
+    Процедурная система пишется как seed и правки. Возвращает число записанных планет.
+    """
+    if replace:
+        delete_system_rows(cur, system.name)
+    else:
+        if not cur.connection.in_transaction:
+            # блокировка записи до проверки: между проверкой и вставкой имя не займут
+            cur.execute("BEGIN IMMEDIATE")
+        if system_exists(cur, system.name):
+            raise NameTaken(system.name)
+
+    if isinstance(system, SeededSystem):
+        cur.execute(
+            "INSERT INTO seeded_systems (name, generator_version, seed) VALUES (?, ?, ?)",
+            (system.name, system.generator_version, system.seed)
+        )
+        cur.executemany(
+            "INSERT INTO planet_overrides (system_name, planet_index, field, value) VALUES (?, ?, ?, ?)",
+            [(system.name, idx, field, str(value)) for (idx, field), value in system.overrides.items()]
+        )
+        return 0
+
+    _intern(cur, "star_types", [system.star_type])
+    cur.execute("""
+        INSERT INTO system_data (name, star_name, star_type_id, star_temperature, star_radius, planet_count)
+        VALUES (?, ?, (SELECT id FROM star_types WHERE name = ?), ?, ?, ?)
+    """, (system.name, system.star_name, _text(system.star_type),
+          int(system.star_temperature_k), float(system.star_radius_solar), len(system.planets)))
+
+    _write_planet_rows(cur, [(
+        None, cur.lastrowid, p.name, float(p.temperature_c), float(p.size_earth),
+        float(p.mass_earth), float(p.orbital_radius_au), float(p.orbital_period_days),
+        p.planet_type, p.atmosphere, float(p.life_probability),
+        int(p.satellites), p.image_path, p.description
+    ) for p in system.planets])
+    return len(system.planets)
+
+
+def write_systems(conn, systems, replace=True):
+    """
+    Записывает системы одной транзакцией (replace — как в write_system);
+    возвращает число записанных планет. При ошибке транзакция откатывается.
+    """
+    cur = conn.cursor()
+    planets = 0
+    try:
+        for system in systems:
+            planets += write_system(cur, system, replace)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return planets
@@ -0,0 +1,314 @@
+"""
+Эфемериды: где находятся планеты в момент t, без интерфейса.
+
+Орбиты считаются круговыми и лежащими в одной плоскости; планета движется
+равномерно с периодом orbital_period_days. Время t — сутки от эпохи каталога
+(t = 0); в эпоху планеты стоят так же, как при открытии системы в окне
+(ui.render.initial_angles). Долгота отсчитывается от звезды против часовой стрелки.
+
+Ephemeris хранит орбиты всех выбранных систем в плоских массивах (array);
+положения считаются векторно (numpy) — сразу для всех планет и всех моментов.
+Соединения и выравнивания ищутся аналитически: разность долгот двух планет
+линейна по времени, поэтому моменты соединений и интервалы, когда планеты
+ближе tolerance, вычисляются по формуле, а не перебором шагов по времени.
+
+Запуск:
+    python -m core.ephemeris positions <система> [--at T ...] [--db data/systems.sqlite]
+    python -m core.ephemeris alignments --start 0 --days 365 [--min-planets 3] [--tolerance 5] [--db ...]
+"""
+import argparse
+import logging
+import math
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+
+import numpy as np
+
+from core import metrics, query
+from core.database import get_connection
+
+log = logging.getLogger(__name__)
+
+TAU = 2 * math.pi
+START_ANGLE = 45.0  # град, долгота первой планеты в эпоху (как в ui.render.initial_angles)
+MIN_PERIOD = 1e-6  # сутки; защита от нулевого периода
+
+
+@dataclass(frozen=True)
+class Conjunction:
+    system: str
+    planets: tuple  # (имя, имя)
+    time: float  # сутки от эпохи
+    longitude: float  # град
+
+
+@dataclass(frozen=True)
+class Alignment:
+    system: str
+    planets: tuple  # имена планет
+    start: float  # сутки от эпохи: пока длится интервал, все планеты в пределах tolerance
+    end: float
+
+    @property
+    def time(self):
+        return (self.start + self.end) / 2
+
+
+def _epoch_phases(count):
+    """Долготы планет системы в эпоху, рад."""
+    return [math.radians((START_ANGLE + i * 360.0 / max(1, count)) % 360.0) for i in range(count)]
+
+
+def _windows(d0, omega, tol, lo, hi):
+    """
+    Интервалы внутри [lo, hi], где разность долгот d0 + omega * t ближе tol к 0 (mod 2π).
+    При omega = 0 разность постоянна.
+    """
+    if omega == 0.0:
+        return [(lo, hi)] if abs((d0 + math.pi) % TAU - math.pi) <= tol else []
+    if omega < 0:
+        d0, omega = -d0, -omega
+    first = math.ceil((d0 + omega * lo - tol) / TAU)
+    last = math.floor((d0 + omega * hi + tol) / TAU)
+    if first > last:  # самый частый случай — в интервале сближений нет
+        return []
+    out = []
+    for m in range(first, last + 1):
+        center = TAU * m - d0
+        a = (center - tol) / omega
+        b = (center + tol) / omega
+        a, b = (a if a > lo else lo), (b if b < hi else hi)
+        if a <= b:  # границы first/last посчитаны с округлением
+            out.append((a, b))
+    return out
+
+
+class Ephemeris:
+    """Орбиты набора систем в плоских массивах; планеты системы i — [offsets[i], offsets[i + 1])."""
+
+    def __init__(self):
+        self.names = []  # имена систем
+        self.planet_names = []
+        self.offsets = array("q", [0])
+        self.radius = array("d")  # а.е.
+        self.period = array("d")  # сутки
+        self.phase = array("d")  # долгота в эпоху, рад
+        self.rate = array("d")  # угловая скорость, рад/сутки
+        self._index = {}
+        self._columns = None  # (radius, phase, rate) как numpy-массивы
+
+    def add(self, name, planets):
+        """planets — [(имя, радиус орбиты, период)] в порядке системы."""
+        self._index[name] = len(self.names)
+        self.names.append(name)
+        for (planet, radius, period), phase in zip(planets, _epoch_phases(len(planets))):
+            self.planet_names.append(planet)
+            self.radius.append(float(radius))
+            period = max(float(period), MIN_PERIOD)
+            self.period.append(period)
+            self.phase.append(phase)
+            self.rate.append(TAU / period)
+        self.offsets.append(len(self.radius))
+
+    @classmethod
+    def from_systems(cls, systems):
+        eph = cls()
+        for system in systems:
+            eph.add(system.name, [(p.name, p.orbital_radius_au, p.orbital_period_days) for p in system.planets])
+        return eph
+
+    @classmethod
+    @metrics.timed("ephemeris.load")
+    def from_catalog(cls, db_file=None):
+        """Все системы каталога; у процедурных планеты восстанавливаются по seed (это дольше)."""
+        eph = cls()
+        conn = get_connection(db_file)
+        try:
+            rows = conn.execute("""
+                SELECT s.name, p.name, p.orbital_radius_au, p.orbital_period_days
+                FROM planet_data p JOIN system_data s ON s.id = p.system_id
+                ORDER BY p.system_id, p.id
+            """)
+            current, planets = None, []
+            for system_name, *planet in rows:
+                if system_name != current:
+                    if current is not None:
+                        eph.add(current, planets)
+                    current, planets = system_name, []
+                planets.append(planet)
+            if current is not None:
+                eph.add(current, planets)
+            for system in query.iter_seeded(conn=conn):
+                eph.add(system.name, [(p.name, p.orbital_radius_au, p.orbital_period_days) for p in system.planets])
+        finally:
+            conn.close()
+        return eph
+
+    def __len__(self):
+        return len(self.names)
+
+    def planets_of(self, name):
+        """Диапазон индексов планет системы в массивах."""
+        i = self._index[name]
+        return range(self.offsets[i], self.offsets[i + 1])
+
+    def system_of(self, planet_index):
+        """Номер системы, к которой относится планета."""
+        return bisect_left(self.offsets, planet_index + 1) - 1
+
+    # положения
+
+    def _numpy(self):
+        """Орбиты в numpy; копия делается заново, только если добавились планеты."""
+        if self._columns is None or len(self._columns[0]) != len(self.radius):
+            self._columns = (np.array(self.radius), np.array(self.phase), np.array(self.rate))
+        return self._columns
+
+    def longitudes(self, t):
+        """Долготы всех планет в момент t, рад в [0, 2π)."""
+        _, phase, rate = self._numpy()
+        return np.mod(phase + rate * t, TAU)
+
+    def positions(self, t):
+        """Координаты всех планет в момент t в плоскости орбит, а.е.: (xs, ys)."""
+        radius, phase, rate = self._numpy()
+        angles = phase + rate * t
+        return radius * np.cos(angles), radius * np.sin(angles)
+
+    @metrics.timed("ephemeris.positions")
+    def positions_at(self, times):
+        """
+        Координаты всех планет для моментов times: (xs, ys) формы (моменты, планеты);
+        xs[k] — координаты в момент times[k].
+        """
+        radius, phase, rate = self._numpy()
+        angles = phase + np.outer(np.asarray(times, dtype=float), rate)
+        return radius * np.cos(angles), radius * np.sin(angles)
+
+    # события
+
+    def conjunctions(self, start, end, systems=None):
+        """
+        Соединения (две планеты на одной долготе, если смотреть от звезды) в [start, end]:
+        для каждой пары планет каждой системы моменты вычисляются точно.
+        Порядок — по системам, внутри системы — по времени.
+        """
+        for i in self._selected(systems):
+            lo, hi = self.offsets[i], self.offsets[i + 1]
+            events = []
+            for a in range(lo, hi):
+                for b in range(a + 1, hi):
+                    d0 = self.phase[b] - self.phase[a]
+                    omega = self.rate[b] - self.rate[a]
+                    for t0, t1 in _windows(d0, omega, 0.0, start, end):
+                        longitude = math.degrees((self.phase[a] + self.rate[a] * t0) % TAU)
+                        events.append(Conjunction(self.names[i], (self.planet_names[a], self.planet_names[b]),
+                                                  t0, longitude))
+            events.sort(key=lambda e: e.time)
+            yield from events
+
+    def alignments(self, start, end, min_planets=3, tolerance=5.0, systems=None):
+        """
+        Выравнивания в [start, end]: интервалы, когда не меньше min_planets планет системы
+        лежат в дуге tolerance градусов (попарно не дальше tolerance). Сообщается
+        наибольшая группа; подгруппа повторяется, только если выровнена дольше неё.
+        """
+        if not 0 < tolerance < 120:
+            raise ValueError("tolerance должен быть от 0 до 120 градусов.")
+        tol = math.radians(tolerance)
+        for i in self._selected(systems):
+            lo, hi = self.offsets[i], self.offsets[i + 1]
+            if hi - lo < min_planets:
+                continue
+            # медленные планеты первыми: их пары дают мало длинных интервалов,
+            # а быстрые планеты затем только сужают их
+            order = sorted(range(lo, hi), key=lambda k: self.rate[k])
+            found = []
+            self._extend(order, 0, [], [(start, end)], min_planets, tol, found)
+            for group, t0, t1 in _drop_covered(found):
+                yield Alignment(self.names[i], tuple(self.planet_names[k] for k in group), t0, t1)
+
+    def _extend(self, order, pos, group, intervals, min_planets, tol, found):
+        """Поиск в глубину: группа group выровнена на intervals; добавляем планеты из order[pos:]."""
+        phase, rate = self.phase, self.rate
+        # дальше планет не хватит, чтобы набрать min_planets
+        stop = len(order) - max(min_planets - len(group) - 1, 0)
+        for n in range(pos, stop):
+            k = order[n]
+            narrowed = intervals
+            for g in group:
+                d0, omega = phase[k] - phase[g], rate[k] - rate[g]
+                if len(narrowed) == 1:
+                    narrowed = _windows(d0, omega, tol, *narrowed[0])
+                else:
+                    narrowed = [w for t0, t1 in narrowed for w in _windows(d0, omega, tol, t0, t1)]
+                if not narrowed:
+                    break
+            else:
+                extended = group + [k]
+                if len(extended) >= min_planets:
+                    found.extend((extended, t0, t1) for t0, t1 in narrowed)
+                self._extend(order, n + 1, extended, narrowed, min_planets, tol, found)
+
+    def _selected(self, systems):
+        if systems is None:
+            return range(len(self.names))
+        return [self._index[name] for name in systems if name in self._index]
+
+
+def _drop_covered(found):
+    """Убирает группы, которые входят в большую группу, выровненную на всём их интервале."""
+    found.sort(key=lambda f: -len(f[0]))
+    kept = []
+    for group, t0, t1 in found:
+        members = set(group)
+        if len(group) == len(found[0][0]) or not any(
+                s0 <= t0 and t1 <= s1 and members < set(g) for g, s0, s1 in kept):
+            kept.append((sorted(group), t0, t1))
+    kept.sort(key=lambda f: f[1])
+    return kept
+
+
+@metrics.timed("ephemeris.alignments")
+def find_alignments(start, end, min_planets=3, tolerance=5.0, db_file=None, ephemeris=None):
+    """Все выравнивания каталога в [start, end] (список Alignment, по системам)."""
+    ephemeris = ephemeris or Ephemeris.from_catalog(db_file)
+    return list(ephemeris.alignments(start, end, min_planets, tolerance))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Положения планет и выравнивания по каталогу")
+    parser.add_argument("--db", help="файл БД (по умолчанию data/systems.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pos = commands.add_parser("positions", help="координаты планет системы")
+    pos.add_argument("system")
+    pos.add_argument("--at", type=float, nargs="+", default=[0.0], help="моменты, сутки от эпохи")
+    al = commands.add_parser("alignments", help="выравнивания планет во всех системах")
+    al.add_argument("--start", type=float, default=0.0, help="начало окна, сутки от эпохи")
+    al.add_argument("--days", type=float, default=365.0, help="длина окна, сутки")
+    al.add_argument("--min-planets", type=int, default=3)
+    al.add_argument("--tolerance", type=float, default=5.0, help="ширина дуги, градусы")
+    al.add_argument("--limit", type=int, default=20, help="сколько выравниваний вывести")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    if args.command == "positions":
+        system = query.get_system(args.system, db_file=args.db)
+        if system is None:
+            parser.error(f"Система '{args.system}' не найдена.")
+        eph = Ephemeris.from_systems([system])
+        for t, xs, ys in zip(args.at, *eph.positions_at(args.at)):
+            print(f"t = {t:g} сут")
+            for name, x, y in zip(eph.planet_names, xs, ys):
+                print(f"  {name}: x = {x:.4f} а.е., y = {y:.4f} а.е.")
+    else:
+        eph = Ephemeris.from_catalog(args.db)
+        found = find_alignments(args.start, args.start + args.days, args.min_planets, args.tolerance, ephemeris=eph)
+        log.info(f"Систем: {len(eph)}, выравниваний: {len(found)}")
+        for a in found[:args.limit]:
+            print(f"{a.system}: {', '.join(a.planets)} — сутки {a.start:.2f}…{a.end:.2f}")
+
+
+if __name__ == "__main__":
+    main()
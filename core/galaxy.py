@@ -0,0 +1,273 @@
+"""
+Карта галактики: положение систем и пространственный индекс для обзора всего каталога.
+
+Координаты системы не хранятся — они детерминированно выводятся из имени
+(спиральный диск в квадрате [-1, 1] x [-1, 1]). Индекс делит квадрат на
+TILES x TILES плиток; точки лежат в массивах, отсортированных по плиткам,
+так что точки плитки идут подряд. Порядок внутри плитки — порядок каталога,
+не связанный с положением, поэтому первые k точек плитки — равномерная выборка
+(на этом построен уровень детализации при отрисовке).
+
+Для выбора точки мышью есть второй порядок: по ячейкам сетки GRID x GRID,
+внутри ячейки — по x. Пирамида плотности строится сразу: нижний уровень
+считается по точкам, каждый следующий — суммами блоков 2x2 предыдущего.
+"""
+import hashlib
+import math
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from operator import add
+
+from core.database import get_connection
+from core.procedural import SeededSystem
+
+ARMS = 4
+TWIST = 5.0  # закрутка рукавов, рад на единицу радиуса
+ARM_SPREAD = 1.6  # разброс точек поперёк рукава
+BULGE = 0.15  # доля систем в центральном балдже
+
+TILE_BITS = 5
+TILES = 1 << TILE_BITS  # плиток по стороне
+GRID_BITS = 9
+GRID = 1 << GRID_BITS  # ячеек самой подробной сетки плотности по стороне
+
+# границы классов температуры звезды, К
+TEMPERATURE_BINS = (3500, 4500, 5500, 6500, 8000, 12000, 20000)
+
+COLOR_BY_TYPE = "type"
+COLOR_BY_TEMPERATURE = "temperature"
+
+_HASH = struct.Struct("<III")
+
+
+def galaxy_position(name):
+    """Положение системы (x, y) в [-1, 1]; одно и то же имя всегда даёт одну точку."""
+    a, b, c = _HASH.unpack(hashlib.blake2b(name.encode("utf-8"), digest_size=12).digest())
+    u, v, w = a / 2 ** 32, b / 2 ** 32, c / 2 ** 32
+    if w < BULGE:
+        r = 0.2 * u ** 2
+        angle = 2 * math.pi * v
+    else:
+        r = 0.08 + 0.9 * u
+        arm, offset = divmod(v * ARMS, 1.0)
+        angle = arm * 2 * math.pi / ARMS + TWIST * r + math.copysign((offset - 0.5) ** 2, offset - 0.5) * 2 * ARM_SPREAD
+    return r * math.cos(angle), r * math.sin(angle)
+
+
+def temperature_class(temperature):
+    return bisect_right(TEMPERATURE_BINS, temperature)
+
+
+def iter_stars(db_file=None):
+    """(имя, тип звезды, температура) всех систем каталога; у процедурных звезда восстанавливается по seed."""
+    conn = get_connection(db_file)
+    try:
+        yield from conn.execute("SELECT name, star_type, star_temperature FROM systems ORDER BY id")
+        for name, version, seed in conn.execute("SELECT name, generator_version, seed FROM seeded_systems"):
+            system = SeededSystem(name, seed, version)
+            yield name, system.star_type, system.star_temperature_k
+    finally:
+        conn.close()
+
+
+def catalog_signature(db_file=None):
+    """
+    Число систем и сумма crc32 их имён — меняется при добавлении, удалении
+    и замене систем; по нему видно, что индекс устарел. (max(id) для этого не
+    годится: SQLite заново выдаёт id удалённой последней строки.)
+    """
+    conn = get_connection(db_file)
+    try:
+        count = checksum = 0
+        for (name,) in conn.execute("SELECT name FROM system_data UNION ALL SELECT name FROM seeded_systems"):
+            count += 1
+            checksum += zlib.crc32(name.encode("utf-8"))
+        return count, checksum & 0xFFFFFFFF
+    finally:
+        conn.close()
+
+
+def _tile(x, y):
+    tx = min(TILES - 1, max(0, int((x + 1.0) * 0.5 * TILES)))
+    ty = min(TILES - 1, max(0, int((y + 1.0) * 0.5 * TILES)))
+    return ty * TILES + tx
+
+
+def _grid(v):
+    return min(GRID - 1, max(0, int((v + 1.0) * 0.5 * GRID)))
+
+
+def _halve(counts, size):
+    """Сетка size/2 x size/2: каждая ячейка — сумма блока 2x2 сетки size x size."""
+    out = array("I")
+    for row in range(0, size * size, 2 * size):
+        pairs = list(map(add, counts[row:row + size], counts[row + size:row + 2 * size]))
+        out.extend(map(add, pairs[0::2], pairs[1::2]))
+    return out
+
+
+def _dominant(per_class, cells):
+    """(число систем в ячейке, преобладающий класс) по сеткам отдельных классов."""
+    totals = array("I", bytes(4 * cells))
+    dominant = array("H", bytes(2 * cells))
+    best = array("I", bytes(4 * cells))
+    for c, counts in enumerate(per_class):
+        totals = array("I", map(add, totals, counts))
+        for cell in compress(range(cells), counts):
+            if counts[cell] > best[cell]:
+                best[cell] = counts[cell]
+                dominant[cell] = c
+    return totals, dominant
+
+
+class GalaxyIndex:
+    """Точки всех систем, сгруппированные по плиткам, и пирамида плотности для обзора."""
+
+    def __init__(self, stars):
+        names, xs, ys, temps, types, tiles = [], array("f"), array("f"), array("f"), array("H"), array("H")
+        type_ids = {}
+        for name, star_type, temperature in stars:
+            x, y = galaxy_position(name)
+            names.append(name)
+            xs.append(x)
+            ys.append(y)
+            temps.append(temperature or 0.0)
+            types.append(type_ids.setdefault(star_type, len(type_ids)))
+            tiles.append(_tile(x, y))
+
+        # сортировка подсчётом по плиткам (устойчивая — сохраняет порядок каталога)
+        counts = [0] * (TILES * TILES)
+        for t in tiles:
+            counts[t] += 1
+        self.tile_start = array("I", [0])
+        for c in counts:
+            self.tile_start.append(self.tile_start[-1] + c)
+        pos = list(self.tile_start[:-1])
+        order = [0] * len(names)
+        for i, t in enumerate(tiles):
+            order[pos[t]] = i
+            pos[t] += 1
+
+        self.names = [names[i] for i in order]
+        self.xs = array("f", (xs[i] for i in order))
+        self.ys = array("f", (ys[i] for i in order))
+        self.temperatures = array("f", (temps[i] for i in order))
+        self.star_types = list(type_ids)
+        self._classes = {COLOR_BY_TYPE: array("H", (types[i] for i in order))}
+        self._by_name = {n: i for i, n in enumerate(self.names)}
+
+        # ячейка сетки каждой точки и порядок для выбора мышью: по ячейкам, в ячейке по x
+        self._cells = array("I", (_grid(y) * GRID + _grid(x) for x, y in zip(self.xs, self.ys)))
+        keys = [cell + ((x + 1.0) * 0.5 * GRID) % 1.0 for cell, x in zip(self._cells, self.xs)]
+        self.pick_order = array("I", sorted(range(len(keys)), key=keys.__getitem__))
+        self.pick_xs = array("f", (self.xs[i] for i in self.pick_order))
+        counts = [0] * (GRID * GRID)
+        for cell in self._cells:
+            counts[cell] += 1
+        self.pick_start = array("I", [0])
+        for c in counts:
+            self.pick_start.append(self.pick_start[-1] + c)
+
+        self._density = {}
+        for mode in (COLOR_BY_TYPE, COLOR_BY_TEMPERATURE):
+            self._build_density(mode)
+
+    @classmethod
+    def from_db(cls, db_file=None):
+        return cls(iter_stars(db_file))
+
+    def __len__(self):
+        return len(self.names)
+
+    # классы цвета
+
+    def class_count(self, mode):
+        return len(self.star_types) if mode == COLOR_BY_TYPE else len(TEMPERATURE_BINS) + 1
+
+    def classes(self, mode):
+        """Класс цвета каждой точки: индекс типа звезды или интервала температуры."""
+        if mode not in self._classes:
+            self._classes[mode] = array("B", (temperature_class(t) for t in self.temperatures))
+        return self._classes[mode]
+
+    # пространственные запросы
+
+    def tile_range(self, tile):
+        return self.tile_start[tile], self.tile_start[tile + 1]
+
+    def tiles_in(self, x0, y0, x1, y1):
+        """Непустые плитки, пересекающие прямоугольник (отсечение по области видимости)."""
+        def cell(v):
+            return min(TILES - 1, max(0, int((v + 1.0) * 0.5 * TILES)))
+        tx0, tx1 = cell(min(x0, x1)), cell(max(x0, x1))
+        ty0, ty1 = cell(min(y0, y1)), cell(max(y0, y1))
+        start = self.tile_start
+        return [ty * TILES + tx for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)
+                if start[ty * TILES + tx + 1] > start[ty * TILES + tx]]
+
+    def count_in(self, tiles):
+        start = self.tile_start
+        return sum(start[t + 1] - start[t] for t in tiles)
+
+    def nearest(self, x, y, radius):
+        """
+        Индекс ближайшей к (x, y) точки не дальше radius или None.
+        Ячейки просматриваются кольцами от ячейки курсора, пока кольцо ближе
+        найденной точки; в ячейке — только точки с подходящим x.
+        """
+        best, best_d = None, radius * radius
+        cell_size = 2.0 / GRID
+        gx, gy = _grid(x), _grid(y)
+        xs, ys, order, start = self.pick_xs, self.ys, self.pick_order, self.pick_start
+        for ring in range(int(radius / cell_size) + 2):
+            # точки кольца ring не ближе (ring - 1) ячеек
+            if (ring - 1) * cell_size > math.sqrt(best_d):
+                break
+            for cy in range(max(0, gy - ring), min(GRID - 1, gy + ring) + 1):
+                step = 1 if cy in (gy - ring, gy + ring) else 2 * ring
+                for cx in range(gx - ring, gx + ring + 1, max(1, step)):
+                    if not 0 <= cx < GRID:
+                        continue
+                    lo, hi = start[cy * GRID + cx], start[cy * GRID + cx + 1]
+                    if lo == hi:
+                        continue
+                    mid = bisect_left(xs, x, lo, hi)
+                    # вправо и влево от x, пока по x не дальше лучшей точки
+                    for j in range(mid, hi):
+                        dx = xs[j] - x
+                        if dx * dx > best_d:
+                            break
+                        d = dx * dx + (ys[order[j]] - y) ** 2
+                        if d <= best_d:
+                            best, best_d = order[j], d
+                    for j in range(mid - 1, lo - 1, -1):
+                        dx = x - xs[j]
+                        if dx * dx > best_d:
+                            break
+                        d = dx * dx + (ys[order[j]] - y) ** 2
+                        if d <= best_d:
+                            best, best_d = order[j], d
+        return best
+
+    def find(self, name):
+        """Индекс точки системы по имени или None."""
+        return self._by_name.get(name)
+
+    # уровни детализации
+
+    def _build_density(self, mode):
+        """Все уровни пирамиды режима: GRID_BITS — по точкам, ниже — суммы блоков 2x2."""
+        per_class = [array("I", bytes(4 * GRID * GRID)) for _ in range(self.class_count(mode))]
+        for cell, c in zip(self._cells, self.classes(mode)):
+            per_class[c][cell] += 1
+        for level in range(GRID_BITS, 0, -1):
+            self._density[(level, mode)] = _dominant(per_class, 1 << (2 * level))
+            if level > 1:
+                per_class = [_halve(counts, 1 << level) for counts in per_class]
+
+    def density(self, level, mode):
+        """Сетка 2**level x 2**level (1 <= level <= GRID_BITS): (число систем в ячейке, преобладающий класс цвета)."""
+        return self._density[(level, mode)]
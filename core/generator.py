@@ -1,64 +1,160 @@
 import random
-import csv
+import logging
+import threading
+from dataclasses import dataclass, replace
+from core import importer, merge, metrics, pipeline, query
 from core.planet import Planet
 from core.system import StarSystem
-from core.database import init_db, get_connection
+from core.csvio import read_csv, write_csv
+from core.procedural import (
+    GENERATOR_VERSION, SeededSystem, generate_system, new_seed,
+    random_star_name
+)
+from core.database import init_db, get_connection, write_system, write_systems, NameTaken
+from core.names import (
+    SYSTEM_NUMBERS, PLANET_NUMBERS, system_name_allocator, planet_name_allocator,
+    used_system_names, used_planet_names
+)
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SystemsSnapshot:
+    """
+    Неизменяемый снимок списка систем и текущей системы.
+    Менеджер не меняет опубликованный снимок, а подменяет его целиком,
+    поэтому читатели (отрисовка, фоновые задачи) работают без блокировок.
+    """
+    systems: tuple = ()
+    current_index: int = 0
 
+    @property
+    def system(self):
+        if not self.systems:
+            raise IndexError("Нет систем.")
+        return self.systems[self.current_index]
 
-class SystemManager:
-    """Управляет системами: генерация, загрузка, текущая."""
 
-    def __init__(self, images_dir="data/planet_images"):
-        """Инициализация менеджера систем и загрузка данных из БД."""
+class SystemManager:
+    """
+    Управляет системами: генерация, загрузка, текущая.
+    Можно вызывать из нескольких потоков: изменения списка делаются под
+    блокировкой и публикуются одним присваиванием нового SystemsSnapshot.
+    """
+
+    def __init__(self, images_dir="data/planet_images", db_file=None, preload=True,
+                 system_numbers=SYSTEM_NUMBERS, planet_numbers=PLANET_NUMBERS):
+        """
+        Инициализация менеджера систем и загрузка данных из БД.
+        preload=False — не загружать каталог в память (фоновые задачи, сервисы).
+        system_numbers / planet_numbers — диапазоны номеров в именах (core.names).
+        """
         self.images_dir = images_dir
-        self.systems = []
-        self.current_index = 0
+        self.db_file = db_file  # None — файл по умолчанию (core.database.DB_FILE)
+        self.system_numbers = system_numbers
+        self.planet_numbers = planet_numbers
+        self._lock = threading.RLock()  # только для писателей
+        self._state = SystemsSnapshot()
 
         # Инициализируем базу данных (создаёт таблицы при первом запуске)
-        init_db()
+        init_db(self.db_file)
+
+        self._load_name_allocators()
+
+        if not preload:
+            return
 
         try:
             # Пробуем загрузить все системы из базы данных
             loaded_systems = self.load_all_systems_from_db()
         except Exception as e:
-            print(f"[WARN] Ошибка при чтении из базы: {e}")
+            log.warning(f"Ошибка при чтении из базы: {e}")
             loaded_systems = []
 
         # Если БД пуста — создаём Солнечную систему
         if not loaded_systems:
-            print("[INFO] База данных пуста — создаётся Солнечная система.")
+            log.info("База данных пуста — создаётся Солнечная система.")
             solar_system = self.load_solar_system()
-            self.systems = [solar_system]
-            self.current_index = 0
+            self.replace_systems([solar_system])
             try:
                 self.save_system_to_db(solar_system)
-                print("[INFO] Солнечная система успешно добавлена в базу данных.")
+                log.info("Солнечная система успешно добавлена в базу данных.")
             except Exception as e:
-                print(f"[WARN] Не удалось сохранить систему в базу: {e}")
+                log.warning(f"Не удалось сохранить систему в базу: {e}")
         else:
             # Если что-то есть — используем загруженные системы
-            self.systems = loaded_systems
-            self.current_index = 0
-            print(f"[INFO] Загружено систем из базы: {len(self.systems)}")
+            self.replace_systems(loaded_systems)
+            log.info(f"Загружено систем из базы: {len(self.systems)}")
+
+    # Список систем (снимки)
+
+    def snapshot(self):
+        """Текущий снимок; не меняется, сколько бы потоков ни меняли менеджер."""
+        return self._state
+
+    @property
+    def systems(self):
+        return self._state.systems
+
+    @property
+    def current_index(self):
+        return self._state.current_index
 
     @property
     def system(self):
-        if not self.systems:
-            raise IndexError("Нет систем.")
-        return self.systems[self.current_index]
+        return self._state.system
+
+    def _load_name_allocators(self):
+        """Уникальные имена систем и планет с учётом уже сохранённых в БД."""
+        conn = get_connection(self.db_file)
+        try:
+            self.system_names = system_name_allocator(used_system_names(conn), self.system_numbers)
+            self.planet_names = planet_name_allocator(used_planet_names(conn), self.planet_numbers)
+        finally:
+            conn.close()
+
+    def _publish(self, systems, current_index):
+        # вызывается под self._lock
+        self._state = SystemsSnapshot(tuple(systems), current_index)
+
+    def replace_systems(self, systems, current_index=0):
+        """Заменяет весь список систем (например, после загрузки из БД)."""
+        with self._lock:
+            self._publish(systems, current_index)
 
     def add_system(self, system, make_current=True):
         """Добавление системы."""
-        self.systems.append(system)
-        if make_current:
-            self.current_index = len(self.systems) - 1
+        self.add_systems([system], make_current)
+
+    def add_systems(self, systems, make_current=False):
+        """Добавляет системы одной публикацией; одноимённые системы списка заменяются."""
+        with self._lock:
+            state = self._state
+            merged = list(state.systems)
+            positions = {s.name: i for i, s in enumerate(merged)}
+            index = state.current_index
+            for system in systems:
+                index = positions.get(system.name)
+                if index is None:
+                    index = positions[system.name] = len(merged)
+                    merged.append(system)
+                else:
+                    merged[index] = system
+            self._publish(merged, index if make_current and systems else state.current_index)
+
+    def _replace_system(self, old, new):
+        """Подменяет систему в списке её изменённой копией."""
+        with self._lock:
+            state = self._state
+            self._publish((new if s is old else s for s in state.systems), state.current_index)
 
     def switch_to(self, index):
         """Переключиться на систему по индексу."""
-        if 0 <= index < len(self.systems):
-            self.current_index = index
-        else:
-            raise IndexError(f"Неверный индекс системы: {index}")
+        with self._lock:
+            if not 0 <= index < len(self._state.systems):
+                raise IndexError(f"Неверный индекс системы: {index}")
+            self._publish(self._state.systems, index)
 
     # Солнечная система
 
@@ -101,253 +197,230 @@ class SystemManager:
 
     def clear_system_list(self):
         """Очищает список систем, оставляя только Солнечную систему."""
-        print("[INFO] Очистка списка систем...")
-        self.systems.clear()
-        self.current_index = 0
-
+        log.info("Очистка списка систем...")
         solar = self.load_solar_system()
-        self.systems = [solar]
-        self.current_index = 0
+        self.replace_systems([solar])
 
         try:
             self.save_system_to_db(solar)
-            print("[INFO] Солнечная система восстановлена после очистки списка.")
+            log.info("Солнечная система восстановлена после очистки списка.")
         except Exception as e:
-            print(f"[WARN] Не удалось сохранить Солнечную систему после очистки: {e}")
+            log.warning(f"Не удалось сохранить Солнечную систему после очистки: {e}")
 
     # Cлучайная система
 
     def _random_planet_name(self, i=0):
-        """Создаёт разнообразные имена планет."""
-        prefixes = ["Ari", "Zor", "Orv", "Ke", "Tau", "Pro", "Xen", "Eri", "Vela", "Luma", "Oph", "Hydra", "Draco"]
-        suffixes = ["-I", "-II", "-III", "-Prime", "b", "c", "d", "IV", "V", "-α", "-β"]
-        return random.choice(prefixes) + random.choice(suffixes) + str(random.randint(1, 999))
+        """Создаёт разнообразные имена планет (уникальные в пределах каталога)."""
+        return self.planet_names.allocate()
 
     def _random_system_name(self):
-        """Имя системы."""
-        prefix = random.choice(["Kepler", "Gliese", "Tau", "HD", "Alpha", "Sigma", "Epsilon", "Zeta", "Beta"])
-        number = random.randint(10, 999)
-        return f"{prefix}-{number}"
+        """Имя системы (уникальное в пределах каталога)."""
+        return self.system_names.allocate()
 
     def _random_star_name(self):
         """Имя звезды в системе."""
-        return random.choice(["Helios", "Vega", "Altair", "Rigel", "Solis", "Nova", "Aster", "Centra", "Aurion"])
+        return random_star_name()
 
     # Сохранение / загрузка CSV
 
+    @metrics.timed("csv.save")
     def save_system_to_csv(self, path, system=None):
         """Сохраняет систему в CSV."""
         if system is None:
             system = self.system
 
         try:
-            with open(path, "w", encoding="utf-8-sig", newline='') as f:
-                writer = csv.writer(f, delimiter=';')
-
-                # данные о системе
-                writer.writerow(["SystemName", system.name])
-                writer.writerow(["StarName", system.star_name])
-                writer.writerow(["StarType", system.star_type])
-                writer.writerow(["StarTempK", system.star_temperature_k])
-                writer.writerow(["StarRadiusSolar", system.star_radius_solar])
-                writer.writerow([
-                    "#PlanetName", "Temperature_C", "Size_Earth", "Mass_Earth",
-                    "Orbital_Radius_AU", "Orbital_Period_Days", "Planet_Type",
-                    "Atmosphere", "Life_Probability", "Satellites",
-                    "Sat_Names", "Image_Path", "Description"
-                ])
-
-                # планеты
-                for pl in system.planets:
-                    writer.writerow([
-                        pl.name,
-                        round(pl.temperature_c, 2),
-                        round(pl.size_earth, 2),
-                        round(pl.mass_earth, 2),
-                        round(pl.orbital_radius_au, 3),
-                        round(pl.orbital_period_days, 1),
-                        pl.planet_type,
-                        pl.atmosphere,
-                        round(pl.life_probability, 2),
-                        int(pl.satellites),
-                        pl.image_path or "",
-                        pl.description or ""
-                    ])
-            print(f"[INFO] Система '{system.name}' успешно сохранена в CSV.")
+            write_csv(path, system)
+            log.info(f"Система '{system.name}' успешно сохранена в CSV.")
         except Exception as e:
             raise RuntimeError(f"Не удалось сохранить CSV: {e}")
 
+    @metrics.timed("csv.load")
     def load_system_from_csv(self, path):
         """Загружает систему из CSV."""
         try:
-            with open(path, "r", encoding="utf-8-sig") as f:
-                reader = csv.reader(f, delimiter=';')
-                rows = [r for r in reader if r]
-
-            if len(rows) < 6:
-                raise ValueError("CSV-файл не содержит достаточных данных.")
-
-            sys_name = rows[0][1] if len(rows[0]) > 1 else "Безымянная система"
-            star_name = rows[1][1] if len(rows[1]) > 1 else "Звезда"
-            star_type = rows[2][1] if len(rows[2]) > 1 else "Неизвестный тип"
-            star_temp = float(rows[3][1]) if len(rows[3]) > 1 else 5778.0
-            star_radius = float(rows[4][1]) if len(rows[4]) > 1 else 1.0
-
-            planets = []
-            for r in rows[6:]:
-                if not r or len(r) < 10:
-                    continue
-                try:
-                    name = r[0]
-                    temp = float(r[1])
-                    size = float(r[2])
-                    mass = float(r[3])
-                    orbit = float(r[4])
-                    period = float(r[5])
-                    ptype = r[6]
-                    atm = r[7]
-                    life = float(r[8])
-                    sats = int(float(r[9]))
-                    img = r[10] if len(r) > 10 and r[10] else ""
-                    desc = r[11] if len(r) > 11 else ""
-                    pl = Planet(
-                        name=name,
-                        temperature_c=temp,
-                        size_earth=size,
-                        mass_earth=mass,
-                        orbital_radius_au=orbit,
-                        orbital_period_days=period,
-                        planet_type=ptype,
-                        atmosphere=atm,
-                        life_probability=life,
-                        satellites=sats,
-                        image_path=img,
-                        description=desc
-                    )
-                    planets.append(pl)
-                except Exception as e:
-                    print(f"[WARN] Пропуск строки CSV ({e}): {r}")
-
-            system = StarSystem(
-                name=sys_name,
-                star_name=star_name,
-                star_type=star_type,
-                star_temperature_k=star_temp,
-                star_radius_solar=star_radius,
-                planets=planets
-            )
-
+            system = read_csv(path)
             self.add_system(system, make_current=True)
             self.save_system_to_db(system)
-            print(f"[INFO] Система '{sys_name}' успешно загружена из CSV.")
+            log.info(f"Система '{system.name}' успешно загружена из CSV.")
             return system
 
         except Exception as e:
             raise RuntimeError(f"Ошибка при загрузке CSV: {e}")
 
+    def import_csv_files(self, paths, on_progress=None, report_path=None, workers=None):
+        """
+        Массовый импорт CSV (каталоги, маски, файлы) через core.importer.
+        Системы, как в core.pipeline, только пишутся в БД: в список попадает
+        лишь последняя импортированная (она становится текущей), а системы
+        списка, заменённые одноимёнными из файлов, обновляются. Можно вызывать
+        из фонового потока.
+        """
+        known = {s.name for s in self.systems}
+        replaced, last = [], []
+
+        def add(system):
+            self._reserve_names(system)
+            if system.name in known:
+                replaced.append(system)
+            last[:] = [system]
+
+        result = importer.import_csv(paths, self.db_file, workers, stages=[pipeline.each(add)],
+                                     on_progress=on_progress, report_path=report_path)
+        self.add_systems(replaced)
+        if last:
+            self.add_system(last[0], make_current=True)
+        return result
+
     # Генерация случайной системы
 
     def generate_random_system(self, min_planets=4, max_planets=8):
-        print("[DEBUG] Генерация новой системы...")
-        count = random.randint(min_planets, max_planets)
-        planets = []
-
-        # список всех картинок в папке
-        image_files = [
-            "data/planet_images/random_planet_1.png",
-            "data/planet_images/random_planet_2.png",
-            "data/planet_images/random_planet_3.png",
-            "data/planet_images/random_planet_4.png",
-            "data/planet_images/random_planet_5.png",
-            "data/planet_images/random_planet_6.png",
-            "data/planet_images/random_planet_7.png",
-            "data/planet_images/random_planet_8.png",
-            "data/planet_images/black_hole.png"
-        ]
+        system = self.create_random_system(min_planets, max_planets)
+        self.add_system(system, make_current=True)
+        return system
 
-        for i in range(count):
-            orbit = round(0.4 + i * 0.4, 2)
-            temp = round(300 - orbit * random.uniform(25, 60), 1)
-            size = round(random.uniform(0.3, 10.0), 2)
-            ptype = random.choice(["Каменистая", "Газовый гигант", "Ледяная", "Пустынная", "Океаническая"])
-            atm = random.choice(["N2-O2", "CO2", "H2-He", "Methane"])
+    @metrics.timed("generator.generate")
+    def create_random_system(self, min_planets=4, max_planets=8, save=True):
+        """
+        Генерирует систему, не добавляя её в список; save=False — и не сохраняя
+        в базу (запас core.pool сохраняет систему, когда выдаёт её).
+        """
+        log.debug("Генерация новой системы...")
+        system = generate_system(self._random_system_name(), random, GENERATOR_VERSION, min_planets, max_planets,
+                                 planet_namer=self._random_planet_name)
+
+        metrics.count("systems.generated")
+        if save:
+            self.save_new_systems_to_db([system])
+        return system
 
-            img = image_files.pop() if image_files else "data/planet_images/земля.png"
+    # Процедурные системы (хранятся как версия генератора + seed)
 
-            pl = Planet(
-                name=self._random_planet_name(i),
-                temperature_c=temp,
-                size_earth=size,
-                mass_earth=round(size * random.uniform(0.5, 2.5), 2),
-                orbital_radius_au=orbit,
-                orbital_period_days=round(365 * (orbit ** 1.5), 1),
-                planet_type=ptype,
-                atmosphere=atm,
-                life_probability=round(random.uniform(0, 80), 1),
-                satellites=random.randint(0, 5),
-                image_path=img,
-                description=f"Генерированная планета {ptype}"
-            )
-            pl.generate_description()
-            planets.append(pl)
-
-        # создаём систему
-        system = StarSystem(
-            name=self._random_system_name(),
-            star_name=self._random_star_name(),
-            star_type=random.choice(["Жёлтый карлик", "Красный гигант", "Белый карлик"]),
-            star_temperature_k=random.randint(3000, 10000),
-            star_radius_solar=round(random.uniform(0.5, 2.5), 2),
-            planets=planets
-        )
-
-        # сохраняем и добавляем в список
-        self.save_system_to_db(system)
+    @metrics.timed("generator.generate_seeded")
+    def generate_seeded_system(self, seed=None, version=GENERATOR_VERSION):
+        """Создаёт систему, полностью заданную seed; в БД пишется только seed."""
+        system = SeededSystem(self._random_system_name(), new_seed() if seed is None else seed, version)
+        metrics.count("systems.generated")
+        self.save_new_systems_to_db([system])
         self.add_system(system, make_current=True)
-
         return system
 
+    def generate_seeded_systems(self, count, version=GENERATOR_VERSION):
+        """Пакетная генерация: одна транзакция, планеты не создаются вовсе."""
+        names = self.system_names.allocate_many(count)
+        systems = [SeededSystem(name, new_seed(), version) for name in names]
+        metrics.count("systems.generated", count)
+        self.save_new_systems_to_db(systems)
+        self.add_systems(systems)
+        return systems
+
+    def generate_stream(self, count, sinks, stages=(), seeded=False, version=GENERATOR_VERSION, **pipeline_options):
+        """
+        Генерирует count систем прямо в приёмники core.pipeline, не держа их в памяти
+        и не добавляя в список менеджера. Имена не пересекаются с каталогом.
+        """
+        source = pipeline.random_systems(count, version, seeded, self.system_names, self.planet_names)
+        total = pipeline.run(source, sinks, stages, **pipeline_options)
+        metrics.count("systems.generated", total)
+        return total
+
+    def merge_catalog(self, path, policy=merge.SKIP):
+        """
+        Добавляет в каталог системы другой базы (core.merge); список систем не меняется.
+        Имена добавленных систем и планет после этого не выдаются повторно.
+        """
+        result = merge.merge_catalog(path, self.db_file, policy)
+        self._load_name_allocators()
+        return result
+
+    def update_planet(self, system, index, **changes):
+        """
+        Изменяет поля планеты и сохраняет изменения в БД. Сама система не меняется:
+        в списке её заменяет изменённая копия, которая и возвращается.
+        """
+        if isinstance(system, SeededSystem):
+            updated = SeededSystem(system.name, system.seed, system.generator_version, system.overrides)
+            for field, value in changes.items():
+                updated.set_override(index, field, value)
+            conn = get_connection(self.db_file)
+            conn.executemany("""
+                INSERT OR REPLACE INTO planet_overrides (system_name, planet_index, field, value)
+                VALUES (?, ?, ?, ?)
+            """, [(system.name, index, field, str(value)) for field, value in changes.items()])
+            conn.commit()
+            conn.close()
+        else:
+            planets = list(system.planets)
+            planets[index] = replace(planets[index], **changes)
+            updated = replace(system, planets=planets)
+            self.save_system_to_db(updated)
+        self._replace_system(system, updated)
+        return updated
+
     # Работа с БД
 
+    def _reserve_names(self, system):
+        """Помечает имена системы (и её сохранённых планет) занятыми."""
+        self.system_names.reserve(system.name)
+        if not isinstance(system, SeededSystem):
+            for p in system.planets:
+                self.planet_names.reserve(p.name)
+
+    @metrics.timed("db.save")
     def save_system_to_db(self, system: StarSystem):
         """Сохраняет систему и планеты в базу данных."""
-        print(f"[DEBUG] Сохранение системы '{system.name}' с {len(system.planets)} планетами.")
-        conn = get_connection()
+        log.debug("Сохранение системы '%s'.", system.name)
+        self._reserve_names(system)
+        conn = get_connection(self.db_file)
         cur = conn.cursor()
-
-        # Удалим дубликаты по имени
-        cur.execute("DELETE FROM systems WHERE name = ?", (system.name,))
-        cur.execute("DELETE FROM planets WHERE system_name = ?", (system.name,))
-
-        # Сохраняем систему
-        cur.execute("""
-            INSERT INTO systems (name, star_name, star_type, star_temperature, star_radius, planet_count)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (system.name, system.star_name, system.star_type,
-              int(system.star_temperature_k), float(system.star_radius_solar), len(system.planets)))
-
-        # Сохраняем планеты
-        for p in system.planets:
-            cur.execute("""
-                INSERT INTO planets (
-                    system_name, name, temperature_c, size_earth, mass_earth,
-                    orbital_radius_au, orbital_period_days, planet_type, atmosphere,
-                    life_probability, satellites, image_path, description
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                system.name, p.name, float(p.temperature_c), float(p.size_earth),
-                float(p.mass_earth), float(p.orbital_radius_au), float(p.orbital_period_days),
-                p.planet_type, p.atmosphere, float(p.life_probability),
-                int(p.satellites), p.image_path, p.description
-            ))
-
+        planets = write_system(cur, system)
         conn.commit()
         conn.close()
-
+        metrics.count("planets.saved", planets)
+
+    @metrics.timed("db.save_batch")
+    def save_systems_to_db(self, systems):
+        """Сохраняет несколько систем одной транзакцией."""
+        for system in systems:
+            self._reserve_names(system)
+        conn = get_connection(self.db_file)
+        planets = write_systems(conn, systems)
+        conn.close()
+        metrics.count("planets.saved", planets)
+
+    @metrics.timed("db.save_new")
+    def save_new_systems_to_db(self, systems):
+        """
+        Сохраняет только что созданные системы одной транзакцией, ничего не заменяя.
+        Аллокатор имён у каждого процесса свой, и имя мог уже занять другой
+        писатель — тогда система получает новое имя.
+        """
+        planets = 0
+        conn = get_connection(self.db_file)
+        try:
+            cur = conn.cursor()
+            for system in systems:
+                while True:
+                    try:
+                        planets += write_system(cur, system, replace=False)
+                        break
+                    except NameTaken:
+                        metrics.count("names.taken")
+                        log.info(f"Имя '{system.name}' уже занято в базе — выдаётся другое.")
+                        system.name = self._random_system_name()
+                self._reserve_names(system)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        metrics.count("planets.saved", planets)
+
+    @metrics.timed("db.load_all")
     def load_all_systems_from_db(self):
         """Загружает все системы и планеты из базы."""
-        conn = get_connection()
+        conn = get_connection(self.db_file)
         cur = conn.cursor()
 
         cur.execute("SELECT name, star_name, star_type, star_temperature, star_radius FROM systems")
@@ -389,6 +462,9 @@ class SystemManager:
             )
             systems.append(sys_obj)
 
+        # процедурные системы: планеты восстановятся при первом обращении
+        systems.extend(query.iter_seeded(conn=conn))
+
         conn.close()
         return systems
 
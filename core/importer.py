@@ -0,0 +1,147 @@
+"""
+Массовый импорт систем из CSV-файлов (формат core.csvio).
+
+Файлы разбираются и проверяются в пуле процессов; готовые системы идут в
+единственный писатель БД (pipeline.SqliteSink), который пишет их крупными
+транзакциями. Битые файлы пропускаются и попадают в отчёт об ошибках.
+
+Запуск:
+    python -m core.importer exports/ "more/*.csv" [--db data/systems.sqlite] [--report errors.csv]
+"""
+import argparse
+import csv
+import glob
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+
+from core import metrics, pipeline
+from core.csvio import read_csv
+
+log = logging.getLogger(__name__)
+
+CHUNKSIZE = 64  # файлов на одно задание процесса
+WINDOW = 4096  # файлов в работе одновременно (ограничивает память под готовые системы)
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    errors: list = field(default_factory=list)  # (путь, сообщение)
+    elapsed: float = 0.0
+
+
+def collect_files(paths):
+    """CSV-файлы по списку каталогов, масок и путей; без повторов, в отсортированном порядке."""
+    if isinstance(paths, str):
+        paths = [paths]
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(".csv"))
+        elif glob.has_magic(path):
+            files.update(glob.glob(path, recursive=True))
+        else:
+            files.add(path)
+    return sorted(files)
+
+
+def validate_system(system):
+    """Проверяет разобранную систему; ValueError — если данные не годятся для каталога."""
+    if not system.name.strip():
+        raise ValueError("Пустое имя системы.")
+    if not system.star_temperature_k > 0 or not system.star_radius_solar > 0:
+        raise ValueError("Температура и радиус звезды должны быть положительными.")
+    names = set()
+    for p in system.planets:
+        if not p.name.strip():
+            raise ValueError("Пустое имя планеты.")
+        if p.name in names:
+            raise ValueError(f"Повтор имени планеты '{p.name}'.")
+        names.add(p.name)
+        numbers = (p.temperature_c, p.size_earth, p.mass_earth, p.orbital_radius_au, p.orbital_period_days)
+        if not all(math.isfinite(x) for x in numbers):
+            raise ValueError(f"Планета '{p.name}': нечисловые значения.")
+        if not 0.0 <= p.life_probability <= 100.0:
+            raise ValueError(f"Планета '{p.name}': вероятность жизни вне 0–100%.")
+        if p.satellites < 0:
+            raise ValueError(f"Планета '{p.name}': отрицательное число спутников.")
+
+
+def _parse(path):
+    """Рабочий процесс: (путь, система, None) или (путь, None, ошибка)."""
+    try:
+        system = read_csv(path, strict=True)
+        validate_system(system)
+        return path, system, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def import_csv(paths, db_file=None, workers=None, batch=1000, stages=(), on_progress=None, report_path=None):
+    """
+    Импортирует CSV-файлы (каталоги, маски, пути) в БД; одноимённые системы заменяются.
+    on_progress(обработано, всего) вызывается в вызывающем потоке;
+    report_path — CSV-отчёт «файл;ошибка» (пишется, только если ошибки были).
+    """
+    files = collect_files(paths)
+    result = ImportResult()
+    start = time.perf_counter()
+
+    def parsed(pool):
+        done = 0
+        for i in range(0, len(files), WINDOW):
+            for path, system, error in pool.imap_unordered(_parse, files[i:i + WINDOW], CHUNKSIZE):
+                done += 1
+                if error is None:
+                    yield system
+                else:
+                    result.errors.append((path, error))
+                    metrics.count("import.failed")
+                if on_progress is not None:
+                    on_progress(done, len(files))
+
+    with Pool(workers or os.cpu_count() or 1) as pool:
+        result.imported = pipeline.run(parsed(pool), [pipeline.SqliteSink(db_file, batch)], stages)
+    result.elapsed = time.perf_counter() - start
+    metrics.count("import.imported", result.imported)
+
+    if result.errors:
+        log.warning(f"Не импортировано файлов: {len(result.errors)}")
+        if report_path:
+            with open(report_path, "w", encoding="utf-8-sig", newline='') as f:
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow(["File", "Error"])
+                writer.writerows(sorted(result.errors))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовый импорт систем из CSV")
+    parser.add_argument("paths", nargs="+", help="каталоги, маски или файлы CSV")
+    parser.add_argument("--db", help="файл БД (по умолчанию data/systems.sqlite)")
+    parser.add_argument("--workers", type=int, help="процессов разбора (по умолчанию — число ядер)")
+    parser.add_argument("--batch", type=int, default=1000, help="систем в одной транзакции")
+    parser.add_argument("--report", default="import_errors.csv", help="файл отчёта об ошибках")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    last = [0.0]
+
+    def progress(done, total):
+        now = time.perf_counter()
+        if done == total or now - last[0] >= 1.0:
+            last[0] = now
+            log.info(f"Обработано файлов: {done}/{total}")
+
+    result = import_csv(args.paths, args.db, args.workers, args.batch, on_progress=progress, report_path=args.report)
+    log.info(f"Импортировано систем: {result.imported}, ошибок: {len(result.errors)}, {result.elapsed:.1f} с")
+    if result.errors:
+        log.info(f"Отчёт об ошибках: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
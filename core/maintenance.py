@@ -0,0 +1,319 @@
+"""
+Обслуживание базы: возврат свободного места, статистика для планировщика запросов,
+проверка целостности, быстрая очистка и отчёт о размере.
+
+Страницы, освободившиеся при удалении и перезаписи систем, остаются в файле
+(freelist). В режиме auto_vacuum = INCREMENTAL их можно возвращать понемногу
+(PRAGMA incremental_vacuum), без долгого полного VACUUM. Новые базы создаются
+в этом режиме; старые переходят на него при первом vacuum().
+
+Плановое обслуживание (auto_maintain, Scheduler) дёшево и не держит блокировку
+записи долго: статистика собирается приближённо (analysis_limit), место
+возвращается порциями.
+
+Запуск:
+    python -m core.maintenance report|check|analyze|vacuum|clear|auto [--db data/systems.sqlite]
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+
+from core import database, metrics
+from core.database import get_connection, clear_catalog, has_fts
+
+log = logging.getLogger(__name__)
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+INCREMENTAL = 2
+
+ANALYSIS_LIMIT = 1000  # строк индекса на приближённый ANALYZE в плановом обслуживании
+STALE_RATIO = 0.25  # насколько может измениться число строк таблицы, пока её статистика годна
+FREE_RATIO = 0.1  # доля свободных страниц, после которой место возвращается
+RECLAIM_PAGES = 4096  # страниц за один плановый incremental_vacuum
+INTERVAL = 3600.0  # секунд между плановыми запусками
+
+
+@dataclass
+class SizeReport:
+    file_size: int
+    page_size: int
+    page_count: int
+    free_pages: int
+    auto_vacuum: str
+    rows: dict = field(default_factory=dict)  # таблица -> строк
+    sizes: dict = field(default_factory=dict)  # таблица или индекс -> байт (если SQLite собран с dbstat)
+
+    @property
+    def free_bytes(self):
+        return self.free_pages * self.page_size
+
+    def format(self):
+        """Отчёт текстом (для окна и командной строки)."""
+        mb = 1024 * 1024
+        lines = [
+            f"Файл: {self.file_size / mb:.1f} МБ ({self.page_count} стр. по {self.page_size} Б)",
+            f"Свободно: {self.free_bytes / mb:.1f} МБ ({self.free_pages} стр.)",
+            f"auto_vacuum: {self.auto_vacuum}",
+            "",
+            "Строк в таблицах:",
+            *(f"  {table}: {count}" for table, count in self.rows.items()),
+        ]
+        if self.sizes:
+            lines += ["", "Крупнейшие таблицы и индексы:"]
+            largest = sorted(self.sizes.items(), key=lambda item: -item[1])[:10]
+            lines += [f"  {name}: {size / mb:.1f} МБ" for name, size in largest]
+        return "\n".join(lines)
+
+
+def _connect(db_file):
+    return get_connection(db_file)
+
+
+def _pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def _user_tables(conn):
+    """Обычные таблицы каталога (без служебных sqlite_* и теневых таблиц FTS)."""
+    rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' ORDER BY name").fetchall()
+    virtual = [name for name, sql in rows if sql and sql.upper().startswith("CREATE VIRTUAL")]
+    return [name for name, sql in rows
+            if not name.startswith("sqlite_") and name not in virtual
+            and not any(name.startswith(v + "_") for v in virtual)]
+
+
+def size_report(db_file=None, detailed=False):
+    """Размер файла, свободные страницы и число строк по таблицам; detailed — байты по объектам (dbstat)."""
+    path = db_file or database.DB_FILE
+    conn = _connect(db_file)
+    try:
+        report = SizeReport(
+            file_size=os.path.getsize(path),
+            page_size=_pragma(conn, "page_size"),
+            page_count=_pragma(conn, "page_count"),
+            free_pages=_pragma(conn, "freelist_count"),
+            auto_vacuum=AUTO_VACUUM_MODES.get(_pragma(conn, "auto_vacuum"), "?"),
+        )
+        for table in _user_tables(conn):
+            report.rows[table] = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        if detailed:
+            try:
+                report.sizes = dict(conn.execute("SELECT name, sum(pgsize) FROM dbstat GROUP BY name"))
+            except sqlite3.OperationalError:
+                log.info("dbstat недоступен — размеры таблиц не считаются.")
+        return report
+    finally:
+        conn.close()
+
+
+@metrics.timed("db.integrity_check")
+def integrity_check(db_file=None, quick=False):
+    """Список найденных проблем (пустой — база в порядке); проверяется и полнотекстовый индекс."""
+    conn = _connect(db_file)
+    try:
+        pragma = "quick_check" if quick else "integrity_check"
+        problems = [row[0] for row in conn.execute(f"PRAGMA {pragma}") if row[0] != "ok"]
+        if has_fts(conn):
+            try:
+                conn.execute("INSERT INTO planets_fts (planets_fts) VALUES ('integrity-check')")
+            except sqlite3.DatabaseError as e:
+                problems.append(f"planets_fts: {e}")
+        return problems
+    finally:
+        conn.close()
+
+
+@metrics.timed("db.analyze")
+def analyze(db_file=None):
+    """Полный ANALYZE: точная статистика для планировщика запросов."""
+    conn = _connect(db_file)
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def reclaim(db_file=None, pages=None):
+    """
+    Возвращает свободные страницы файловой системе (все или не больше pages).
+    Только для баз в режиме incremental; возвращает освобождённые байты.
+    """
+    conn = _connect(db_file)
+    try:
+        return _reclaim(conn, pages)
+    finally:
+        conn.close()
+
+
+def _reclaim(conn, pages=None):
+    if _pragma(conn, "auto_vacuum") != INCREMENTAL:
+        log.info("База не в режиме incremental — место вернёт только vacuum().")
+        return 0
+    before = _pragma(conn, "page_count")
+    # прагма освобождает по странице за шаг, а execute() делает только первый шаг;
+    # executescript выполняет её до конца
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages or 0)})")
+    return (before - _pragma(conn, "page_count")) * _pragma(conn, "page_size")
+
+
+@metrics.timed("db.vacuum")
+def vacuum(db_file=None):
+    """
+    Полный VACUUM: файл пересобирается без свободных страниц и фрагментации,
+    заодно база переводится в режим incremental. Возвращает освобождённые байты.
+    """
+    path = db_file or database.DB_FILE
+    before = os.path.getsize(path)
+    conn = _connect(db_file)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return before - os.path.getsize(path)
+
+
+@metrics.timed("db.clear")
+def clear(db_file=None):
+    """Быстрая очистка каталога (core.database.clear_catalog) с возвратом места."""
+    conn = _connect(db_file)
+    try:
+        clear_catalog(conn.cursor())
+        conn.commit()
+        incremental = _pragma(conn, "auto_vacuum") == INCREMENTAL
+        if incremental:
+            _reclaim(conn)
+    finally:
+        conn.close()
+    if not incremental:
+        vacuum(db_file)  # база пуста — это быстро
+
+
+def stale_tables(conn):
+    """
+    Таблицы с индексами, статистики которых нет или число строк с тех пор заметно изменилось:
+    {таблица: текущее число строк}.
+    """
+    tables = _user_tables(conn)
+    indexed = [r[0] for r in conn.execute(
+        "SELECT DISTINCT tbl_name FROM sqlite_master WHERE type = 'index' ORDER BY tbl_name"
+    ) if r[0] in tables]
+    analyzed = {}
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+            analyzed[table] = int(stat.split()[0])
+    stale = {}
+    for table in indexed:
+        rows = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        if table in analyzed:
+            if abs(rows - analyzed[table]) > STALE_RATIO * max(analyzed[table], 1):
+                stale[table] = rows
+        elif rows:
+            stale[table] = rows
+    return stale
+
+
+def _analyze_approx(conn, table, rows):
+    """
+    Приближённый ANALYZE таблицы (в пределах analysis_limit). Оценка числа строк при
+    этом бывает неточной вдвое, поэтому в sqlite_stat1 записывается точное значение.
+    """
+    conn.execute(f"ANALYZE main.{table}")
+    conn.execute("""
+        UPDATE sqlite_stat1 SET stat = ? || CASE WHEN instr(stat, ' ') THEN substr(stat, instr(stat, ' ')) ELSE '' END
+        WHERE tbl = ?
+    """, (str(rows), table))
+
+
+@metrics.timed("db.auto_maintain")
+def auto_maintain(db_file=None):
+    """
+    Плановое обслуживание: приближённый ANALYZE устаревших таблиц (иначе PRAGMA optimize)
+    и возврат порции свободного места, если его накопилось много. Возвращает список действий.
+    """
+    actions = []
+    conn = _connect(db_file)
+    try:
+        conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        stale = stale_tables(conn)
+        for table, rows in stale.items():
+            _analyze_approx(conn, table, rows)
+            actions.append(f"ANALYZE {table}")
+        if not stale:
+            conn.execute("PRAGMA optimize")
+            actions.append("optimize")
+        conn.commit()
+
+        free, total = _pragma(conn, "freelist_count"), _pragma(conn, "page_count")
+        if free and free > FREE_RATIO * total:
+            freed = _reclaim(conn, RECLAIM_PAGES)
+            if freed:
+                actions.append(f"reclaim {freed // 1024} КБ")
+    finally:
+        conn.close()
+    log.debug(f"Обслуживание БД: {', '.join(actions)}")
+    return actions
+
+
+class Scheduler:
+    """Фоновый поток, вызывающий auto_maintain раз в interval секунд (первый раз — сразу)."""
+
+    def __init__(self, db_file=None, interval=INTERVAL):
+        self.db_file = db_file
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                auto_maintain(self.db_file)
+            except sqlite3.Error as e:
+                # база занята долгой записью — попробуем в следующий раз
+                log.warning(f"Плановое обслуживание БД не выполнено: {e}")
+            self._stop.wait(self.interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обслуживание базы систем")
+    parser.add_argument("command", choices=["report", "check", "analyze", "vacuum", "clear", "auto"])
+    parser.add_argument("--db", help="файл БД (по умолчанию data/systems.sqlite)")
+    parser.add_argument("--quick", action="store_true", help="check: быстрая проверка (quick_check)")
+    parser.add_argument("--detailed", action="store_true", help="report: размеры таблиц и индексов")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    database.init_db(args.db)
+    if args.command == "report":
+        print(size_report(args.db, args.detailed).format())
+    elif args.command == "check":
+        problems = integrity_check(args.db, args.quick)
+        for problem in problems:
+            log.error(problem)
+        log.info("База в порядке." if not problems else f"Найдено проблем: {len(problems)}")
+        raise SystemExit(1 if problems else 0)
+    elif args.command == "analyze":
+        analyze(args.db)
+        log.info("Статистика обновлена.")
+    elif args.command == "vacuum":
+        log.info(f"Освобождено: {vacuum(args.db) / 1024 / 1024:.1f} МБ")
+    elif args.command == "clear":
+        clear(args.db)
+        log.info("Каталог очищен.")
+    else:
+        log.info(f"Выполнено: {', '.join(auto_maintain(args.db))}")
+
+
+if __name__ == "__main__":
+    main()
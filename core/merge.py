@@ -0,0 +1,223 @@
+"""
+Слияние каталогов: системы другой базы systems.sqlite добавляются в текущую.
+
+Источник подключается через ATTACH и копируется несколькими INSERT ... SELECT
+(id справочников сопоставляются по значениям) в одной транзакции: либо
+переносится всё, либо ничего. Триггеры статистики и FTS на время копирования
+снимаются, а производные данные досчитываются только для добавленных строк.
+
+Запуск:
+    python -m core.merge other.sqlite [more.sqlite ...] [--db data/systems.sqlite] [--policy skip|overwrite|rename]
+"""
+import argparse
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+from core import database, metrics
+from core.database import (
+    LOOKUPS, SCHEMA_VERSION, init_db, get_connection,
+    drop_derived_triggers, delete_systems_bulk, restore_derived
+)
+
+log = logging.getLogger(__name__)
+
+# что делать с системой источника, имя которой уже есть в каталоге
+SKIP = "skip"  # оставить свою
+OVERWRITE = "overwrite"  # заменить системой источника
+RENAME = "rename"  # добавить систему источника под новым именем
+POLICIES = (SKIP, OVERWRITE, RENAME)
+
+CACHE_KB = 256 * 1024  # кэш страниц соединения на время слияния
+
+SOURCE_NAMES = "SELECT name FROM src.system_data UNION ALL SELECT name FROM src.seeded_systems"
+OWN_NAMES = "SELECT name FROM main.system_data UNION ALL SELECT name FROM main.seeded_systems"
+
+
+@dataclass
+class MergeResult:
+    added: int = 0  # систем без конфликта имён
+    overwritten: int = 0
+    renamed: int = 0
+    skipped: int = 0
+    planets: int = 0
+    elapsed: float = 0.0
+
+
+def numbered_name(name, taken):
+    """Имя для переименования: «имя (2)», «имя (3)», ... — первое незанятое."""
+    k = 2
+    while f"{name} ({k})" in taken:
+        k += 1
+    return f"{name} ({k})"
+
+
+def _same_file(a, b):
+    return os.path.exists(b) and os.path.samefile(a, b)
+
+
+def _map_names(cur, policy, rename, result):
+    """
+    Заполняет temp.merge_names (имя в источнике -> имя в каталоге) системами,
+    которые будут скопированы; для overwrite удаляет заменяемые системы.
+    """
+    cur.execute("CREATE TEMP TABLE merge_names (name TEXT PRIMARY KEY, new_name TEXT UNIQUE)")
+    cur.execute(f"INSERT INTO merge_names SELECT name, name FROM ({SOURCE_NAMES}) WHERE name NOT IN ({OWN_NAMES})")
+    result.added = cur.rowcount
+    conflicts = f"SELECT name FROM ({SOURCE_NAMES}) WHERE name NOT IN (SELECT name FROM temp.merge_names)"
+
+    if policy == SKIP:
+        result.skipped = cur.execute(f"SELECT count(*) FROM ({conflicts})").fetchone()[0]
+    elif policy == OVERWRITE:
+        cur.execute(f"INSERT INTO merge_names SELECT name, name FROM ({conflicts})")
+        result.overwritten = cur.rowcount
+        delete_systems_bulk(cur, f"SELECT name FROM temp.merge_names WHERE name IN ({OWN_NAMES})")
+    else:
+        names = [r[0] for r in cur.execute(conflicts)]
+        if names:
+            taken = {r[0] for r in cur.execute(f"{OWN_NAMES} UNION ALL {SOURCE_NAMES}")}
+            mapping = []
+            for name in names:
+                new_name = rename(name, taken)
+                if new_name in taken:
+                    raise ValueError(f"Новое имя '{new_name}' для '{name}' уже занято.")
+                taken.add(new_name)
+                mapping.append((name, new_name))
+            cur.executemany("INSERT INTO merge_names VALUES (?, ?)", mapping)
+        result.renamed = len(names)
+
+
+def _id_map(cur, table, select):
+    """temp.map_{table}: id строки источника -> id той же строки в каталоге (select выдаёт пары)."""
+    cur.execute(f"CREATE TEMP TABLE map_{table} (id INTEGER PRIMARY KEY, new_id INTEGER)")
+    cur.execute(f"INSERT INTO map_{table} {select}")
+
+
+def _copy(cur):
+    """Копирует справочники, системы, планеты и процедурные системы из merge_names; число планет."""
+    # справочники: недостающие значения добавляются, id сопоставляются по значению
+    for table, column in LOOKUPS.items():
+        cur.execute(f"INSERT OR IGNORE INTO main.{table} ({column}) SELECT {column} FROM src.{table}")
+        _id_map(cur, table, f"SELECT s.id, t.id FROM src.{table} s JOIN main.{table} t ON t.{column} = s.{column}")
+    cur.execute("""
+        INSERT OR IGNORE INTO main.description_templates (template, params)
+        SELECT template, params FROM src.description_templates
+    """)
+    _id_map(cur, "description_templates", """
+        SELECT s.id, t.id FROM src.description_templates s
+        JOIN main.description_templates t ON t.template = s.template AND t.params = s.params
+    """)
+
+    cur.execute("""
+        INSERT INTO main.system_data (name, star_name, star_type_id, star_temperature, star_radius, planet_count)
+        SELECT m.new_name, s.star_name, t.new_id, s.star_temperature, s.star_radius, s.planet_count
+        FROM src.system_data s
+        JOIN temp.merge_names m ON m.name = s.name
+        JOIN temp.map_star_types t ON t.id = s.star_type_id
+        ORDER BY s.id
+    """)
+    _id_map(cur, "system_data", """
+        SELECT s.id, t.id FROM src.system_data s
+        JOIN temp.merge_names m ON m.name = s.name
+        JOIN main.system_data t ON t.name = m.new_name
+    """)
+
+    # планеты: все ссылки переводятся через целочисленные карты id
+    cur.execute("""
+        INSERT INTO main.planet_data (
+            system_id, name, temperature_c, size_earth, mass_earth,
+            orbital_radius_au, orbital_period_days, type_id, atmosphere_id,
+            life_probability, satellites, image_id, description_id
+        )
+        SELECT s.new_id, p.name, p.temperature_c, p.size_earth, p.mass_earth,
+               p.orbital_radius_au, p.orbital_period_days, t.new_id, a.new_id,
+               p.life_probability, p.satellites, i.new_id, d.new_id
+        FROM src.planet_data p
+        JOIN temp.map_system_data s ON s.id = p.system_id
+        JOIN temp.map_planet_types t ON t.id = p.type_id
+        JOIN temp.map_atmospheres a ON a.id = p.atmosphere_id
+        JOIN temp.map_images i ON i.id = p.image_id
+        JOIN temp.map_description_templates d ON d.id = p.description_id
+        ORDER BY p.id
+    """)
+    planets = cur.rowcount
+
+    cur.execute("""
+        INSERT INTO main.seeded_systems (name, generator_version, seed)
+        SELECT m.new_name, s.generator_version, s.seed
+        FROM src.seeded_systems s JOIN temp.merge_names m ON m.name = s.name
+    """)
+    cur.execute("""
+        INSERT INTO main.planet_overrides (system_name, planet_index, field, value)
+        SELECT m.new_name, o.planet_index, o.field, o.value
+        FROM src.planet_overrides o JOIN temp.merge_names m ON m.name = o.system_name
+    """)
+    return planets
+
+
+@metrics.timed("db.merge")
+def merge_catalog(source_file, db_file=None, policy=SKIP, rename=numbered_name):
+    """
+    Копирует все системы (обычные и процедурные) из source_file в db_file одной транзакцией.
+    policy — skip, overwrite или rename для систем, чьё имя уже есть в каталоге;
+    rename(имя, занятые имена) -> новое имя (для rename).
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Неизвестная политика конфликтов: {policy}")
+    if not os.path.isfile(source_file):
+        raise FileNotFoundError(source_file)  # ATTACH молча создал бы пустую базу
+    if _same_file(source_file, db_file or database.DB_FILE):
+        raise ValueError("Нельзя объединить каталог с самим собой.")
+
+    init_db(db_file)
+    result = MergeResult()
+    start = time.perf_counter()
+    conn = get_connection(db_file)
+    cur = conn.cursor()
+    cur.execute(f"PRAGMA cache_size = -{CACHE_KB}")  # индексы planet_data обновляются вразнобой
+    cur.execute("ATTACH DATABASE ? AS src", (source_file,))
+    try:
+        version = cur.execute("PRAGMA src.user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"База {source_file} в схеме {version or 1}, нужна {SCHEMA_VERSION}: "
+                             "откройте её приложением, чтобы перевести на текущую схему.")
+
+        cur.execute("BEGIN")
+        try:
+            last_system = cur.execute("SELECT coalesce(max(id), 0) FROM main.system_data").fetchone()[0]
+            last_planet = cur.execute("SELECT coalesce(max(id), 0) FROM main.planet_data").fetchone()[0]
+            drop_derived_triggers(cur)
+            _map_names(cur, policy, rename, result)
+            result.planets = _copy(cur)
+            restore_derived(cur, last_system, last_planet)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        cur.execute("DETACH DATABASE src")
+        conn.close()
+
+    result.elapsed = time.perf_counter() - start
+    metrics.count("merge.systems", result.added + result.overwritten + result.renamed)
+    log.info(f"Объединено с {source_file}: новых {result.added}, заменено {result.overwritten}, "
+             f"переименовано {result.renamed}, пропущено {result.skipped}, планет {result.planets} "
+             f"({result.elapsed:.1f} с)")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Слияние каталогов систем")
+    parser.add_argument("sources", nargs="+", help="файлы БД, которые добавляются в каталог")
+    parser.add_argument("--db", help="каталог-приёмник (по умолчанию data/systems.sqlite)")
+    parser.add_argument("--policy", choices=POLICIES, default=SKIP, help="что делать при совпадении имён систем")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    for source in args.sources:
+        merge_catalog(source, args.db, args.policy)
+
+
+if __name__ == "__main__":
+    main()
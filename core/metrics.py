@@ -0,0 +1,163 @@
+"""
+Счётчики и гистограммы задержек для горячих путей.
+
+По умолчанию выключено (или SSG_METRICS=1 в окружении): timer() возвращает
+общий пустой объект, а count()/timed() сводятся к одной проверке флага.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+# Верхние границы корзин гистограммы, мс (последняя — всё, что больше)
+BUCKETS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 16, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+_enabled = os.environ.get("SSG_METRICS") == "1"
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    """Гистограмма задержек с фиксированными корзинами."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def record(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, q):
+        """Оценка перцентиля по верхней границе корзины."""
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+            "min_ms": round(self.min_ms or 0.0, 4),
+            "max_ms": round(self.max_ms, 4),
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "buckets": {str(b): n for b, n in zip(BUCKETS_MS + ["inf"], self.buckets) if n},
+        }
+
+
+class _Timer:
+    """Контекстный менеджер, записывающий длительность блока."""
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, (time.perf_counter() - self.t0) * 1000)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enable(on=True):
+    """Включить / выключить сбор метрик."""
+    global _enabled
+    _enabled = on
+
+
+def is_enabled():
+    return _enabled
+
+
+def count(name, n=1):
+    """Увеличивает счётчик."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def observe(name, ms):
+    """Записывает одну задержку (мс) в гистограмму name."""
+    if not _enabled:
+        return
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.record(ms)
+
+
+def timer(name):
+    """with metrics.timer("db.save"): ... — замер блока кода."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name):
+    """Декоратор: замеряет каждый вызов функции."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset():
+    """Сбрасывает все накопленные значения."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def snapshot():
+    """Текущее состояние всех метрик в виде словаря."""
+    with _lock:
+        return {
+            "enabled": _enabled,
+            "counters": dict(_counters),
+            "latency": {name: h.to_dict() for name, h in sorted(_histograms.items())},
+        }
+
+
+def export_json(path=None):
+    """Метрики в JSON; если указан path — ещё и записывает в файл."""
+    text = json.dumps(snapshot(), ensure_ascii=False, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return text
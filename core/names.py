@@ -0,0 +1,125 @@
+"""
+Выдача уникальных имён систем и планет.
+
+Пространство имён — «префикс + номер». Имена выдаются в порядке случайной
+аффинной перестановки индексов пространства: каждый индекс встречается ровно
+один раз, поэтому очередное имя получается за O(1) (с пропуском уже занятых).
+Выданные имена не запоминаются: выдано ли имя, проверяется обратной
+перестановкой, так что память не растёт с числом выданных имён.
+"""
+import math
+import random
+import re
+import threading
+from core.procedural import PLANET_PREFIXES, PLANET_SUFFIXES, SYSTEM_PREFIXES
+
+# Диапазоны номеров по умолчанию (старые генераторы использовали 10..999 и 1..999)
+SYSTEM_NUMBERS = (10, 999_999)
+PLANET_NUMBERS = (1, 99_999)
+
+
+class NameSpaceExhausted(RuntimeError):
+    """Все имена пространства заняты."""
+
+
+class NameAllocator:
+    """Уникальные имена вида f"{prefix}{sep}{number}"."""
+
+    def __init__(self, prefixes, low, high, sep="", used=()):
+        self.prefixes = list(prefixes)
+        self._prefix_index = {p: i for i, p in enumerate(self.prefixes)}
+        self.low = low
+        self.high = high
+        self.size = len(self.prefixes) * (high - low + 1)
+        self.sep = sep
+        self.used = set(used)
+        self._lock = threading.Lock()
+
+        # случайная перестановка индексов: i -> (offset + step * k) mod size
+        self._step = random.randrange(1, self.size) if self.size > 1 else 1
+        while math.gcd(self._step, self.size) != 1:
+            self._step = random.randrange(1, self.size)
+        self._offset = random.randrange(self.size)
+        self._inverse = pow(self._step, -1, self.size) if self.size > 1 else 0
+        self._k = 0
+
+    def _name(self, index):
+        prefix = self.prefixes[index % len(self.prefixes)]
+        number = self.low + index // len(self.prefixes)
+        return f"{prefix}{self.sep}{number}"
+
+    def _index(self, name):
+        """Индекс имени в пространстве; None, если имя не из этого пространства."""
+        if self.sep:
+            prefix, _, number = name.rpartition(self.sep)
+        else:
+            m = re.fullmatch(r"(.*?)(\d+)", name)
+            if m is None:
+                return None
+            prefix, number = m.groups()
+        i = self._prefix_index.get(prefix)
+        if i is None or not number.isdigit() or not self.low <= int(number) <= self.high:
+            return None
+        return (int(number) - self.low) * len(self.prefixes) + i
+
+    def _issued(self, name):
+        """Выдано ли имя этим аллокатором (шаг перестановки уже пройден)."""
+        index = self._index(name)
+        return index is not None and (index - self._offset) * self._inverse % self.size < self._k
+
+    def allocate(self):
+        """Следующее свободное имя (сразу помечается занятым)."""
+        with self._lock:
+            while self._k < self.size:
+                name = self._name((self._offset + self._step * self._k) % self.size)
+                self._k += 1
+                if name not in self.used:
+                    return name
+        raise NameSpaceExhausted(f"Свободных имён не осталось (всего {self.size}).")
+
+    def allocate_many(self, count):
+        return [self.allocate() for _ in range(count)]
+
+    def reserve(self, name):
+        """Помечает имя занятым (например, имя из импортированного CSV)."""
+        with self._lock:
+            if not self._issued(name):
+                self.used.add(name)
+
+    def __contains__(self, name):
+        return name in self.used or self._issued(name)
+
+
+def used_system_names(conn):
+    """Все имена систем в БД (обычных и процедурных)."""
+    return [r[0] for r in conn.execute("SELECT name FROM system_data UNION ALL SELECT name FROM seeded_systems")]
+
+
+def used_planet_names(conn):
+    """Все имена сохранённых планет в БД."""
+    return [r[0] for r in conn.execute("SELECT name FROM planet_data")]
+
+
+def fit_numbers(numbers, prefix_count, needed):
+    """Диапазон номеров, расширенный вверх так, чтобы в нём было не меньше needed имён."""
+    low, high = numbers
+    return low, max(high, low + -(-needed // prefix_count) - 1)
+
+
+def system_name_allocator(used=(), numbers=SYSTEM_NUMBERS, capacity=0):
+    """
+    Аллокатор имён систем вида Kepler-123456.
+    capacity — сколько имён понадобится сверх used; при необходимости диапазон
+    номеров расширяется (в именах становится больше цифр).
+    """
+    used = set(used)
+    low, high = fit_numbers(numbers, len(SYSTEM_PREFIXES), len(used) + capacity)
+    return NameAllocator(SYSTEM_PREFIXES, low, high, sep="-", used=used)
+
+
+def planet_name_allocator(used=(), numbers=PLANET_NUMBERS, capacity=0):
+    """Аллокатор имён планет вида Ari-Prime123 (capacity — как у system_name_allocator)."""
+    prefixes = [p + s for p in PLANET_PREFIXES for s in PLANET_SUFFIXES]
+    used = set(used)
+    low, high = fit_numbers(numbers, len(prefixes), len(used) + capacity)
+    return NameAllocator(prefixes, low, high, used=used)
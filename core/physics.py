@@ -0,0 +1,41 @@
+"""
+Физическая модель для генерации систем.
+
+Все величины считаются по формулам напрямую: в Python это быстрее
+таблиц с интерполяцией (поиск в таблице дороже одного sqrt или exp).
+"""
+import math
+
+SOLAR_TEMPERATURE_K = 5778
+T_EQ_1AU_K = 278.6  # равновесная температура абсолютно чёрного тела на 1 а.е. от Солнца
+SNOW_LINE_AU = 2.7  # снеговая линия для солнечной светимости (в приведённых а.е.)
+
+
+def equilibrium_temperature(distance):
+    """Равновесная температура (K, альбедо 0) на приведённом расстоянии a / sqrt(L), а.е."""
+    return T_EQ_1AU_K / math.sqrt(distance)
+
+
+def life_by_temperature(temperature_c):
+    """Базовая вероятность жизни (%) от температуры поверхности, °C."""
+    return 100.0 * math.exp(-((temperature_c - 15.0) / 35.0) ** 2)
+
+
+def star_luminosity(temperature_k, radius_solar):
+    """Светимость звезды в светимостях Солнца (закон Стефана — Больцмана)."""
+    return radius_solar ** 2 * (temperature_k / SOLAR_TEMPERATURE_K) ** 4
+
+
+def habitable_zone(luminosity):
+    """Границы консервативной зоны обитаемости, а.е."""
+    return math.sqrt(luminosity / 1.1), math.sqrt(luminosity / 0.53)
+
+
+def snow_line(luminosity):
+    """Снеговая линия, а.е."""
+    return SNOW_LINE_AU * math.sqrt(luminosity)
+
+
+def orbital_period_days(orbit_au, star_mass_solar):
+    """Период обращения по третьему закону Кеплера."""
+    return 365.25 * math.sqrt(orbit_au ** 3 / star_mass_solar)
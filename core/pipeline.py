@@ -0,0 +1,345 @@
+"""
+Потоковая генерация: источник -> стадии -> приёмники.
+
+Источник лениво выдаёт системы, стадии — обычные функции «итератор ->
+итератор» (фильтр, изменение полей), приёмники получают системы пачками.
+Каждый приёмник работает в своём потоке и читает из ограниченной очереди:
+если он не успевает, генерация ждёт (backpressure), поэтому память не
+зависит от числа систем.
+
+Запуск:
+    python -m core.pipeline --count 1000000 --db out.sqlite --jsonl out.jsonl [--csv DIR] [--dump out.bin]
+        [--system-numbers 10 999999] [--planet-numbers 1 99999]
+
+Без --system-numbers / --planet-numbers пространства имён расширяются под
+--count (например, для 10 млн систем), иначе берутся заданные диапазоны.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import struct
+import threading
+import time
+from dataclasses import asdict
+from itertools import islice
+
+from core import metrics
+from core.csvio import csv_file_name, write_csv
+from core.database import init_db, get_connection, write_systems
+from core.names import (
+    SYSTEM_NUMBERS, PLANET_NUMBERS, system_name_allocator, planet_name_allocator,
+    used_system_names, used_planet_names
+)
+from core.planet import Planet
+from core.procedural import GENERATOR_VERSION, SeededSystem, generate_system, new_seed
+from core.system import StarSystem
+
+log = logging.getLogger(__name__)
+
+CHUNK = 256  # систем в одной пачке очереди
+MAX_PLANETS = 8  # планет в системе не больше (random_systems по умолчанию)
+QUEUE_SIZE = 8  # пачек в очереди каждого приёмника
+_DONE = object()
+
+
+# источник и стадии
+
+def random_systems(count, version=GENERATOR_VERSION, seeded=False, system_names=None, planet_names=None,
+                   min_planets=4, max_planets=MAX_PLANETS):
+    """
+    Лениво генерирует count систем.
+    Без аллокаторов имена уникальны только внутри прогона (пространства имён
+    рассчитаны на count систем); чтобы не пересечься с каталогом, передайте
+    аллокаторы (см. SystemManager.generate_stream).
+    """
+    system_names = system_names or system_name_allocator(capacity=count)
+    planet_names = planet_names or planet_name_allocator(capacity=0 if seeded else count * max_planets)
+    for _ in range(count):
+        if seeded:
+            yield SeededSystem(system_names.allocate(), new_seed(), version)
+        else:
+            yield generate_system(system_names.allocate(), random, version, min_planets, max_planets,
+                                  planet_namer=planet_names.allocate)
+
+
+def where(predicate):
+    """Стадия: пропускает только системы, для которых predicate(system) истинно."""
+    def stage(systems):
+        return (s for s in systems if predicate(s))
+    return stage
+
+
+def each(fn):
+    """Стадия: вызывает fn(system) (например, чтобы поправить поля) и передаёт систему дальше."""
+    def stage(systems):
+        for s in systems:
+            fn(s)
+            yield s
+    return stage
+
+
+# приёмники
+
+class Sink:
+    """Приёмник систем. write() вызывается из отдельного потока, пачками."""
+
+    def write(self, systems):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SqliteSink(Sink):
+    """
+    Пишет в БД транзакциями по batch систем (процедурные — как seed).
+    replace=False — системы новые: если имя уже занято (его выдал аллокатор
+    другого процесса), прогон останавливается с NameTaken, а не заменяет систему.
+    """
+
+    def __init__(self, db_file=None, batch=1000, replace=True):
+        init_db(db_file)
+        self.db_file = db_file
+        self.batch = batch
+        self.replace = replace
+        self._pending = []
+        self._conn = None
+
+    def write(self, systems):
+        # соединение создаётся в потоке приёмника: sqlite привязывает его к потоку
+        if self._conn is None:
+            self._conn = get_connection(self.db_file)
+        self._pending.extend(systems)
+        if len(self._pending) >= self.batch:
+            self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        if pending:
+            with metrics.timer("pipeline.sqlite_batch"):
+                write_systems(self._conn, pending, self.replace)
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._flush()
+            finally:
+                self._conn.close()
+
+
+class CsvSink(Sink):
+    """По CSV-файлу на систему в каталоге (формат core.csvio, как «Сохранить в CSV»)."""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def write(self, systems):
+        for system in systems:
+            write_csv(os.path.join(self.directory, csv_file_name(system.name)), system)
+
+
+class JsonLinesSink(Sink):
+    """Одна система с планетами на строку JSON."""
+
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, systems):
+        self._file.writelines(json.dumps(asdict(s), ensure_ascii=False) + "\n" for s in systems)
+
+    def close(self):
+        self._file.close()
+
+
+# двоичный дамп: MAGIC, затем записи «длина (uint32) + система»;
+# строки — uint32 длины + UTF-8, числа — как в PLANET_RECORD снимка
+DUMP_MAGIC = b"SSGDUMP1"
+_U32 = struct.Struct("<I")
+_STAR = struct.Struct("<2dI")
+_PLANET = struct.Struct("<6di")
+_PLANET_FLOATS = ("temperature_c", "size_earth", "mass_earth",
+                  "orbital_radius_au", "orbital_period_days", "life_probability")
+_PLANET_STRINGS = ("name", "planet_type", "atmosphere", "image_path", "description")
+
+
+def _pack_str(text):
+    data = (text or "").encode("utf-8")
+    return _U32.pack(len(data)) + data
+
+
+def pack_system(system):
+    """Система в байтах двоичного дампа (без префикса длины)."""
+    parts = [_pack_str(system.name), _pack_str(system.star_name), _pack_str(system.star_type),
+             _STAR.pack(float(system.star_temperature_k), float(system.star_radius_solar), len(system.planets))]
+    for p in system.planets:
+        parts.extend(_pack_str(getattr(p, f)) for f in _PLANET_STRINGS)
+        parts.append(_PLANET.pack(*(float(getattr(p, f)) for f in _PLANET_FLOATS), int(p.satellites)))
+    return b"".join(parts)
+
+
+def unpack_system(data):
+    """Обратное к pack_system."""
+    pos = 0
+
+    def string():
+        nonlocal pos
+        (n,) = _U32.unpack_from(data, pos)
+        pos += _U32.size + n
+        return data[pos - n:pos].decode("utf-8")
+
+    name, star_name, star_type = string(), string(), string()
+    temp, radius, count = _STAR.unpack_from(data, pos)
+    pos += _STAR.size
+    planets = []
+    for _ in range(count):
+        fields = {f: string() for f in _PLANET_STRINGS}
+        values = _PLANET.unpack_from(data, pos)
+        pos += _PLANET.size
+        fields.update(zip(_PLANET_FLOATS, values[:6]), satellites=values[6])
+        planets.append(Planet(**fields))
+    return StarSystem(name=name, star_name=star_name, star_type=star_type,
+                      star_temperature_k=int(temp), star_radius_solar=radius, planets=planets)
+
+
+class DumpSink(Sink):
+    """Двоичный дамп систем; читается обратно через read_dump."""
+
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self._file.write(DUMP_MAGIC)
+
+    def write(self, systems):
+        for system in systems:
+            data = pack_system(system)
+            self._file.write(_U32.pack(len(data)) + data)
+
+    def close(self):
+        self._file.close()
+
+
+def read_dump(path):
+    """Системы из двоичного дампа, по одной."""
+    with open(path, "rb") as f:
+        if f.read(len(DUMP_MAGIC)) != DUMP_MAGIC:
+            raise ValueError(f"Файл '{path}' не является дампом систем.")
+        while True:
+            head = f.read(_U32.size)
+            if not head:
+                break
+            yield unpack_system(f.read(_U32.unpack(head)[0]))
+
+
+# запуск
+
+def _consume(sink, q, errors):
+    """Поток приёмника; после ошибки продолжает вычитывать очередь, чтобы не остановить источник."""
+    failed = False
+    while True:
+        batch = q.get()
+        if batch is _DONE:
+            break
+        if failed:
+            continue
+        try:
+            sink.write(batch)
+        except Exception as e:
+            errors.append(e)
+            failed = True
+    try:
+        sink.close()
+    except Exception as e:
+        errors.append(e)
+
+
+def run(source, sinks, stages=(), chunk=CHUNK, queue_size=QUEUE_SIZE):
+    """
+    Прогоняет системы источника через стадии во все приёмники.
+    Возвращает число систем; ошибка любого приёмника останавливает прогон и пробрасывается.
+    """
+    systems = iter(source)
+    for stage in stages:
+        systems = stage(systems)
+
+    errors = []
+    queues = [queue.Queue(maxsize=queue_size) for _ in sinks]
+    threads = [threading.Thread(target=_consume, args=(sink, q, errors), daemon=True)
+               for sink, q in zip(sinks, queues)]
+    for t in threads:
+        t.start()
+
+    total = 0
+    try:
+        while not errors:
+            batch = list(islice(systems, chunk))
+            if not batch:
+                break
+            for q in queues:
+                q.put(batch)  # ждёт, если приёмник отстаёт
+            total += len(batch)
+            metrics.count("pipeline.systems", len(batch))
+    finally:
+        for q in queues:
+            q.put(_DONE)
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Потоковая генерация систем")
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--seeded", action="store_true", help="процедурные системы (в БД пишется только seed)")
+    parser.add_argument("--version", type=int, default=GENERATOR_VERSION, help="версия генератора")
+    parser.add_argument("--db", help="БД sqlite (имена не пересекутся с уже сохранёнными)")
+    parser.add_argument("--csv", help="каталог для CSV-файлов")
+    parser.add_argument("--jsonl", help="файл JSON Lines")
+    parser.add_argument("--dump", help="файл двоичного дампа")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="пачек в очереди приёмника")
+    parser.add_argument("--system-numbers", type=int, nargs=2, metavar=("LOW", "HIGH"),
+                        help=f"диапазон номеров в именах систем (по умолчанию {SYSTEM_NUMBERS}, "
+                             f"расширенный под --count)")
+    parser.add_argument("--planet-numbers", type=int, nargs=2, metavar=("LOW", "HIGH"),
+                        help=f"диапазон номеров в именах планет (по умолчанию {PLANET_NUMBERS}, "
+                             f"расширенный под --count)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    sinks = []
+    used_systems, used_planets = (), ()
+    if args.db:
+        sinks.append(SqliteSink(args.db, replace=False))
+        conn = get_connection(args.db)
+        used_systems, used_planets = used_system_names(conn), used_planet_names(conn)
+        conn.close()
+    if args.csv:
+        sinks.append(CsvSink(args.csv))
+    if args.jsonl:
+        sinks.append(JsonLinesSink(args.jsonl))
+    if args.dump:
+        sinks.append(DumpSink(args.dump))
+    if not sinks:
+        parser.error("укажите хотя бы один приёмник: --db, --csv, --jsonl или --dump")
+
+    start = time.perf_counter()
+    if args.system_numbers:
+        system_names = system_name_allocator(used_systems, args.system_numbers)
+    else:
+        system_names = system_name_allocator(used_systems, capacity=args.count)
+    if args.planet_numbers:
+        planet_names = planet_name_allocator(used_planets, args.planet_numbers)
+    else:
+        planet_names = planet_name_allocator(used_planets, capacity=0 if args.seeded else args.count * MAX_PLANETS)
+    total = run(random_systems(args.count, args.version, args.seeded, system_names, planet_names),
+                sinks, queue_size=args.queue_size)
+    elapsed = time.perf_counter() - start
+    log.info(f"Систем: {total} за {elapsed:.1f} с ({total / elapsed if elapsed else 0:.0f}/с)")
+
+
+if __name__ == "__main__":
+    main()
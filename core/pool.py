@@ -0,0 +1,105 @@
+"""
+Запас готовых систем для кнопки «Сгенерировать систему».
+
+Фоновый поток заранее генерирует системы и вызывает для каждой prepare
+(окно прогревает в нём картинки планет). take() отдаёт готовую систему без
+ожидания генерации; когда в запасе остаётся меньше low_water систем, поток
+пополняет его до size. Если запас пуст, система создаётся на месте.
+
+Системы запаса живут только в памяти: в базу система пишется в take(), поэтому
+невыданные системы не видны ни каталогу, ни другим читателям базы и не
+остаются в ней после падения программы.
+"""
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from core import metrics
+
+log = logging.getLogger(__name__)
+
+POOL_SIZE = 8
+LOW_WATER = 3
+RETRY_DELAY = 5.0  # секунд до новой попытки, если генерация не удалась (например, база занята)
+
+
+class SystemPool:
+    """Запас систем, сгенерированных manager.create_random_system(save=False) в фоне."""
+
+    def __init__(self, manager, size=POOL_SIZE, low_water=LOW_WATER, prepare=None):
+        if not 0 <= low_water <= size:
+            raise ValueError("low_water должен быть от 0 до size.")
+        self.manager = manager
+        self.size = size
+        self.low_water = low_water
+        self.prepare = prepare
+        self._ready = deque()
+        self._lock = threading.Lock()  # _ready
+        self._producing = threading.Lock()  # держится, пока создаётся одна система
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="system-pool", daemon=True)
+
+    def start(self):
+        self._wake.set()
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Останавливает поток; невыданные системы отбрасываются."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        with self._lock:
+            self._ready.clear()
+
+    def __len__(self):
+        return len(self._ready)
+
+    def take(self):
+        """Готовая система, сохранённая в базу; при пустом запасе создаётся сразу."""
+        with self._lock:
+            system = self._ready.popleft() if self._ready else None
+            low = len(self._ready) < self.low_water
+        if low:
+            self._wake.set()
+        if system is None:
+            metrics.count("pool.miss")
+            system = self.manager.create_random_system()
+            if self.prepare:
+                self.prepare(system)
+        else:
+            self.manager.save_new_systems_to_db([system])
+        return system
+
+    @contextmanager
+    def paused(self):
+        """
+        Блок, во время которого поток не создаёт систем (например, очистка базы
+        или замер); запас сбрасывается и после блока наполняется заново.
+        """
+        with self._producing:
+            with self._lock:
+                self._ready.clear()
+            yield
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            while not self._stop.is_set() and len(self._ready) < self.size:
+                try:
+                    with self._producing:
+                        system = self.manager.create_random_system(save=False)
+                        if self.prepare:
+                            self.prepare(system)
+                        with self._lock:
+                            self._ready.append(system)
+                except Exception as e:
+                    log.warning(f"Не удалось пополнить запас систем: {e}")
+                    self._stop.wait(RETRY_DELAY)
+                    self._wake.set()
+                    break
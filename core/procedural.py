@@ -0,0 +1,288 @@
+"""
+Детерминированная генерация систем по (версия генератора, seed).
+
+Каждая версия генератора заморожена: одинаковые (версия, seed) всегда дают
+одну и ту же звезду и одни и те же планеты. Менять модель генерации можно
+только добавлением новой версии в GENERATORS.
+"""
+import math
+import random
+from dataclasses import fields
+from core import physics
+from core.planet import Planet
+from core.system import StarSystem
+
+GENERATOR_VERSION = 2
+
+PLANET_IMAGES = [
+    "data/planet_images/random_planet_1.png",
+    "data/planet_images/random_planet_2.png",
+    "data/planet_images/random_planet_3.png",
+    "data/planet_images/random_planet_4.png",
+    "data/planet_images/random_planet_5.png",
+    "data/planet_images/random_planet_6.png",
+    "data/planet_images/random_planet_7.png",
+    "data/planet_images/random_planet_8.png",
+    "data/planet_images/black_hole.png"
+]
+DEFAULT_IMAGE = "data/planet_images/земля.png"
+
+# Словари версий 1 и 2 — не менять, от них зависит воспроизводимость
+PLANET_PREFIXES = ["Ari", "Zor", "Orv", "Ke", "Tau", "Pro", "Xen", "Eri", "Vela", "Luma", "Oph", "Hydra", "Draco"]
+PLANET_SUFFIXES = ["-I", "-II", "-III", "-Prime", "b", "c", "d", "IV", "V", "-α", "-β"]
+SYSTEM_PREFIXES = ["Kepler", "Gliese", "Tau", "HD", "Alpha", "Sigma", "Epsilon", "Zeta", "Beta"]
+STAR_NAMES = ["Helios", "Vega", "Altair", "Rigel", "Solis", "Nova", "Aster", "Centra", "Aurion"]
+STAR_TYPES = ["Жёлтый карлик", "Красный гигант", "Белый карлик"]
+PLANET_TYPES = ["Каменистая", "Газовый гигант", "Ледяная", "Пустынная", "Океаническая"]
+ATMOSPHERES = ["N2-O2", "CO2", "H2-He", "Methane"]
+
+# Типы полей Planet — для приведения пользовательских правок из БД
+PLANET_FIELD_TYPES = {f.name: f.type for f in fields(Planet)}
+
+
+def random_planet_name(rng=random):
+    return rng.choice(PLANET_PREFIXES) + rng.choice(PLANET_SUFFIXES) + str(rng.randint(1, 999))
+
+
+def random_star_name(rng=random):
+    return rng.choice(STAR_NAMES)
+
+
+# Версия 1
+
+def _star_v1(rng):
+    """Параметры звезды (без имени системы)."""
+    return {
+        "star_name": random_star_name(rng),
+        "star_type": rng.choice(STAR_TYPES),
+        "star_temperature_k": rng.randint(3000, 10000),
+        "star_radius_solar": round(rng.uniform(0.5, 2.5), 2),
+    }
+
+
+def _planets_v1(rng, star, min_planets=4, max_planets=8, namer=None):
+    """
+    Планеты системы; параметры звезды в версии 1 не учитываются.
+    namer — внешний источник уникальных имён (не для процедурных систем).
+    """
+    count = rng.randint(min_planets, max_planets)
+    image_files = list(PLANET_IMAGES)
+    planets = []
+    for i in range(count):
+        orbit = round(0.4 + i * 0.4, 2)
+        temp = round(300 - orbit * rng.uniform(25, 60), 1)
+        size = round(rng.uniform(0.3, 10.0), 2)
+        ptype = rng.choice(PLANET_TYPES)
+        atm = rng.choice(ATMOSPHERES)
+
+        img = image_files.pop() if image_files else DEFAULT_IMAGE
+
+        pl = Planet(
+            name=namer() if namer else random_planet_name(rng),
+            temperature_c=temp,
+            size_earth=size,
+            mass_earth=round(size * rng.uniform(0.5, 2.5), 2),
+            orbital_radius_au=orbit,
+            orbital_period_days=round(365 * (orbit ** 1.5), 1),
+            planet_type=ptype,
+            atmosphere=atm,
+            life_probability=round(rng.uniform(0, 80), 1),
+            satellites=rng.randint(0, 5),
+            image_path=img,
+            description=f"Генерированная планета {ptype}"
+        )
+        pl.generate_description()
+        planets.append(pl)
+    return planets
+
+
+# Версия 2: параметры планет выводятся из звезды (core.physics)
+
+# тип звезды -> (вес, диапазон температуры K, радиуса R☉, массы M☉)
+STAR_CLASSES_V2 = {
+    "Красный карлик": (0.45, (2500, 3900), (0.1, 0.6), (0.08, 0.6)),
+    "Жёлтый карлик": (0.30, (5200, 6000), (0.85, 1.15), (0.8, 1.2)),
+    "Красный гигант": (0.15, (3300, 4500), (10.0, 100.0), (0.8, 3.0)),
+    "Белый карлик": (0.10, (8000, 25000), (0.008, 0.02), (0.5, 1.0)),
+}
+
+# тип планеты -> (радиус R⊕, показатель степени масса/радиус, (1 - альбедо) ** 0.25, спутники)
+PLANET_CLASSES_V2 = {
+    "Каменистая": ((0.3, 1.8), 3.0, 0.7 ** 0.25, (0, 2)),
+    "Пустынная": ((0.4, 1.5), 3.0, 0.75 ** 0.25, (0, 2)),
+    "Океаническая": ((0.8, 2.5), 2.7, 0.7 ** 0.25, (0, 3)),
+    "Ледяная": ((2.0, 5.0), 2.0, 0.7 ** 0.25, (1, 15)),
+    "Газовый гигант": ((4.0, 12.0), 2.3, 0.66 ** 0.25, (2, 30)),
+}
+
+# парниковый эффект атмосферы, °C
+GREENHOUSE = {"N2-O2": 33.0, "CO2": 60.0, "H2-He": 0.0, "Methane": 20.0}
+# множители вероятности жизни
+LIFE_BY_ATMOSPHERE = {"N2-O2": 1.0, "CO2": 0.4, "H2-He": 0.05, "Methane": 0.3}
+LIFE_BY_TYPE = {"Каменистая": 0.8, "Пустынная": 0.4, "Океаническая": 1.0, "Ледяная": 0.1, "Газовый гигант": 0.02}
+
+
+def _star_mass_v2(star):
+    """Масса звезды, массы Солнца: то же место в диапазоне масс типа, что и температура (без rng)."""
+    _, (t_lo, t_hi), _, (m_lo, m_hi) = STAR_CLASSES_V2[star["star_type"]]
+    t = (star["star_temperature_k"] - t_lo) / (t_hi - t_lo)
+    return m_lo + (m_hi - m_lo) * t
+
+
+def _star_v2(rng):
+    """Тип звезды выбирается первым, температура и радиус согласованы с ним."""
+    types = list(STAR_CLASSES_V2)
+    star_type = rng.choices(types, weights=[STAR_CLASSES_V2[t][0] for t in types])[0]
+    _, (t_lo, t_hi), (r_lo, r_hi), _ = STAR_CLASSES_V2[star_type]
+    t = rng.random()
+    return {
+        "star_name": random_star_name(rng),
+        "star_type": star_type,
+        "star_temperature_k": int(t_lo + (t_hi - t_lo) * t),
+        "star_radius_solar": round(r_lo + (r_hi - r_lo) * t, 3),
+    }
+
+
+def _planets_v2(rng, star, min_planets=4, max_planets=8, namer=None):
+    """
+    Орбиты, тип, температура и вероятность жизни планет выводятся из светимости звезды:
+    в зоне обитаемости — каменистые и океанические, вне её до снеговой линии —
+    каменистые и пустынные, за снеговой линией — гиганты и ледяные.
+    """
+    luminosity = physics.star_luminosity(star["star_temperature_k"], star["star_radius_solar"])
+    scale = math.sqrt(luminosity)
+    hz_inner, hz_outer = physics.habitable_zone(luminosity)
+    snow_line = physics.snow_line(luminosity)
+    star_mass = _star_mass_v2(star)
+
+    count = rng.randint(min_planets, max_planets)
+    image_files = list(PLANET_IMAGES)
+    planets = []
+    orbit = rng.uniform(0.2, 0.6) * scale
+    for i in range(count):
+        if i:
+            orbit *= rng.uniform(1.4, 2.0)
+        distance = orbit / scale  # приведённое расстояние: 1 — как Земля у Солнца
+
+        atm = rng.choice(ATMOSPHERES)
+        if orbit > snow_line:
+            ptype = "Газовый гигант" if rng.random() < 0.6 else "Ледяная"
+            atm = "H2-He" if ptype == "Газовый гигант" else rng.choice(["H2-He", "Methane"])
+        elif hz_inner <= orbit <= hz_outer:
+            ptype = rng.choice(["Каменистая", "Океаническая"])
+        else:
+            ptype = rng.choice(["Каменистая", "Пустынная"])
+
+        (size_lo, size_hi), mass_power, absorption, (sat_lo, sat_hi) = PLANET_CLASSES_V2[ptype]
+        size = round(rng.uniform(size_lo, size_hi), 2)
+        temp = physics.equilibrium_temperature(distance) * absorption - 273.15 + GREENHOUSE[atm]
+        life = (physics.life_by_temperature(temp) * LIFE_BY_TYPE[ptype] * LIFE_BY_ATMOSPHERE[atm]
+                * rng.uniform(0.7, 1.0))
+
+        img = image_files.pop() if image_files else DEFAULT_IMAGE
+
+        pl = Planet(
+            name=namer() if namer else random_planet_name(rng),
+            temperature_c=round(temp, 1),
+            size_earth=size,
+            mass_earth=round(size ** mass_power * rng.uniform(0.8, 1.2), 2),
+            orbital_radius_au=round(orbit, 3),
+            orbital_period_days=round(physics.orbital_period_days(orbit, star_mass), 1),
+            planet_type=ptype,
+            atmosphere=atm,
+            life_probability=round(life, 1),
+            satellites=rng.randint(sat_lo, sat_hi),
+            image_path=img,
+            description=f"Генерированная планета {ptype}"
+        )
+        pl.generate_description()
+        planets.append(pl)
+    return planets
+
+
+# версия -> (звезда, планеты)
+GENERATORS = {
+    1: (_star_v1, _planets_v1),
+    2: (_star_v2, _planets_v2),
+}
+
+
+def generate_system(name, rng=random, version=GENERATOR_VERSION, min_planets=4, max_planets=8,
+                    planet_namer=None):
+    """Полностью сгенерированная система (звезда и планеты) из генератора rng."""
+    star_fn, planets_fn = GENERATORS[version]
+    star = star_fn(rng)
+    planets = planets_fn(rng, star, min_planets, max_planets, planet_namer)
+    return StarSystem(name=name, planets=planets, **star)
+
+
+def new_seed():
+    """Случайный seed, помещающийся в INTEGER SQLite."""
+    return random.getrandbits(63)
+
+
+class SeededSystem(StarSystem):
+    """
+    Система, заданная (версия генератора, seed) и правками пользователя.
+    Звезда восстанавливается сразу, планеты — при первом обращении к planets.
+
+    В базе хранятся только seed и правки: планет нет в planet_data, поэтому
+    их не видят запросы по планетам (core.query), статистика (core.stats),
+    полнотекстовый поиск и поиск похожих (core.similarity).
+
+    Сравнение и repr — по seed и правкам, без генерации планет.
+    """
+
+    def __init__(self, name, seed, generator_version=GENERATOR_VERSION, overrides=None):
+        if generator_version not in GENERATORS:
+            raise ValueError(f"Неизвестная версия генератора: {generator_version}")
+        self.seed = seed
+        self.generator_version = generator_version
+        self.overrides = dict(overrides or {})  # (индекс планеты, поле) -> значение
+
+        rng = random.Random(seed)
+        star_fn, _ = GENERATORS[generator_version]
+        star = star_fn(rng)
+        self._planet_seed = rng.getrandbits(64)
+        self._star = star
+        super().__init__(name=name, planets=None, **star)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return ((self.name, self.seed, self.generator_version, self.overrides)
+                == (other.name, other.seed, other.generator_version, other.overrides))
+
+    __hash__ = None  # изменяемая, как и StarSystem
+
+    def __repr__(self):
+        return (f"SeededSystem(name={self.name!r}, seed={self.seed}, "
+                f"generator_version={self.generator_version}, overrides={self.overrides!r})")
+
+    @property
+    def planets(self):
+        if self._planets is None:
+            _, planets_fn = GENERATORS[self.generator_version]
+            planets = planets_fn(random.Random(self._planet_seed), self._star)
+            for (idx, field_name), value in self.overrides.items():
+                if 0 <= idx < len(planets):
+                    setattr(planets[idx], field_name, value)
+            self._planets = planets
+        return self._planets
+
+    @planets.setter
+    def planets(self, value):
+        self._planets = value
+
+    def set_override(self, index, field_name, value):
+        """Запоминает правку планеты (например, image_path) поверх сгенерированных данных."""
+        if field_name not in PLANET_FIELD_TYPES:
+            raise ValueError(f"Неизвестное поле планеты: {field_name}")
+        self.overrides[(index, field_name)] = value
+        if self._planets is not None and 0 <= index < len(self._planets):
+            setattr(self._planets[index], field_name, value)
+
+
+def cast_override(field_name, raw):
+    """Значение правки из БД (TEXT) -> тип поля Planet."""
+    return PLANET_FIELD_TYPES[field_name](raw)
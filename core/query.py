@@ -0,0 +1,249 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from core.planet import Planet
+from core.system import StarSystem
+from core import metrics
+from core.database import LOOKUPS, get_connection, has_fts
+from core.procedural import SeededSystem, cast_override
+
+# Числовые поля, по которым можно задавать диапазоны (min, max).
+# Фильтры строятся по таблицам planet_data (p) и system_data (s), а строки
+# страницы читаются из представлений planets / systems только для её id.
+PLANET_RANGES = {
+    "life_probability": "p.life_probability",
+    "temperature_c": "p.temperature_c",
+    "orbital_radius_au": "p.orbital_radius_au",
+    "star_temperature": "s.star_temperature",
+}
+
+PLANET_COLUMNS = """
+    p.id, p.system_name, p.name, p.temperature_c, p.size_earth, p.mass_earth,
+    p.orbital_radius_au, p.orbital_period_days, p.planet_type, p.atmosphere,
+    p.life_probability, p.satellites, p.image_path, p.description
+"""
+
+
+@dataclass
+class Page:
+    """Одна страница результатов запроса."""
+    items: list = field(default_factory=list)
+    next_cursor: int | None = None  # id, с которого начинается следующая страница
+
+
+@contextmanager
+def _connection(db_file=None, conn=None):
+    """Переданное соединение (не закрывается) или новое к db_file."""
+    if conn is not None:
+        yield conn
+        return
+    conn = get_connection(db_file)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _range(where, params, column, bounds):
+    """Добавляет условие диапазона; любая из границ может быть None."""
+    if bounds is None:
+        return
+    lo, hi = bounds
+    if lo is not None:
+        where.append(f"{column} >= ?")
+        params.append(lo)
+    if hi is not None:
+        where.append(f"{column} <= ?")
+        params.append(hi)
+
+
+def _one_of(where, params, column, values):
+    """Условие равенства (строка) или принадлежности (список значений)."""
+    if values is None:
+        return
+    if isinstance(values, str):
+        values = [values]
+    values = list(values)
+    where.append(f"{column} IN ({', '.join('?' * len(values))})")
+    params.extend(values)
+
+
+def _lookup(where, params, column, table, values):
+    """Условие по значению из справочника: column — id в таблице-справочнике table."""
+    if values is None:
+        return
+    sub = []
+    _one_of(sub, params, LOOKUPS[table], values)
+    where.append(f"{column} IN (SELECT id FROM {table} WHERE {sub[0]})")
+
+
+def fts_phrases(text):
+    """
+    Текст поиска -> запрос FTS5: каждое слово — отдельная фраза в кавычках (все слова обязательны).
+    Так значения вроде «N2-O2» не разбираются как синтаксис запроса.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def _planet_filters(conn, where, params, planet_type=None, atmosphere=None, text=None, **ranges):
+    """Собирает условия WHERE для планет (planet_data p, system_data s)."""
+    for key, bounds in ranges.items():
+        if key not in PLANET_RANGES:
+            raise ValueError(f"Неизвестное поле диапазона: {key}")
+        _range(where, params, PLANET_RANGES[key], bounds)
+    _lookup(where, params, "p.type_id", "planet_types", planet_type)
+    _lookup(where, params, "p.atmosphere_id", "atmospheres", atmosphere)
+    if text and text.strip():
+        if has_fts(conn):
+            where.append("p.id IN (SELECT rowid FROM planets_fts WHERE planets_fts MATCH ?)")
+            params.append(fts_phrases(text))
+        else:
+            where.append("p.id IN (SELECT id FROM planets WHERE description LIKE ?)")
+            params.append(f"%{text}%")
+
+
+def planet_from_row(row):
+    """Строка (name, ..., description) таблицы planets -> Planet."""
+    (pname, temp, size, mass, orbit, period, ptype, atm, life, sats, img, desc) = row
+    return Planet(
+        name=pname,
+        temperature_c=float(temp),
+        size_earth=float(size),
+        mass_earth=float(mass),
+        orbital_radius_au=float(orbit),
+        orbital_period_days=float(period),
+        planet_type=ptype,
+        atmosphere=atm,
+        life_probability=float(life),
+        satellites=int(sats),
+        image_path=img,
+        description=desc
+    )
+
+
+def planet_rows(cursor=0, page_size=100, db_file=None, conn=None, **filters):
+    """Строки страницы query_planets в порядке id: (id, имя системы, поля planet_from_row)."""
+    with _connection(db_file, conn) as conn:
+        where, params = ["p.id > ?"], [cursor]
+        _planet_filters(conn, where, params, **filters)
+        join = "JOIN system_data s ON s.id = p.system_id" if filters.get("star_temperature") else ""
+        return conn.execute(f"""
+            SELECT {PLANET_COLUMNS} FROM planets p WHERE p.id IN (
+                SELECT p.id FROM planet_data p {join}
+                WHERE {' AND '.join(where)}
+                ORDER BY p.id LIMIT ?
+            )
+            ORDER BY p.id
+        """, (*params, page_size)).fetchall()
+
+
+@metrics.timed("db.query_planets")
+def query_planets(cursor=0, page_size=100, db_file=None, conn=None, **filters):
+    """
+    Одна страница планет, подходящих под фильтры.
+    Фильтры: диапазоны life_probability, temperature_c, orbital_radius_au,
+    star_temperature — кортежи (min, max); planet_type, atmosphere — строка
+    или список; text — полнотекстовый запрос по описанию (FTS5).
+    Элементы страницы — пары (имя системы, Planet). Ищутся только планеты
+    planet_data: планеты процедурных систем не хранятся и в выборку не попадают.
+    """
+    rows = planet_rows(cursor, page_size, db_file, conn, **filters)
+    items = [(row[1], planet_from_row(row[2:])) for row in rows]
+    next_cursor = rows[-1][0] if len(rows) == page_size else None
+    return Page(items, next_cursor)
+
+
+def iter_planets(page_size=1000, db_file=None, **filters):
+    """Потоково выдаёт (имя системы, Planet) постранично, не загружая всё сразу."""
+    cursor = 0
+    while cursor is not None:
+        page = query_planets(cursor, page_size, db_file, **filters)
+        yield from page.items
+        cursor = page.next_cursor
+
+
+@metrics.timed("db.query_systems")
+def query_systems(cursor=0, page_size=100, db_file=None, star_type=None, star_temperature=None,
+                  with_planets=False, conn=None, **planet_filters):
+    """
+    Одна страница систем. star_type и star_temperature фильтруют звезду;
+    остальные фильтры (как в query_planets) отбирают системы, в которых
+    есть хотя бы одна подходящая планета.
+    """
+    with _connection(db_file, conn) as conn:
+        where, params = ["s.id > ?"], [cursor]
+        _lookup(where, params, "s.star_type_id", "star_types", star_type)
+        _range(where, params, "s.star_temperature", star_temperature)
+        if planet_filters:
+            sub, sub_params = ["p.system_id = s.id"], []
+            _planet_filters(conn, sub, sub_params, **planet_filters)
+            where.append(f"EXISTS (SELECT 1 FROM planet_data p WHERE {' AND '.join(sub)})")
+            params.extend(sub_params)
+        rows = conn.execute(f"""
+            SELECT s.id, s.name, s.star_name, t.name, s.star_temperature, s.star_radius
+            FROM system_data s JOIN star_types t ON t.id = s.star_type_id
+            WHERE {' AND '.join(where)}
+            ORDER BY s.id LIMIT ?
+        """, (*params, page_size)).fetchall()
+
+        items = []
+        for _, name, star_name, star_type_, star_temp, star_radius in rows:
+            planets = []
+            if with_planets:
+                planet_rows = conn.execute(f"""
+                    SELECT {PLANET_COLUMNS} FROM planets p WHERE p.system_name = ? ORDER BY p.id
+                """, (name,)).fetchall()
+                planets = [planet_from_row(r[2:]) for r in planet_rows]
+            items.append(StarSystem(
+                name=name,
+                star_name=star_name,
+                star_type=star_type_,
+                star_temperature_k=int(star_temp),
+                star_radius_solar=float(star_radius),
+                planets=planets
+            ))
+
+    next_cursor = rows[-1][0] if len(rows) == page_size else None
+    return Page(items, next_cursor)
+
+
+def iter_systems(page_size=1000, db_file=None, **filters):
+    """Потоково выдаёт StarSystem постранично."""
+    cursor = 0
+    while cursor is not None:
+        page = query_systems(cursor, page_size, db_file, **filters)
+        yield from page.items
+        cursor = page.next_cursor
+
+
+def iter_catalog(page_size=1000, db_file=None):
+    """
+    Весь каталог с планетами: обычные системы постранично, затем процедурные
+    (их планеты восстанавливаются из seed при обращении).
+    """
+    yield from iter_systems(page_size, db_file, with_planets=True)
+    yield from iter_seeded(db_file)
+
+
+def iter_seeded(db_file=None, conn=None, name=None):
+    """Процедурные системы (все или одна по имени) с правками пользователя."""
+    where, params = ("WHERE system_name = ?", (name,)) if name is not None else ("", ())
+    with _connection(db_file, conn) as conn:
+        overrides = {}
+        for sys_name, idx, field_name, value in conn.execute(
+                f"SELECT system_name, planet_index, field, value FROM planet_overrides {where}", params):
+            overrides.setdefault(sys_name, {})[(idx, field_name)] = cast_override(field_name, value)
+        rows = conn.execute(
+            f"SELECT name, generator_version, seed FROM seeded_systems {where.replace('system_name', 'name')} "
+            "ORDER BY name", params)
+        for sys_name, version, seed in rows:
+            yield SeededSystem(sys_name, seed, version, overrides.get(sys_name))
+
+
+def get_system(name, db_file=None, conn=None):
+    """Одна система по имени (обычная или процедурная) или None."""
+    with _connection(db_file, conn) as conn:
+        row = conn.execute("SELECT id FROM system_data WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            page = query_systems(row[0] - 1, 1, conn=conn, with_planets=True)
+            return page.items[0] if page.items else None
+        return next(iter_seeded(conn=conn, name=name), None)
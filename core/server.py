@@ -0,0 +1,330 @@
+"""
+Локальный HTTP/JSON-сервис поверх каталога (только стандартная библиотека).
+
+Запуск:
+    python -m core.server --port 8765 [--db data/systems.sqlite]
+
+Эндпоинты:
+    GET  /systems/<имя>               — система с планетами
+    GET  /planets?<фильтры>           — страница планет (фильтры как в core.query)
+    POST /generate?count=N[&seeded=1] — сгенерировать N систем, вернуть их имена
+    GET  /export                      — весь каталог в JSON Lines (chunked)
+
+Блокирующие вызовы sqlite выполняются в пуле потоков, каждый со своим
+соединением из небольшого пула; горячие системы кэшируются готовым JSON.
+Ключ кэша включает PRAGMA data_version, который меняется после любой записи
+в базу другим соединением (приложение, pipeline, merge, импорт, генерация
+здесь же), поэтому устаревший ответ не отдаётся.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from core import maintenance, metrics, query
+from core.database import DB_FILE
+from core.generator import SystemManager
+from core.names import SYSTEM_NUMBERS, PLANET_NUMBERS
+
+log = logging.getLogger(__name__)
+
+# параметры запроса /planets -> аргументы query_planets
+RANGE_PARAMS = ("life_probability", "temperature_c", "orbital_radius_au", "star_temperature")
+MAX_PAGE_SIZE = 1000
+MAX_GENERATE = 10000
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ConnectionPool:
+    """Фиксированный набор соединений sqlite для потоков-исполнителей."""
+
+    def __init__(self, db_file, size=4):
+        self._free = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(db_file, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self._free.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._free.get()
+        try:
+            yield conn
+        finally:
+            self._free.put(conn)
+
+    def close(self):
+        while not self._free.empty():
+            self._free.get().close()
+
+
+class LruCache:
+    """Кэш готовых ответов (bytes) с вытеснением давно не использованных."""
+
+    def __init__(self, max_items=1024):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+
+def _json(obj):
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _system_dict(system):
+    """Система вместе с планетами (у процедурных они восстанавливаются здесь)."""
+    return asdict(system)
+
+
+class CatalogServer:
+    """Обработчик запросов; один экземпляр на процесс."""
+
+    def __init__(self, db_file=None, pool_size=4, workers=8, cache_size=1024,
+                 system_numbers=SYSTEM_NUMBERS, planet_numbers=PLANET_NUMBERS):
+        self.db_file = db_file or DB_FILE
+        # менеджер нужен только для записи (генерация); записи идут по одной
+        self.manager = SystemManager(db_file=self.db_file, preload=False,
+                                     system_numbers=system_numbers, planet_numbers=planet_numbers)
+        self._write_lock = threading.Lock()
+        self.pool = ConnectionPool(self.db_file, pool_size)
+        # только для PRAGMA data_version; используется лишь из цикла событий
+        self._version_conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = LruCache(cache_size)
+        self.maintenance = maintenance.Scheduler(self.db_file).start()
+
+    def catalog_version(self):
+        """Меняется после каждой записи в базу другим соединением."""
+        return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    async def _run(self, fn, *args):
+        """Выполняет блокирующую функцию в пуле потоков."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # обработчики (выполняются в пуле потоков)
+
+    def _load_system(self, name):
+        with self.pool.connection() as conn:
+            system = query.get_system(name, conn=conn)
+        return None if system is None else _json(_system_dict(system))
+
+    def _query_planets(self, params):
+        filters = {}
+        for key in RANGE_PARAMS:
+            lo, hi = params.get(f"{key}_min"), params.get(f"{key}_max")
+            if lo is not None or hi is not None:
+                filters[key] = (float(lo) if lo is not None else None, float(hi) if hi is not None else None)
+        for key in ("planet_type", "atmosphere"):
+            if key in params:
+                filters[key] = params[key].split(",")
+        if "text" in params:
+            filters["text"] = params["text"]
+        cursor = int(params.get("cursor", 0))
+        limit = min(int(params.get("limit", 100)), MAX_PAGE_SIZE)
+        with self.pool.connection() as conn:
+            page = query.query_planets(cursor, limit, conn=conn, **filters)
+        return _json({
+            "items": [dict(asdict(p), system_name=sys_name) for sys_name, p in page.items],
+            "next_cursor": page.next_cursor,
+        })
+
+    def _generate(self, count, seeded):
+        with self._write_lock:
+            if seeded:
+                systems = self.manager.generate_seeded_systems(count)
+            else:
+                systems = [self.manager.generate_random_system() for _ in range(count)]
+            # сервер читает из БД — список систем менеджера не копим
+            self.manager.replace_systems([])
+        return _json({"generated": [s.name for s in systems]})
+
+    # маршрутизация
+
+    async def handle(self, method, path, params):
+        """Возвращает (статус, тело) или асинхронный генератор частей для потоковых ответов."""
+        metrics.count(f"http.{method}")
+        if method == "GET" and path.startswith("/systems/"):
+            name = unquote(path[len("/systems/"):])
+            # записи прежних версий базы больше не совпадают по ключу и вытесняются сами
+            key = (self.catalog_version(), name)
+            body = self.cache.get(key)
+            if body is None:
+                body = await self._run(self._load_system, name)
+                if body is None:
+                    raise HttpError(404, f"Система '{name}' не найдена.")
+                self.cache.put(key, body)
+            return 200, body
+        if method == "GET" and path == "/planets":
+            return 200, await self._run(self._query_planets, params)
+        if method == "POST" and path == "/generate":
+            count = int(params.get("count", 1))
+            if not 1 <= count <= MAX_GENERATE:
+                raise HttpError(400, f"count должен быть от 1 до {MAX_GENERATE}.")
+            return 200, await self._run(self._generate, count, params.get("seeded") == "1")
+        if method == "GET" and path == "/export":
+            return 200, self._export()
+        raise HttpError(404, "Неизвестный адрес.")
+
+    async def _export(self, batch=500):
+        """Весь каталог построчно; чтение идёт пачками в отдельном потоке."""
+        # соединение sqlite привязано к потоку, поэтому у выгрузки свой поток
+        executor = ThreadPoolExecutor(max_workers=1)
+        it = query.iter_catalog(db_file=self.db_file)
+
+        def next_batch():
+            lines = []
+            for system in it:
+                lines.append(_json(_system_dict(system)) + b"\n")
+                if len(lines) >= batch:
+                    break
+            return b"".join(lines)
+
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(executor, next_batch)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            executor.submit(it.close)
+            executor.shutdown(wait=False)
+
+    # HTTP
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("utf-8", "replace").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):
+                    await reader.readexactly(int(headers["content-length"]))
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+                url = urlsplit(target)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                with metrics.timer("http.request"):
+                    try:
+                        status, body = await self.handle(method, url.path, params)
+                    except HttpError as e:
+                        status, body = e.status, _json({"error": str(e)})
+                    except (ValueError, KeyError, sqlite3.OperationalError) as e:
+                        status, body = 400, _json({"error": str(e)})
+                    except sqlite3.Error as e:
+                        log.error(f"Ошибка базы при {method} {target}: {e}")
+                        status, body = 500, _json({"error": str(e)})
+
+                    if isinstance(body, bytes):
+                        writer.write(self._head(status, keep_alive, len(body)) + body)
+                    else:
+                        writer.write(self._head(status, keep_alive, None, "application/x-ndjson"))
+                        try:
+                            async for chunk in body:
+                                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                                await writer.drain()
+                        except ConnectionError:
+                            raise
+                        except Exception as e:
+                            # статус 200 уже отправлен: обрываем поток без завершающего
+                            # блока (клиент увидит неполный ответ) и закрываем соединение
+                            log.error(f"Выгрузка {target} прервана: {e}")
+                            await writer.drain()
+                            break
+                        writer.write(b"0\r\n\r\n")
+                    await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _head(status, keep_alive, length, content_type="application/json"):
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found",
+                  500: "Internal Server Error"}.get(status, "Error")
+        lines = [f"HTTP/1.1 {status} {reason}", f"Content-Type: {content_type}; charset=utf-8",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    def close(self):
+        self.maintenance.stop()
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+        self._version_conn.close()
+
+
+async def serve(host="127.0.0.1", port=8765, **kwargs):
+    app = CatalogServer(**kwargs)
+    server = await asyncio.start_server(app.serve_client, host, port)
+    log.info(f"Сервер запущен: http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        app.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный JSON-сервис Star System Generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", help="файл БД (по умолчанию data/systems.sqlite)")
+    parser.add_argument("--pool-size", type=int, default=4, help="соединений sqlite для чтения")
+    parser.add_argument("--workers", type=int, default=8, help="потоков для блокирующих вызовов")
+    parser.add_argument("--cache-size", type=int, default=1024, help="систем в кэше ответов")
+    parser.add_argument("--system-numbers", type=int, nargs=2, default=SYSTEM_NUMBERS, metavar=("LOW", "HIGH"),
+                        help="диапазон номеров в именах новых систем")
+    parser.add_argument("--planet-numbers", type=int, nargs=2, default=PLANET_NUMBERS, metavar=("LOW", "HIGH"),
+                        help="диапазон номеров в именах новых планет")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, db_file=args.db, pool_size=args.pool_size,
+                          workers=args.workers, cache_size=args.cache_size,
+                          system_numbers=args.system_numbers, planet_numbers=args.planet_numbers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
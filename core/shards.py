@@ -0,0 +1,200 @@
+"""
+Каталог, разнесённый по нескольким файлам sqlite (шардам).
+
+Система попадает в шард по crc32 имени, поэтому одна и та же система всегда
+лежит в одном файле. У каждого шарда свой писатель: записи в разные шарды
+не ждут общей блокировки. Чтения и агрегаты выполняются по всем шардам
+параллельно и сливаются.
+"""
+import heapq
+import os
+import random
+import zlib
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from core import query, stats
+from core.database import init_db, get_connection, write_systems
+from core.names import (
+    SYSTEM_NUMBERS, PLANET_NUMBERS, system_name_allocator, planet_name_allocator,
+    used_system_names, used_planet_names
+)
+from core.procedural import GENERATOR_VERSION, generate_system
+
+SHARD_FILE = "shard_{:03d}.sqlite"
+
+
+def shard_index(name, shard_count):
+    """Номер шарда для имени системы (стабилен между запусками, в отличие от hash())."""
+    return zlib.crc32(name.encode("utf-8")) % shard_count
+
+
+def _generate_into_shard(db_file, jobs, version):
+    """
+    Рабочий процесс: генерирует системы и пишет их в свой шард.
+    jobs — пары (имя системы, имена её планет); сколько имён, столько и планет.
+    """
+    systems = [generate_system(name, random, version, len(planet_names), len(planet_names),
+                               planet_namer=iter(planet_names).__next__)
+               for name, planet_names in jobs]
+    conn = get_connection(db_file)
+    try:
+        # имена выдал родитель; если одно уже занято другим писателем — ошибка, а не замена
+        write_systems(conn, systems, replace=False)
+    finally:
+        conn.close()
+    return len(systems)
+
+
+class ShardedCatalog:
+    """Набор шардов в одном каталоге: shard_000.sqlite, shard_001.sqlite, ..."""
+
+    def __init__(self, directory, shard_count=8, workers=None,
+                 system_numbers=SYSTEM_NUMBERS, planet_numbers=PLANET_NUMBERS):
+        self.directory = directory
+        self.system_numbers = system_numbers
+        self.planet_numbers = planet_numbers
+        self.shard_count = shard_count
+        self.workers = workers or min(shard_count, os.cpu_count() or 1)
+        os.makedirs(directory, exist_ok=True)
+        self.shard_files = [os.path.join(directory, SHARD_FILE.format(i)) for i in range(shard_count)]
+        for path in self.shard_files:
+            init_db(path)
+        self._system_names = None
+        self._planet_names = None
+
+    def shard_file(self, name):
+        return self.shard_files[shard_index(name, self.shard_count)]
+
+    # параллельное выполнение
+
+    def map_shards(self, fn, *args, processes=False):
+        """
+        Вызывает fn(файл шарда, *args) для всех шардов параллельно; результаты по порядку шардов.
+        processes=True — в отдельных процессах (fn должна быть функцией уровня модуля).
+        """
+        pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with pool_cls(max_workers=self.workers) as pool:
+            return list(pool.map(fn, self.shard_files, *([a] * self.shard_count for a in args)))
+
+    # имена
+
+    def _allocators(self):
+        """Аллокаторы имён по всем шардам (строятся при первой генерации)."""
+        if self._system_names is None:
+            def names(db_file):
+                conn = get_connection(db_file)
+                try:
+                    return used_system_names(conn), used_planet_names(conn)
+                finally:
+                    conn.close()
+            used = self.map_shards(names)
+            self._system_names = system_name_allocator((name for part in used for name in part[0]),
+                                                       self.system_numbers)
+            self._planet_names = planet_name_allocator((name for part in used for name in part[1]),
+                                                       self.planet_numbers)
+        return self._system_names, self._planet_names
+
+    # запись
+
+    def save_systems(self, systems):
+        """Раскладывает системы по шардам и пишет их параллельно, по одному писателю на шард."""
+        groups = {}
+        for system in systems:
+            groups.setdefault(self.shard_file(system.name), []).append(system)
+
+        def write(item):
+            db_file, group = item
+            conn = get_connection(db_file)
+            try:
+                return write_systems(conn, group)
+            finally:
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return sum(pool.map(write, groups.items()))
+
+    def generate(self, count, version=GENERATOR_VERSION, min_planets=4, max_planets=8):
+        """
+        Генерирует count систем (от min_planets до max_planets планет) в рабочих
+        процессах (по одному на шард). Имена и число планет выбираются здесь:
+        процессам не нужно согласовывать уникальность, и ни одно имя планеты
+        не выдаётся впустую.
+        """
+        if not 0 <= min_planets <= max_planets:
+            raise ValueError("Нужно 0 <= min_planets <= max_planets.")
+        system_names, planet_names = self._allocators()
+        groups = [[] for _ in range(self.shard_count)]
+        for name in system_names.allocate_many(count):
+            planets = planet_names.allocate_many(random.randint(min_planets, max_planets))
+            groups[shard_index(name, self.shard_count)].append((name, planets))
+
+        jobs = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for db_file, group in zip(self.shard_files, groups):
+                if group:
+                    jobs.append(pool.submit(_generate_into_shard, db_file, group, version))
+            return sum(job.result() for job in jobs)
+
+    # чтение
+
+    def get_system(self, name):
+        return query.get_system(name, db_file=self.shard_file(name))
+
+    def iter_catalog(self):
+        """Все системы, шард за шардом."""
+        for db_file in self.shard_files:
+            yield from query.iter_catalog(db_file=db_file)
+
+    def find_planets(self, limit=100, **filters):
+        """
+        Первые limit подходящих планет в общем порядке: страницы шардов (по id,
+        как в query_planets) сливаются по id, так что ни один шард не в приоритете.
+        """
+        def search(db_file):
+            return query.planet_rows(0, limit, db_file, **filters)
+        merged = heapq.merge(*self.map_shards(search), key=lambda row: row[0])
+        return [(row[1], query.planet_from_row(row[2:])) for row in islice(merged, limit)]
+
+    # агрегаты (по сводным таблицам каждого шарда)
+
+    def catalog_totals(self):
+        parts = self.map_shards(stats.catalog_totals)
+        planets = sum(p["planets"] for p in parts)
+        sum_temp = sum(p["mean_temperature"] * p["planets"] for p in parts if p["planets"])
+        return {
+            "systems": sum(p["systems"] for p in parts),
+            "planets": planets,
+            "satellites": sum(p["satellites"] for p in parts),
+            "total_mass": sum(p["total_mass"] for p in parts),
+            "mean_temperature": sum_temp / planets if planets else None,
+        }
+
+    def type_distribution(self):
+        merged = {}
+        for part in self.map_shards(stats.type_distribution):
+            for ptype, n in part.items():
+                merged[ptype] = merged.get(ptype, 0) + n
+        return dict(sorted(merged.items()))
+
+    def histogram(self, column, bins=10, lo=None, hi=None):
+        """Гистограмма по всем шардам; без явных границ они берутся из общего min/max."""
+        if lo is None or hi is None:
+            expr = stats.HISTOGRAM_COLUMNS[column]
+
+            def bounds(db_file):
+                conn = get_connection(db_file)
+                try:
+                    return conn.execute(f"SELECT min({expr}), max({expr}) FROM system_stats").fetchone()
+                finally:
+                    conn.close()
+            found = [b for b in self.map_shards(bounds) if b[0] is not None]
+            if not found:
+                return [], []
+            lo = min(b[0] for b in found) if lo is None else lo
+            hi = max(b[1] for b in found) if hi is None else hi
+
+        # у всех шардов одинаковые границы, поэтому корзины складываются поэлементно
+        parts = self.map_shards(lambda db_file: stats.histogram(column, bins, lo, hi, db_file))
+        counts = [sum(c) for c in zip(*(part[1] for part in parts))]
+        return parts[0][0], counts
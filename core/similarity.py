@@ -0,0 +1,252 @@
+"""
+Поиск похожих: k ближайших планет или систем каталога по нормированным признакам.
+
+Признаки планеты — температура, радиус, масса, орбита, вероятность жизни
+(радиус, масса и орбита в логарифмической шкале) и тип / атмосфера как one-hot.
+Признаки системы — температура и радиус звезды, число планет, средняя
+температура планет и наибольшая вероятность жизни.
+
+Индексы — R*Tree planet_features / system_features в той же базе
+(core.database); их обновляют триггеры при каждом сохранении, так что
+отдельной сборки нет. В R*Tree лежат исходные значения: нормировка монотонна,
+поэтому шар радиуса r вокруг цели вписан в прямоугольник исходных значений.
+Пока r меньше CATEGORY_WEIGHT, планеты другого типа или атмосферы в шар не
+попадают, и прямоугольник ограничен кодом категории цели.
+Поиск расширяет прямоугольник, пока в нём не наберётся k кандидатов, и затем
+один раз запрашивает прямоугольник радиуса k-го расстояния — результат точный.
+
+Процедурные системы (seed) в индекс не входят: их планеты не хранятся в базе.
+
+Запуск:
+    python -m core.similarity [--db data/systems.sqlite] planets "Солнечная система" Земля [-k 50]
+    python -m core.similarity [--db ...] systems "Солнечная система" [-k 10]
+"""
+import argparse
+import logging
+import math
+from dataclasses import dataclass
+
+from core import metrics, query
+from core.database import has_features
+
+log = logging.getLogger(__name__)
+
+# (колонка в R*Tree или None, атрибут объекта, масштаб, логарифмическая шкала):
+# расстояние 1 — это 100 °C, вдвое другой радиус / орбита, вчетверо другая масса, 25 % жизни
+PLANET_FEATURES = (
+    ("temperature", "temperature_c", 100.0, False),
+    ("size", "size_earth", 1.0, True),
+    ("mass", "mass_earth", 2.0, True),
+    ("orbit", "orbital_radius_au", 1.0, True),
+    (None, "life_probability", 25.0, False),  # не индексируется (core.database.CATEGORY_CODE)
+)
+SYSTEM_FEATURES = (
+    ("star_temperature", "star_temperature", 1000.0, False),
+    ("star_radius", "star_radius", 1.0, True),
+    ("planets", "planet_count", 2.0, False),
+    ("temperature", "mean_temperature", 100.0, False),
+    ("life", "max_life", 25.0, False),
+)
+CATEGORY_WEIGHT = 1.0  # вклад другого типа (и отдельно другой атмосферы) в расстояние
+LOG_FLOOR = 1e-3  # меньшие значения в логарифмической шкале считаются равными ему
+
+INITIAL_RADIUS = 0.1
+MAX_RADIUS = 1e4  # прямоугольник такого радиуса покрывает весь каталог
+
+
+@dataclass
+class Match:
+    distance: float
+    system_name: str
+    planet: object = None  # Planet для поиска планет
+
+
+def _coord(value, scale, logarithmic):
+    value = float(value or 0.0)
+    return math.log2(max(value, LOG_FLOOR)) / scale if logarithmic else value / scale
+
+
+def _vector(values, features):
+    return tuple(_coord(v, scale, lg) for v, (_, _, scale, lg) in zip(values, features))
+
+
+def planet_vector(planet):
+    """Числовая часть признаков планеты (объект с полями Planet)."""
+    return _vector([getattr(planet, attr) for _, attr, _, _ in PLANET_FEATURES], PLANET_FEATURES)
+
+
+def system_vector(system):
+    """Признаки системы (StarSystem; планеты — по её списку)."""
+    planets = system.planets
+    return _vector([
+        system.star_temperature_k, system.star_radius_solar, len(planets),
+        sum(p.temperature_c for p in planets) / len(planets) if planets else 0.0,
+        max((p.life_probability for p in planets), default=0.0),
+    ], SYSTEM_FEATURES)
+
+
+def _box_sql(columns):
+    """Условие «строка R*Tree пересекает прямоугольник» (параметры — из _box_params)."""
+    return " AND ".join(f"f.{col}_hi >= ? AND f.{col}_lo <= ?" for col in columns)
+
+
+def _indexed(vector, features):
+    """Координаты и признаки, которые есть в R*Tree."""
+    pairs = [(c, f) for c, f in zip(vector, features) if f[0] is not None]
+    return [c for c, _ in pairs], [f for _, f in pairs]
+
+
+def _box_params(vector, features, r):
+    """Границы прямоугольника радиуса r вокруг vector в исходных единицах."""
+    params = []
+    for c, (_, _, scale, logarithmic) in zip(vector, features):
+        lo, hi = (c - r) * scale, (c + r) * scale
+        if logarithmic:
+            # всё, что не больше LOG_FLOOR, имеет одну координату — нижняя граница открыта
+            lo = -math.inf if lo <= math.log2(LOG_FLOOR) else 2 ** lo
+            hi = 2 ** min(hi, 1000.0)
+        params += (lo, hi)
+    return params
+
+
+def _nearest(conn, sql, bounds, k, distance, exclude, indexed):
+    """
+    k строк с наименьшим distance(row) (row[0] — id); sql выбирает кандидатов
+    в прямоугольнике bounds(r), при indexed=False — все строки.
+    """
+    def candidates(r):
+        rows = conn.execute(sql, bounds(r) if indexed else ()).fetchall()
+        return sorted((distance(row), row) for row in rows if row[0] not in exclude)
+
+    r = INITIAL_RADIUS
+    scored = candidates(r)
+    while indexed and len(scored) < k and r < MAX_RADIUS:
+        r *= 2
+        scored = candidates(r)
+    # ближе k-го найденного могут быть точки вне прямоугольника — но не вне его шара
+    if indexed and len(scored) >= k and scored[k - 1][0] > r:
+        scored = candidates(scored[k - 1][0])
+    return scored[:k]
+
+
+def _lookup_id(conn, table, name):
+    row = conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+@metrics.timed("similarity.planets")
+def similar_planets(target, k=50, db_file=None, conn=None, exclude=()):
+    """
+    k планет каталога, ближайших к target (Planet или объект с теми же полями),
+    по возрастанию расстояния. exclude — id планет в базе, которые не возвращать.
+    """
+    vector = planet_vector(target)
+    with query._connection(db_file, conn) as conn:
+        type_id = _lookup_id(conn, "planet_types", target.planet_type)
+        atmosphere_id = _lookup_id(conn, "atmospheres", target.atmosphere)
+        indexed = has_features(conn)
+        columns = ", ".join(f"p.{attr}" for _, attr, _, _ in PLANET_FEATURES)
+        coords, features = _indexed(vector, PLANET_FEATURES)
+        # тот же код, что CATEGORY_CODE; неизвестные тип / атмосфера ни с чем не совпадают
+        code = type_id * 1000 + atmosphere_id if type_id and atmosphere_id else -1
+        if indexed:
+            sql = f"""
+                SELECT p.id, {columns}, p.type_id, p.atmosphere_id
+                FROM planet_features f JOIN planet_data p ON p.id = f.id
+                WHERE {_box_sql([f[0] for f in features] + ["category"])}
+            """
+        else:
+            sql = f"SELECT p.id, {columns}, p.type_id, p.atmosphere_id FROM planet_data p"
+
+        def bounds(r):
+            category = (code, code) if r < CATEGORY_WEIGHT else (-math.inf, math.inf)
+            return _box_params(coords, features, r) + list(category)
+
+        def distance(row):
+            d = sum((a - b) ** 2 for a, b in zip(vector, _vector(row[1:6], PLANET_FEATURES)))
+            d += CATEGORY_WEIGHT ** 2 * ((row[6] != type_id) + (row[7] != atmosphere_id))
+            return math.sqrt(d)
+
+        best = _nearest(conn, sql, bounds, k, distance, set(exclude), indexed)
+        ids = [row[0] for _, row in best]
+        rows = {row[0]: row for row in conn.execute(
+            f"SELECT {query.PLANET_COLUMNS} FROM planets p WHERE p.id IN ({', '.join('?' * len(ids))})", ids)}
+    return [Match(d, rows[i][1], query.planet_from_row(rows[i][2:])) for (d, _), i in zip(best, ids)]
+
+
+def similar_to_planet(system_name, planet_name, k=50, db_file=None, conn=None):
+    """k планет, похожих на планету каталога (сама она не возвращается)."""
+    with query._connection(db_file, conn) as conn:
+        system = query.get_system(system_name, conn=conn)
+        planet = next((p for p in system.planets if p.name == planet_name), None) if system else None
+        if planet is None:
+            raise ValueError(f"Планета '{planet_name}' системы '{system_name}' не найдена.")
+        own = conn.execute("""
+            SELECT p.id FROM planet_data p JOIN system_data s ON s.id = p.system_id
+            WHERE s.name = ? AND p.name = ?
+        """, (system_name, planet_name)).fetchall()
+        return similar_planets(planet, k, conn=conn, exclude=[row[0] for row in own])
+
+
+@metrics.timed("similarity.systems")
+def similar_systems(target, k=10, db_file=None, conn=None):
+    """k систем каталога, ближайших к target (StarSystem); одноимённая система не возвращается."""
+    vector = system_vector(target)
+    with query._connection(db_file, conn) as conn:
+        indexed = has_features(conn)
+        select = """
+            SELECT s.id, s.star_temperature, s.star_radius, st.planet_count,
+                   st.sum_temperature / st.planet_count, st.max_life_probability, s.name
+        """
+        if indexed:
+            sql = f"""
+                {select} FROM system_features f
+                JOIN system_data s ON s.id = f.id JOIN system_stats st ON st.system_name = s.name
+                WHERE {_box_sql([f[0] for f in SYSTEM_FEATURES])}
+            """
+        else:
+            sql = f"{select} FROM system_stats st JOIN system_data s ON s.name = st.system_name"
+
+        def distance(row):
+            return math.dist(vector, _vector(row[1:6], SYSTEM_FEATURES))
+
+        own = conn.execute("SELECT id FROM system_data WHERE name = ?", (target.name,)).fetchone()
+        best = _nearest(conn, sql, lambda r: _box_params(vector, SYSTEM_FEATURES, r),
+                        k, distance, set(own or ()), indexed)
+    return [Match(d, row[6]) for d, row in best]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Поиск похожих планет и систем")
+    parser.add_argument("--db", help="файл БД (по умолчанию data/systems.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    planets = commands.add_parser("planets", help="планеты, похожие на планету каталога")
+    planets.add_argument("system")
+    planets.add_argument("planet")
+    planets.add_argument("-k", type=int, default=50, help="сколько планет вывести")
+    systems = commands.add_parser("systems", help="системы, похожие на систему каталога")
+    systems.add_argument("system")
+    systems.add_argument("-k", type=int, default=10, help="сколько систем вывести")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    if args.command == "planets":
+        try:
+            found = similar_to_planet(args.system, args.planet, args.k, db_file=args.db)
+        except ValueError as e:
+            parser.error(str(e))
+        for m in found:
+            p = m.planet
+            print(f"{m.distance:.3f}  {m.system_name} / {p.name}: {p.planet_type}, {p.atmosphere}, "
+                  f"{p.temperature_c} °C, {p.size_earth} R⊕, {p.mass_earth} M⊕, {p.orbital_radius_au} а.е., "
+                  f"жизнь {p.life_probability:.1f}%")
+    else:
+        system = query.get_system(args.system, db_file=args.db)
+        if system is None:
+            parser.error(f"Система '{args.system}' не найдена.")
+        for m in similar_systems(system, args.k, db_file=args.db):
+            print(f"{m.distance:.3f}  {m.system_name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Read-only снимок каталога для нескольких процессов.
+
+Один процесс собирает файл снимка из БД (build_snapshot), остальные
+открывают его через mmap (CatalogSnapshot.open). Страницы файла разделяются
+через кэш ОС, поэтому память не растёт с числом процессов: объекты
+CatalogSystem / CatalogPlanet — лишь индексы в отображённом файле,
+поля читаются из него при обращении.
+
+Формат (little-endian):
+    заголовок  — MAGIC, число систем, число планет, смещения разделов
+    системы    — SYSTEM_RECORD, отсортированы по имени (бинарный поиск)
+    планеты    — PLANET_RECORD, планеты одной системы идут подряд
+    строки     — UTF-8 без разделителей, в записях хранится (смещение, длина)
+"""
+import mmap
+import os
+import struct
+from core.planet import Planet
+from core.query import iter_catalog
+
+MAGIC = b"SSGCAT01"
+HEADER = struct.Struct("<8sIIQQQ")
+# имя, имя звезды, тип звезды (смещение, длина); температура, радиус; первая планета, число планет
+SYSTEM_RECORD = struct.Struct("<6I2d2I")
+# имя, тип, атмосфера, картинка, описание (смещение, длина); 6 чисел; спутники
+PLANET_RECORD = struct.Struct("<10I6di")
+
+PLANET_FLOATS = ("temperature_c", "size_earth", "mass_earth",
+                 "orbital_radius_au", "orbital_period_days", "life_probability")
+PLANET_STRINGS = ("name", "planet_type", "atmosphere", "image_path", "description")
+
+
+class _Strings:
+    """Накопитель строк для сборки; одинаковые строки хранятся один раз."""
+
+    def __init__(self):
+        self.blob = bytearray()
+        self.index = {}
+
+    def add(self, text):
+        text = text or ""
+        ref = self.index.get(text)
+        if ref is None:
+            data = text.encode("utf-8")
+            ref = self.index[text] = (len(self.blob), len(data))
+            self.blob += data
+        return ref
+
+
+def build_snapshot(path, db_file=None):
+    """Собирает файл снимка из БД; возвращает число систем."""
+    strings = _Strings()
+    systems = []
+    planets = bytearray()
+    planet_count = 0
+
+    for system in iter_catalog(db_file=db_file):
+        first = planet_count
+        for p in system.planets:
+            refs = [v for f in PLANET_STRINGS for v in strings.add(getattr(p, f))]
+            planets += PLANET_RECORD.pack(*refs, *(float(getattr(p, f)) for f in PLANET_FLOATS),
+                                          int(p.satellites))
+            planet_count += 1
+        systems.append((system.name, SYSTEM_RECORD.pack(
+            *strings.add(system.name), *strings.add(system.star_name), *strings.add(system.star_type),
+            float(system.star_temperature_k), float(system.star_radius_solar),
+            first, planet_count - first
+        )))
+
+    systems.sort(key=lambda item: item[0])
+    systems_offset = HEADER.size
+    planets_offset = systems_offset + len(systems) * SYSTEM_RECORD.size
+    strings_offset = planets_offset + len(planets)
+
+    # пишем во временный файл и подменяем — читатели не увидят полузаписанный снимок
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(systems), planet_count, systems_offset, planets_offset, strings_offset))
+        for _, record in systems:
+            f.write(record)
+        f.write(planets)
+        f.write(strings.blob)
+    os.replace(tmp_path, path)
+    return len(systems)
+
+
+class CatalogPlanet:
+    """Представление планеты в снимке; поля как у Planet, только для чтения."""
+    __slots__ = ("_snap", "_offset")
+
+    def __init__(self, snap, index):
+        self._snap = snap
+        self._offset = snap.planets_offset + index * PLANET_RECORD.size
+
+    def __getattr__(self, name):
+        if name in PLANET_STRINGS:
+            i = PLANET_STRINGS.index(name)
+            off, length = struct.unpack_from("<2I", self._snap.buf, self._offset + i * 8)
+            return self._snap.string(off, length)
+        if name in PLANET_FLOATS:
+            return struct.unpack_from("<d", self._snap.buf, self._offset + 40 + PLANET_FLOATS.index(name) * 8)[0]
+        if name == "satellites":
+            return struct.unpack_from("<i", self._snap.buf, self._offset + 88)[0]
+        raise AttributeError(name)
+
+    def to_planet(self):
+        """Полная копия в виде обычного Planet."""
+        return Planet(**{f: getattr(self, f) for f in PLANET_STRINGS + PLANET_FLOATS + ("satellites",)})
+
+    def __repr__(self):
+        return f"CatalogPlanet({self.name!r})"
+
+
+class CatalogSystem:
+    """Представление системы в снимке; поля как у StarSystem."""
+    __slots__ = ("_snap", "_fields")
+
+    def __init__(self, snap, index):
+        self._snap = snap
+        self._fields = SYSTEM_RECORD.unpack_from(snap.buf, snap.systems_offset + index * SYSTEM_RECORD.size)
+
+    @property
+    def name(self):
+        return self._snap.string(*self._fields[0:2])
+
+    @property
+    def star_name(self):
+        return self._snap.string(*self._fields[2:4])
+
+    @property
+    def star_type(self):
+        return self._snap.string(*self._fields[4:6])
+
+    @property
+    def star_temperature_k(self):
+        return int(self._fields[6])
+
+    @property
+    def star_radius_solar(self):
+        return self._fields[7]
+
+    @property
+    def planets(self):
+        first, count = self._fields[8], self._fields[9]
+        return [CatalogPlanet(self._snap, first + i) for i in range(count)]
+
+    def average_temperature(self):
+        planets = self.planets
+        if not planets:
+            return None
+        return sum(p.temperature_c for p in planets) / len(planets)
+
+    def __repr__(self):
+        return f"CatalogSystem({self.name!r})"
+
+
+class CatalogSnapshot:
+    """Открытый только для чтения снимок каталога."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # ValueError — пустой файл
+            self._file.close()
+            raise
+        try:
+            magic, self.system_count, self.planet_count, self.systems_offset, self.planets_offset, \
+                self.strings_offset = HEADER.unpack_from(self.buf, 0)
+        except struct.error:
+            magic = None  # файл короче заголовка
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Файл '{path}' не является снимком каталога.")
+
+    @classmethod
+    def open(cls, path):
+        return cls(path)
+
+    def string(self, offset, length):
+        start = self.strings_offset + offset
+        return self.buf[start:start + length].decode("utf-8")
+
+    def __len__(self):
+        return self.system_count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.system_count:
+            raise IndexError(index)
+        return CatalogSystem(self, index)
+
+    def __iter__(self):
+        for i in range(self.system_count):
+            yield CatalogSystem(self, i)
+
+    def system_by_name(self, name):
+        """Бинарный поиск системы по имени; None, если не найдена."""
+        lo, hi = 0, self.system_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[mid].name < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.system_count and self[lo].name == name:
+            return self[lo]
+        return None
+
+    def planet(self, index):
+        """Планета по сквозному индексу в снимке."""
+        if not 0 <= index < self.planet_count:
+            raise IndexError(index)
+        return CatalogPlanet(self, index)
+
+    def close(self):
+        if self.buf is not None:
+            self.buf.close()
+            self.buf = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
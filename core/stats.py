@@ -0,0 +1,140 @@
+"""
+Сводная статистика каталога по system_stats / system_type_stats.
+
+Процедурные системы (seeded_systems) сюда не входят: их планеты не хранятся
+в planet_data, и триггеры статистики их не видят.
+"""
+from dataclasses import dataclass, field
+from core.database import get_connection
+
+# Поля system_stats, по которым строятся гистограммы по каталогу
+HISTOGRAM_COLUMNS = {
+    "planet_count": "planet_count",
+    "mean_temperature": "sum_temperature / planet_count",
+    "min_temperature": "min_temperature",
+    "max_temperature": "max_temperature",
+    "max_life_probability": "max_life_probability",
+    "total_satellites": "total_satellites",
+    "total_mass": "total_mass",
+}
+
+
+@dataclass
+class SystemStats:
+    """Сводные данные по одной системе."""
+    system_name: str
+    planet_count: int
+    mean_temperature: float
+    min_temperature: float
+    max_temperature: float
+    max_life_probability: float
+    total_satellites: int
+    total_mass: float
+    type_counts: dict = field(default_factory=dict)  # тип планеты -> количество
+
+
+def _stats_from_row(row, type_counts=None):
+    name, count, sum_temp, min_temp, max_temp, max_life, sats, mass = row
+    return SystemStats(
+        system_name=name,
+        planet_count=int(count),
+        mean_temperature=sum_temp / count if count else 0.0,
+        min_temperature=min_temp,
+        max_temperature=max_temp,
+        max_life_probability=max_life,
+        total_satellites=int(sats or 0),
+        total_mass=mass or 0.0,
+        type_counts=type_counts or {}
+    )
+
+
+def get_system_stats(system_name, db_file=None):
+    """Статистика одной системы или None, если у неё нет планет."""
+    conn = get_connection(db_file)
+    try:
+        row = conn.execute("SELECT * FROM system_stats WHERE system_name = ?", (system_name,)).fetchone()
+        if row is None:
+            return None
+        types = conn.execute(
+            "SELECT planet_type, planet_count FROM system_type_counts WHERE system_name = ?", (system_name,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return _stats_from_row(row, dict(types))
+
+
+def iter_system_stats(db_file=None):
+    """Потоково выдаёт статистику всех систем (без счётчиков по типам)."""
+    conn = get_connection(db_file)
+    try:
+        for row in conn.execute("SELECT * FROM system_stats ORDER BY system_name"):
+            yield _stats_from_row(row)
+    finally:
+        conn.close()
+
+
+def type_distribution(db_file=None):
+    """Количество планет каждого типа по всему каталогу."""
+    conn = get_connection(db_file)
+    try:
+        rows = conn.execute("""
+            SELECT t.name, sum(c.planet_count) FROM system_type_stats c JOIN planet_types t ON t.id = c.type_id
+            GROUP BY t.name ORDER BY t.name
+        """).fetchall()
+    finally:
+        conn.close()
+    return dict(rows)
+
+
+def catalog_totals(db_file=None):
+    """Итоги по каталогу: число систем, планет, спутников, суммарная масса, средняя температура."""
+    conn = get_connection(db_file)
+    try:
+        systems, planets, sats, mass, sum_temp = conn.execute("""
+            SELECT count(*), sum(planet_count), sum(total_satellites), sum(total_mass), sum(sum_temperature)
+            FROM system_stats
+        """).fetchone()
+    finally:
+        conn.close()
+    return {
+        "systems": systems,
+        "planets": planets or 0,
+        "satellites": sats or 0,
+        "total_mass": mass or 0.0,
+        "mean_temperature": sum_temp / planets if planets else None,
+    }
+
+
+def histogram(column, bins=10, lo=None, hi=None, db_file=None):
+    """
+    Гистограмма по одному из полей HISTOGRAM_COLUMNS по всем системам.
+    Возвращает (границы корзин, количества); считается только по system_stats.
+    """
+    if column not in HISTOGRAM_COLUMNS:
+        raise ValueError(f"Неизвестное поле гистограммы: {column}")
+    if bins < 1:
+        raise ValueError("Число корзин должно быть положительным.")
+    expr = HISTOGRAM_COLUMNS[column]
+
+    conn = get_connection(db_file)
+    try:
+        if lo is None or hi is None:
+            min_v, max_v = conn.execute(f"SELECT min({expr}), max({expr}) FROM system_stats").fetchone()
+            lo = min_v if lo is None else lo
+            hi = max_v if hi is None else hi
+        if lo is None or hi is None:
+            return [], []
+        width = (hi - lo) / bins if hi > lo else 1.0
+        rows = conn.execute(f"""
+            SELECT min(CAST(({expr} - ?) / ? AS INTEGER), ?) AS bucket, count(*)
+            FROM system_stats WHERE {expr} BETWEEN ? AND ?
+            GROUP BY bucket
+        """, (lo, width, bins - 1, lo, hi)).fetchall()
+    finally:
+        conn.close()
+
+    counts = [0] * bins
+    for bucket, count in rows:
+        counts[bucket] += count
+    edges = [lo + i * width for i in range(bins + 1)]
+    return edges, counts
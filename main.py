@@ -1,9 +1,11 @@
+import logging
 import sys
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import MainWindow
 
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
     app = QApplication(sys.argv)
     w = MainWindow()
     w.show()
@@ -0,0 +1,98 @@
+"""
+Пакетный рендер миниатюр систем без окна (Qt offscreen).
+
+Запуск:
+    python -m ui.batch_render --out previews [--size 256] [--workers N] [--time 0] [--db data/systems.sqlite]
+
+Каталог читается потоком (core.query.iter_catalog), системы рендерятся
+в рабочих процессах; у каждого процесса свой QGuiApplication и свой кэш
+картинок планет. В работе одновременно не больше IN_FLIGHT пачек на процесс,
+так что память не зависит от размера каталога. Результат — по одному PNG
+на систему.
+"""
+import argparse
+import logging
+import os
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from core import query
+from core.csvio import csv_file_name
+
+log = logging.getLogger(__name__)
+
+CHUNK = 16  # систем на одно задание процесса
+IN_FLIGHT = 2  # заданий на процесс, отправленных и ещё не завершённых
+
+_app = None
+_icon_cache = {}
+
+
+def _init_worker():
+    """Qt нужен объект приложения в каждом процессе (шрифты, декодеры картинок)."""
+    global _app
+    from PyQt6.QtGui import QGuiApplication
+    _app = QGuiApplication.instance() or QGuiApplication(["batch_render"])
+
+
+def file_name(system_name):
+    """Имя PNG для системы — то же, что у её CSV (core.csvio.csv_file_name)."""
+    return os.path.splitext(csv_file_name(system_name))[0] + ".png"
+
+
+def _render_chunk(job):
+    """Рабочий процесс: рендерит пачку систем, возвращает число сохранённых файлов."""
+    from ui.render import render_system_image
+    systems, out_dir, size, t = job
+    saved = 0
+    for system in systems:
+        image = render_system_image(system, t, size, _icon_cache)
+        if image.save(os.path.join(out_dir, file_name(system.name)), "PNG"):
+            saved += 1
+        else:
+            log.warning(f"Не удалось сохранить миниатюру '{system.name}'.")
+    return saved
+
+
+def render_catalog(out_dir, size=256, t=0.0, workers=None, db_file=None):
+    """Рендерит все системы каталога в out_dir; возвращает число файлов."""
+    os.makedirs(out_dir, exist_ok=True)
+    systems = query.iter_catalog(db_file=db_file)
+    chunks = iter(lambda: list(islice(systems, CHUNK)), [])
+    workers = workers or os.cpu_count() or 1
+    saved = 0
+    pending = deque()
+    with Pool(workers, initializer=_init_worker) as pool:
+        # imap читал бы весь каталог в очередь заданий сразу; здесь следующая
+        # пачка читается, только когда одна из отправленных готова
+        for chunk in chunks:
+            if len(pending) >= workers * IN_FLIGHT:
+                saved += pending.popleft().get()
+            pending.append(pool.apply_async(_render_chunk, ((chunk, out_dir, size, t),)))
+        while pending:
+            saved += pending.popleft().get()
+    return saved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный рендер миниатюр систем")
+    parser.add_argument("--out", required=True, help="каталог для PNG")
+    parser.add_argument("--size", type=int, default=256, help="сторона миниатюры, px")
+    parser.add_argument("--time", type=float, default=0.0, help="момент анимации, секунды")
+    parser.add_argument("--workers", type=int, help="процессов (по умолчанию — число ядер)")
+    parser.add_argument("--db", help="файл БД (по умолчанию data/systems.sqlite)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    start = time.perf_counter()
+    saved = render_catalog(args.out, args.size, args.time, args.workers, args.db)
+    elapsed = time.perf_counter() - start
+    log.info(f"Сохранено миниатюр: {saved} за {elapsed:.1f} с ({saved / elapsed if elapsed else 0:.0f}/с)")
+
+
+if __name__ == "__main__":
+    main()
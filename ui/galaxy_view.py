@@ -0,0 +1,306 @@
+import math
+import threading
+from itertools import compress
+from PyQt6.QtWidgets import QWidget, QComboBox
+from PyQt6.QtGui import QPainter, QPen, QColor, QImage, QPolygonF, QTransform
+from PyQt6.QtCore import Qt, QPointF, QRectF, QTimer
+from core import metrics
+from core.database import get_connection
+from core.galaxy import (
+    GalaxyIndex, GRID_BITS, COLOR_BY_TYPE, COLOR_BY_TEMPERATURE, catalog_signature
+)
+
+# цвета интервалов температуры (core.galaxy.TEMPERATURE_BINS): от красного к голубому
+TEMPERATURE_COLORS = [
+    (255, 110, 80), (255, 150, 90), (255, 195, 120), (255, 230, 170),
+    (255, 250, 235), (225, 235, 255), (185, 205, 255), (150, 180, 255),
+]
+TYPE_COLORS = [
+    (255, 210, 90), (255, 110, 90), (170, 200, 255), (255, 160, 60),
+    (120, 230, 160), (220, 130, 255), (90, 220, 230), (240, 240, 240),
+]
+
+POINT_LIMIT = 40000  # точек на кадр; больше — рисуется выборка из каждой плитки
+CLICK_RADIUS_PX = 6
+
+
+def density_image(index, level, mode):
+    """Картинка плотности уровня level (ячейка — пиксель); QImage можно строить и не в потоке GUI."""
+    totals, dominant = index.density(level, mode)
+    palette = TYPE_COLORS if mode == COLOR_BY_TYPE else TEMPERATURE_COLORS
+    size = 1 << level
+    data = bytearray(4 * size * size)
+    for cell in compress(range(size * size), totals):
+        r, g, b = palette[dominant[cell] % len(palette)]
+        alpha = min(255, 90 + int(40 * math.log2(totals[cell])))
+        data[4 * cell:4 * cell + 4] = bytes((b, g, r, alpha))
+    image = QImage(bytes(data), size, size, 4 * size, QImage.Format.Format_ARGB32)
+    return image.copy()  # копия владеет своими данными
+
+
+class GalaxyView(QWidget):
+    """
+    Обзор всего каталога: каждая система — точка на карте галактики.
+    Колесо — масштаб, перетаскивание — сдвиг, клик по точке — открыть систему.
+
+    Уровни детализации: при мелком масштабе рисуется картинка плотности
+    (ячейка сетки ~ пиксель), при крупном — точки только видимых плиток,
+    а если их слишком много — равномерная выборка из каждой плитки.
+    """
+
+    def __init__(self, manager, open_system_callback, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.open_system_callback = open_system_callback
+        self.setMinimumHeight(480)
+        self.setMouseTracking(True)
+
+        self.index = None
+        self._signature = None
+        self._version = None
+        self._version_conn = None  # только для PRAGMA data_version, из потока GUI
+        self._loading = None
+        self.mode = COLOR_BY_TYPE
+
+        # вид: центр в координатах галактики и пикселей на единицу
+        self._center = QPointF(0.0, 0.0)
+        self._scale = None
+        self._drag_from = None
+        self._dragged = False
+        self._hover = None
+
+        self._images = {}  # (режим, уровень) -> QImage плотности, строятся вместе с индексом
+        self._tile_cache = {}  # (режим, плитка) -> (число точек, [(класс, QPolygonF)])
+
+        self.color_box = QComboBox(self)
+        self.color_box.addItem("Цвет: тип звезды", COLOR_BY_TYPE)
+        self.color_box.addItem("Цвет: температура", COLOR_BY_TEMPERATURE)
+        self.color_box.adjustSize()
+        self.color_box.move(10, 10)
+        self.color_box.currentIndexChanged.connect(self._on_mode)
+
+        self._poll = QTimer(self)
+        self._poll.timeout.connect(self._check_loaded)
+
+    # данные
+
+    def reload(self):
+        """
+        Перестраивает индекс в фоновом потоке, если каталог изменился с прошлого раза.
+        Здесь проверяется только PRAGMA data_version (меняется после записи любым
+        другим соединением); подпись каталога считается уже в фоновом потоке, и
+        если системы те же (например, менялись только планеты), индекс остаётся.
+        """
+        if self._loading is not None:
+            return
+        if self._version_conn is None:
+            self._version_conn = get_connection(self.manager.db_file)
+        version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+        self._version = version
+        previous = self._signature
+        result = {}
+
+        def build():
+            signature = catalog_signature(self.manager.db_file)
+            if signature == previous:
+                result["signature"] = signature
+                return
+            with metrics.timer("galaxy.build"):
+                index = GalaxyIndex.from_db(self.manager.db_file)
+                # картинки всех уровней тоже строятся здесь, чтобы кадры не ждали
+                images = {(mode, level): density_image(index, level, mode)
+                          for mode in (COLOR_BY_TYPE, COLOR_BY_TEMPERATURE)
+                          for level in range(1, GRID_BITS + 1)}
+                result.update(signature=signature, index=index, images=images)
+
+        self._loading = (threading.Thread(target=build, daemon=True), result)
+        self._loading[0].start()
+        self._poll.start(100)
+        self.update()
+
+    def _check_loaded(self):
+        thread, result = self._loading
+        if thread.is_alive():
+            return
+        self._poll.stop()
+        self._loading = None
+        if "signature" not in result:
+            self._version = None  # построение упало — попробовать при следующем reload
+        if "index" not in result:
+            self.update()
+            return
+        self._signature = result["signature"]
+        self.index = result["index"]
+        self._images = result["images"]
+        self._tile_cache.clear()
+        self.update()
+
+    def _on_mode(self):
+        self.mode = self.color_box.currentData()
+        self.update()
+
+    # преобразования координат
+
+    def _fit(self):
+        self._scale = min(self.width(), self.height()) / 2.1
+
+    def _to_screen(self, x, y):
+        return (self.width() / 2 + (x - self._center.x()) * self._scale,
+                self.height() / 2 + (y - self._center.y()) * self._scale)
+
+    def _to_world(self, sx, sy):
+        return (self._center.x() + (sx - self.width() / 2) / self._scale,
+                self._center.y() + (sy - self.height() / 2) / self._scale)
+
+    # отрисовка
+
+    def paintEvent(self, event):
+        with metrics.timer("galaxy.frame"):
+            painter = QPainter(self)
+            painter.fillRect(self.rect(), QColor(4, 6, 14))
+            painter.setPen(QColor(200, 210, 230))
+            if self.index is None:
+                painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter,
+                                 "Построение карты..." if self._loading else "Каталог пуст.")
+                return
+            if self._scale is None:
+                self._fit()
+
+            # ячейка самой подробной сетки крупнее ~2 px — переходим к точкам
+            if 2 * self._scale <= 2 * (1 << GRID_BITS):
+                self._draw_density(painter)
+            else:
+                self._draw_points(painter)
+            self._draw_marks(painter)
+
+    def _draw_density(self, painter):
+        # уровень, на котором ячейка примерно равна пикселю
+        level = min(GRID_BITS, max(1, math.ceil(math.log2(max(2.0, 2 * self._scale)))))
+        image = self._images[(self.mode, level)]
+        size = 1 << level
+        x0, y0 = self._to_screen(-1.0, -1.0)
+        x1, y1 = self._to_screen(1.0, 1.0)
+        target = QRectF(x0, y0, x1 - x0, y1 - y0)
+        # отсечение: берём из картинки только видимую часть
+        visible = target.intersected(QRectF(self.rect()))
+        if visible.isEmpty():
+            return
+        k = size / target.width()
+        source = QRectF((visible.left() - x0) * k, (visible.top() - y0) * k, visible.width() * k, visible.height() * k)
+        painter.drawImage(visible, image, source)
+
+    def _draw_points(self, painter):
+        x0, y0 = self._to_world(0, 0)
+        x1, y1 = self._to_world(self.width(), self.height())
+        tiles = self.index.tiles_in(x0, y0, x1, y1)
+        total = self.index.count_in(tiles)
+        share = min(1.0, POINT_LIMIT / total) if total else 1.0
+
+        # точки хранятся в координатах галактики; в экранные переводит одно преобразование
+        transform = QTransform()
+        transform.translate(self.width() / 2, self.height() / 2)
+        transform.scale(self._scale, self._scale)
+        transform.translate(-self._center.x(), -self._center.y())
+        palette = TYPE_COLORS if self.mode == COLOR_BY_TYPE else TEMPERATURE_COLORS
+        pens = []
+        for r, g, b in palette:
+            pens.append(QPen(QColor(r, g, b), 2 if share < 1.0 else 3))
+        for tile in tiles:
+            lo, hi = self.index.tile_range(tile)
+            for cls, polygon in self._tile_points(tile, math.ceil((hi - lo) * share)):
+                painter.setPen(pens[cls % len(pens)])
+                painter.drawPoints(transform.map(polygon))
+
+    def _tile_points(self, tile, needed):
+        """Первые needed точек плитки, разложенные по классам цвета (кэшируется, растёт по мере надобности)."""
+        key = (self.mode, tile)
+        cached = self._tile_cache.get(key)
+        if cached is None or cached[0] < needed:
+            lo, hi = self.index.tile_range(tile)
+            count = min(hi - lo, max(needed, 2 * cached[0] if cached else needed))
+            xs, ys, classes = self.index.xs, self.index.ys, self.index.classes(self.mode)
+            groups = {}
+            for i in range(lo, lo + count):
+                groups.setdefault(classes[i], []).append(QPointF(xs[i], ys[i]))
+            cached = (count, [(cls, QPolygonF(points)) for cls, points in groups.items()])
+            self._tile_cache[key] = cached
+        count, groups = cached
+        if count == needed:
+            return groups
+        # нужна только часть: берём пропорциональную долю каждого класса
+        share = needed / count
+        return [(cls, polygon.mid(0, math.ceil(polygon.size() * share))) for cls, polygon in groups]
+
+    def _draw_marks(self, painter):
+        """Текущая система и подпись точки под курсором."""
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        state = self.manager.snapshot()
+        current = self.index.find(state.system.name) if state.systems else None
+        if current is not None:
+            x, y = self._to_screen(self.index.xs[current], self.index.ys[current])
+            painter.setPen(QPen(QColor(120, 255, 140), 2))
+            painter.drawEllipse(QPointF(x, y), 8, 8)
+        if self._hover is not None:
+            i = self._hover
+            x, y = self._to_screen(self.index.xs[i], self.index.ys[i])
+            painter.setPen(QPen(QColor(255, 255, 255), 1))
+            painter.drawEllipse(QPointF(x, y), 5, 5)
+            star_type = self.index.star_types[self.index.classes(COLOR_BY_TYPE)[i]]
+            painter.drawText(int(x) + 10, int(y) - 8,
+                             f"{self.index.names[i]} — {star_type}, {self.index.temperatures[i]:.0f} K")
+
+    # мышь
+
+    def _point_at(self, pos):
+        if self.index is None or self._scale is None:
+            return None
+        x, y = self._to_world(pos.x(), pos.y())
+        return self.index.nearest(x, y, CLICK_RADIUS_PX / self._scale)
+
+    def wheelEvent(self, event):
+        if self._scale is None:
+            return
+        factor = 1.25 ** (event.angleDelta().y() / 120)
+        pos = event.position()
+        # точка под курсором остаётся на месте
+        wx, wy = self._to_world(pos.x(), pos.y())
+        self._scale = max(50.0, min(self._scale * factor, 2_000_000.0))
+        nx, ny = self._to_world(pos.x(), pos.y())
+        self._center = QPointF(self._center.x() + wx - nx, self._center.y() + wy - ny)
+        self.update()
+
+    def mousePressEvent(self, event):
+        self._drag_from = event.position()
+        self._dragged = False
+
+    def mouseMoveEvent(self, event):
+        pos = event.position()
+        if self._drag_from is not None and self._scale is not None:
+            delta = pos - self._drag_from
+            if self._dragged or abs(delta.x()) + abs(delta.y()) > 3:
+                self._dragged = True
+                self._center = QPointF(self._center.x() - delta.x() / self._scale,
+                                       self._center.y() - delta.y() / self._scale)
+                self._drag_from = pos
+                self.update()
+                return
+        hover = self._point_at(pos)
+        if hover != self._hover:
+            self._hover = hover
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        clicked = not self._dragged
+        self._drag_from = None
+        if clicked:
+            i = self._point_at(event.position())
+            if i is not None:
+                self.open_system_callback(self.index.names[i])
+
+    def resizeEvent(self, event):
+        if self._scale is not None and event.oldSize().width() > 0:
+            self._scale *= min(self.width(), self.height()) / max(1, min(event.oldSize().width(),
+                                                                         event.oldSize().height()))
+        super().resizeEvent(event)
@@ -1,14 +1,33 @@
+import logging
+import threading
+
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout,
     QMenuBar, QMenu, QFileDialog, QPushButton,
     QDialog, QVBoxLayout, QLabel, QTableWidget,
-    QTableWidgetItem, QHeaderView, QMessageBox, QTabWidget
+    QTableWidgetItem, QHeaderView, QMessageBox, QTabWidget,
+    QProgressDialog, QApplication, QInputDialog
 )
 from PyQt6.QtGui import QAction
+from PyQt6.QtCore import Qt, QTimer
+from core import maintenance, merge, metrics
+from core.pool import SystemPool
 from core.generator import SystemManager
 from core.database import get_connection
+from core.query import get_system
 from ui.star_system_view import SystemView
 from ui.planet_info_widget import PlanetInfoWidget
+from ui.galaxy_view import GalaxyView
+from ui.render import planet_icon
+
+log = logging.getLogger(__name__)
+
+# политики слияния каталогов: подпись в диалоге -> core.merge
+MERGE_POLICIES = {
+    "Оставлять свои системы": merge.SKIP,
+    "Заменять системами из файла": merge.OVERWRITE,
+    "Добавлять под новым именем": merge.RENAME,
+}
 
 # темы
 LIGHT_THEME = """
@@ -24,12 +43,17 @@ QMenuBar, QMenu { background-color: #0a1526; color: #e8eef8; }
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, db_file=None):
         super().__init__()
         self.setWindowTitle("Star System Generator")
         self.resize(1250, 1250)
 
-        self.manager = SystemManager()
+        self.manager = SystemManager(db_file=db_file)
+        # плановое обслуживание БД (статистика, возврат места) в фоне
+        self.maintenance = maintenance.Scheduler(self.manager.db_file).start()
+        # запас готовых систем для «Сгенерировать систему» (картинки планет прогреваются там же)
+        self.pool = SystemPool(self.manager, prepare=self._warm_icons).start()
+        self._import = None  # (поток, таймер, прогресс, состояние) идущего массового импорта
 
         # центральная компоновка
         central = QWidget()
@@ -53,10 +77,14 @@ class MainWindow(QMainWindow):
         )
         # вид инфо
         self.info_view = PlanetInfoWidget(self.manager, back_callback=self.back_to_system)
+        # карта галактики
+        self.galaxy_view = GalaxyView(self.manager, open_system_callback=self.open_system_by_name)
 
         self.v.addWidget(self.system_view)
         self.v.addWidget(self.info_view)
+        self.v.addWidget(self.galaxy_view)
         self.info_view.hide()
+        self.galaxy_view.hide()
 
         # меню
         self._build_menu()
@@ -81,27 +109,64 @@ class MainWindow(QMainWindow):
 
         act_save = QAction("Сохранить в CSV", self)
         act_load = QAction("Импорт из CSV", self)
+        act_import_dir = QAction("Импорт папки CSV", self)
+        act_merge_db = QAction("Объединить с другой БД", self)
         act_load_db = QAction("Загрузить все системы из БД", self)
         act_clear_db = QAction("Очистить базу данных", self)
         act_clear_list = QAction("Очистить список систем", self)
         act_show_db = QAction("Показать данные в БД", self)
+        act_export_metrics = QAction("Экспорт метрик в JSON", self)
         act_exit = QAction("Выход", self)
 
         file_menu.addActions([
-            act_save, act_load, act_load_db,
-            act_clear_db, act_clear_list, act_show_db
+            act_save, act_load, act_import_dir, act_merge_db, act_load_db,
+            act_clear_db, act_clear_list, act_show_db, act_export_metrics
         ])
         file_menu.addSeparator()
         file_menu.addAction(act_exit)
 
         act_save.triggered.connect(self.on_save_csv)
         act_load.triggered.connect(self.on_load_csv)
+        act_import_dir.triggered.connect(self.on_import_csv_dir)
+        act_merge_db.triggered.connect(self.on_merge_db)
         act_load_db.triggered.connect(self.on_load_all_from_db)
         act_clear_db.triggered.connect(self.on_clear_db)
         act_clear_list.triggered.connect(self.on_clear_list)
         act_show_db.triggered.connect(self.show_database_contents)
+        act_export_metrics.triggered.connect(self.on_export_metrics)
         act_exit.triggered.connect(self.close)
 
+        # Меню "Вид"
+        view_menu = QMenu("Вид", self)
+        mb.addMenu(view_menu)
+
+        act_fps = QAction("Показывать FPS", self, checkable=True)
+        act_metrics = QAction("Собирать метрики", self, checkable=True)
+        act_metrics.setChecked(metrics.is_enabled())
+        act_galaxy = QAction("Карта галактики", self)
+        view_menu.addActions([act_fps, act_metrics])
+        view_menu.addSeparator()
+        view_menu.addAction(act_galaxy)
+
+        act_fps.toggled.connect(self.system_view.set_fps_overlay)
+        act_metrics.toggled.connect(metrics.enable)
+        act_galaxy.triggered.connect(self.show_galaxy)
+
+        # Меню "Обслуживание"
+        db_menu = QMenu("Обслуживание", self)
+        mb.addMenu(db_menu)
+
+        act_db_report = QAction("Размер базы", self)
+        act_db_check = QAction("Проверить целостность", self)
+        act_db_analyze = QAction("Обновить статистику (ANALYZE)", self)
+        act_db_vacuum = QAction("Сжать базу (VACUUM)", self)
+        db_menu.addActions([act_db_report, act_db_check, act_db_analyze, act_db_vacuum])
+
+        act_db_report.triggered.connect(self.on_db_report)
+        act_db_check.triggered.connect(self.on_db_check)
+        act_db_analyze.triggered.connect(self.on_db_analyze)
+        act_db_vacuum.triggered.connect(self.on_db_vacuum)
+
         # Меню "Система"
         self.system_menu = QMenu("Система", self)
         mb.addMenu(self.system_menu)
@@ -112,25 +177,46 @@ class MainWindow(QMainWindow):
         self.system_menu.clear()
 
         # сортируем — чтобы Солнечная всегда была первой
+        systems = self.manager.systems  # один снимок на всю пересборку
         systems_sorted = sorted(
-            self.manager.systems,
+            systems,
             key=lambda s: 0 if s.name.strip().lower() in ("солнечная система", "солнечная") else 1
         )
 
         # пересобираем меню
-        for idx, system in enumerate(systems_sorted):
-            title = "Солнечная" if system.name.strip().lower() in ("солнечная система", "солнечная") else system.name
-            act = QAction(title, self)
-            act.triggered.connect(lambda _, i=self.manager.systems.index(system): self.switch_system(i))
-            self.system_menu.addAction(act)
+        positions = {s.name: i for i, s in enumerate(systems)}
+        for system in systems_sorted:
+            self._add_system_action(system, positions[system.name])
+
+    def _add_system_action(self, system, index):
+        title = "Солнечная" if system.name.strip().lower() in ("солнечная система", "солнечная") else system.name
+        act = QAction(title, self)
+        act.triggered.connect(lambda _, i=index: self.switch_system(i))
+        self.system_menu.addAction(act)
+
+    @staticmethod
+    def _warm_icons(system):
+        """Декодирует картинки планет заранее (вызывается в потоке запаса)."""
+        for p in system.planets:
+            if p.image_path:
+                planet_icon(p.image_path)
 
     # Основные функции
 
     def on_generate(self):
-        """Создание новой случайной системы."""
-        new_system = self.manager.generate_random_system()
-        self.rebuild_system_menu()
+        """Новая случайная система — готовая из запаса (сохраняется в БД при выдаче)."""
+        new_system = self.pool.take()
+        count = len(self.manager.systems)
+        self.manager.add_system(new_system, make_current=True)
+        if len(self.manager.systems) == count + 1:
+            # система добавлена в конец списка — хватает одного пункта меню
+            self._add_system_action(new_system, count)
+        else:
+            self.rebuild_system_menu()
         self.system_view.refresh_system()
+        self.galaxy_view.hide()
+        self.info_view.hide()
+        self.system_view.show()
         QMessageBox.information(self, "Успех", f"Система '{new_system.name}' создана и сохранена в БД.")
 
     def on_save_csv(self):
@@ -147,14 +233,147 @@ class MainWindow(QMainWindow):
         """Импорт системы из CSV."""
         path, _ = QFileDialog.getOpenFileName(self, "Выбрать CSV", "", "CSV Files (*.csv)")
         if path:
+            self.import_csv(path)
+
+    def import_csv(self, path):
+        """Импорт системы из выбранного CSV-файла."""
+        try:
+            sys_obj = self.manager.load_system_from_csv(path)
+            self.manager.save_system_to_db(sys_obj)
+            self.rebuild_system_menu()
+            QMessageBox.information(self, "Успех", f"Система '{sys_obj.name}' импортирована и добавлена в БД.")
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+
+    def on_import_csv_dir(self):
+        """
+        Массовый импорт всех CSV из папки с прогрессом и отчётом об ошибках.
+        Импорт идёт в фоновом потоке; модальный прогресс не даёт начать
+        другой импорт или закрыть окно, пока он не закончится.
+        """
+        if self._import is not None:
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Выбрать папку с CSV")
+        if not directory:
+            return
+        progress = QProgressDialog("Импорт CSV...", None, 0, 0, self)
+        progress.setWindowTitle("Импорт")
+        progress.setWindowModality(Qt.WindowModality.ApplicationModal)
+        progress.setMinimumDuration(0)
+        state = {"done": 0, "total": 0, "report": f"{directory}/import_errors.csv"}
+
+        def on_progress(done, total):
+            # вызывается в потоке импорта; окно читает значения по таймеру
+            state["done"], state["total"] = done, total
+
+        def run():
             try:
-                sys_obj = self.manager.load_system_from_csv(path)
-                self.manager.save_system_to_db(sys_obj)
-                self.rebuild_system_menu()
-                QMessageBox.information(self, "Успех", f"Система '{sys_obj.name}' импортирована и добавлена в БД.")
+                state["result"] = self.manager.import_csv_files(directory, on_progress, state["report"])
+            except Exception as e:
+                state["error"] = e
+
+        thread = threading.Thread(target=run, name="csv-import", daemon=True)
+        timer = QTimer(self)
+        timer.timeout.connect(self._check_import)
+        self._import = (thread, timer, progress, state)
+        thread.start()
+        timer.start(100)
+        progress.show()
+
+    def _check_import(self):
+        thread, timer, progress, state = self._import
+        progress.setMaximum(state["total"])
+        progress.setValue(state["done"])
+        if thread.is_alive():
+            return
+        timer.stop()
+        progress.close()
+        self._import = None
+        if "error" in state:
+            QMessageBox.warning(self, "Ошибка", str(state["error"]))
+            return
+        result = state["result"]
+        self.rebuild_system_menu()
+        self.system_view.refresh_system()
+        text = f"Импортировано систем: {result.imported}."
+        if result.errors:
+            text += f"\nПропущено файлов: {len(result.errors)} (см. {state['report']})."
+        QMessageBox.information(self, "Импорт", text)
+
+    def on_merge_db(self):
+        """Добавление в каталог всех систем из другого файла БД."""
+        path, _ = QFileDialog.getOpenFileName(self, "Выбрать БД", "", "SQLite (*.sqlite *.db)")
+        if not path:
+            return
+        label, ok = QInputDialog.getItem(self, "Совпадение имён", "Если система с таким именем уже есть:",
+                                         list(MERGE_POLICIES), 0, False)
+        if not ok:
+            return
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            result = self.manager.merge_catalog(path, MERGE_POLICIES[label])
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось объединить каталоги: {e}")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        QMessageBox.information(
+            self, "Готово",
+            f"Добавлено систем: {result.added + result.overwritten + result.renamed} "
+            f"(заменено {result.overwritten}, переименовано {result.renamed}, пропущено {result.skipped}).\n"
+            f"Планет: {result.planets}, {result.elapsed:.1f} с."
+        )
+
+    def on_export_metrics(self):
+        """Сохранение накопленных метрик в JSON."""
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт метрик", "metrics.json", "JSON Files (*.json)")
+        if path:
+            try:
+                metrics.export_json(path)
+                QMessageBox.information(self, "Успех", "Метрики сохранены.")
             except Exception as e:
                 QMessageBox.warning(self, "Ошибка", str(e))
 
+    def _run_maintenance(self, fn):
+        """Выполняет операцию обслуживания БД с курсором ожидания; (успех, результат)."""
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            return True, fn(self.manager.db_file)
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", f"Операция с базой не выполнена: {e}")
+            return False, None
+        finally:
+            QApplication.restoreOverrideCursor()
+
+    def on_db_report(self):
+        """Размер файла, свободное место и число строк по таблицам."""
+        ok, report = self._run_maintenance(lambda db_file: maintenance.size_report(db_file, detailed=True))
+        if ok:
+            QMessageBox.information(self, "Размер базы", report.format())
+
+    def on_db_check(self):
+        """Проверка целостности базы."""
+        ok, problems = self._run_maintenance(maintenance.integrity_check)
+        if not ok:
+            return
+        if problems:
+            QMessageBox.warning(self, "Проверка целостности",
+                                f"Найдено проблем: {len(problems)}\n\n" + "\n".join(problems[:20]))
+        else:
+            QMessageBox.information(self, "Проверка целостности", "База в порядке.")
+
+    def on_db_analyze(self):
+        """Полный ANALYZE."""
+        ok, _ = self._run_maintenance(maintenance.analyze)
+        if ok:
+            QMessageBox.information(self, "Готово", "Статистика для запросов обновлена.")
+
+    def on_db_vacuum(self):
+        """Полный VACUUM с переводом базы в режим incremental."""
+        ok, freed = self._run_maintenance(maintenance.vacuum)
+        if ok:
+            QMessageBox.information(self, "Готово", f"Освобождено: {freed / 1024 / 1024:.1f} МБ.")
+
     def on_load_all_from_db(self):
         """Загрузка всех систем из базы данных."""
         try:
@@ -162,8 +381,7 @@ class MainWindow(QMainWindow):
             if not systems:
                 QMessageBox.information(self, "Информация", "База данных пуста.")
             else:
-                self.manager.systems = systems
-                self.manager.current_index = 0
+                self.manager.replace_systems(systems)
                 self.rebuild_system_menu()
                 self.system_view.refresh_system()
                 QMessageBox.information(self, "Успех", f"Загружено {len(systems)} систем из базы данных.")
@@ -176,12 +394,8 @@ class MainWindow(QMainWindow):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                conn = get_connection()
-                cur = conn.cursor()
-                cur.execute("DELETE FROM planets")
-                cur.execute("DELETE FROM systems")
-                conn.commit()
-                conn.close()
+                with self.pool.paused():
+                    maintenance.clear(self.manager.db_file)
                 QMessageBox.information(self, "Готово", "База данных очищена.")
             except Exception as e:
                 QMessageBox.warning(self, "Ошибка", f"Не удалось очистить базу: {e}")
@@ -226,7 +440,7 @@ class MainWindow(QMainWindow):
         try:
             self.manager.save_system_to_db(solar)
         except Exception as e:
-            print(f"[WARN] Не удалось сохранить Солнечную в БД: {e}")
+            log.warning(f"Не удалось сохранить Солнечную в БД: {e}")
         self.manager.add_system(solar, make_current=True)
         self.rebuild_system_menu()
         self.system_view.refresh_system()
@@ -234,7 +448,7 @@ class MainWindow(QMainWindow):
     def show_database_contents(self):
         """Показать реальные данные из таблиц 'systems' и 'planets'."""
         try:
-            conn = get_connection()
+            conn = get_connection(self.manager.db_file)
             cur = conn.cursor()
 
             # Считываем обе таблицы
@@ -299,6 +513,7 @@ class MainWindow(QMainWindow):
         self.manager.switch_to(index)
         self.system_view.refresh_system()
         self.info_view.hide()
+        self.galaxy_view.hide()
         self.system_view.show()
 
     def show_planet_info(self, idx: int):
@@ -316,4 +531,35 @@ class MainWindow(QMainWindow):
     def back_to_system(self):
         """Возврат к отображению системы."""
         self.info_view.hide()
+        self.system_view.refresh_if_changed()
         self.system_view.show()
+
+    def show_galaxy(self):
+        """Карта всех систем каталога; индекс перестраивается, только если каталог изменился."""
+        self.system_view.hide()
+        self.info_view.hide()
+        self.galaxy_view.show()
+        self.galaxy_view.reload()
+
+    def open_system_by_name(self, name: str):
+        """Открывает систему, выбранную на карте: из списка или, если её там нет, из БД."""
+        for i, s in enumerate(self.manager.systems):
+            if s.name == name:
+                self.switch_system(i)
+                return
+        system = get_system(name, db_file=self.manager.db_file)
+        if system is None:
+            QMessageBox.warning(self, "Ошибка", f"Система '{name}' не найдена в БД.")
+            return
+        self.manager.add_system(system, make_current=True)
+        self.rebuild_system_menu()
+        self.switch_system(self.manager.current_index)
+
+    def closeEvent(self, event):
+        if self._import is not None:
+            # импорт пишет в базу из своего потока — окно закроется после него
+            event.ignore()
+            return
+        self.maintenance.stop()
+        self.pool.stop()
+        super().closeEvent(event)
@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QFileDialog
 from PyQt6.QtGui import QPixmap, QImage, QPainter, QPainterPath, QColor
 from PyQt6.QtCore import Qt
+from core import metrics
 
 
 class PlanetInfoWidget(QWidget):
@@ -103,7 +104,8 @@ class PlanetInfoWidget(QWidget):
 
         # если не звезда
         if pl.image_path:
-            img = QImage(pl.image_path)
+            with metrics.timer("image.decode"):
+                img = QImage(pl.image_path)
             if not img.isNull():
                 size_px = self.img.width()
                 pix = QPixmap.fromImage(img).scaled(
@@ -148,6 +150,5 @@ class PlanetInfoWidget(QWidget):
             return
         path, _ = QFileDialog.getOpenFileName(self, "Выберите изображение планеты", "", "Images (*.png *.jpg *.jpeg)")
         if path:
-            pl = self.manager.system.planets[self.current_index]
-            pl.image_path = path
+            self.manager.update_planet(self.manager.system, self.current_index, image_path=path)
             self.refresh()
@@ -0,0 +1,202 @@
+"""
+Отрисовка звёздной системы без виджета.
+
+draw_system рисует систему в любой QPainter (виджет, QImage) и используется
+как SystemView.paintEvent, так и пакетным рендером миниатюр (ui.batch_render).
+"""
+import math
+import random
+import zlib
+from PyQt6.QtGui import QPainter, QPen, QColor, QPixmap, QImage, QPainterPath, QRadialGradient
+from PyQt6.QtCore import Qt, QRect
+from core import metrics
+
+PLANET_SIZE = 56
+BASE_ORBIT = 90
+ORBIT_GAP = 55
+STAR_RADIUS = 30
+BASE_SPEED = 0.25  # град/кадр для планеты с периодом 365 дней
+FRAME_MS = 15  # интервал кадра анимации SystemView
+
+# размер сцены, в которую помещается система из 8 планет
+LAYOUT_SIZE = 2 * (BASE_ORBIT + 7 * ORBIT_GAP + PLANET_SIZE) + 40
+
+
+def generate_stars(count, width, height, rng=random):
+    """Фоновые звёзды: (x, y, размер)."""
+    return [(rng.randint(0, width), rng.randint(0, height), rng.choice([1, 2, 3])) for _ in range(count)]
+
+
+def initial_angles(system):
+    """Начальные углы планет (град)."""
+    n = len(system.planets)
+    return [(45 + i * 360.0 / max(1, n)) % 360.0 for i in range(n)]
+
+
+def orbit_speeds(system, base_speed=BASE_SPEED):
+    """Угловые скорости планет, град/кадр."""
+    speeds = []
+    for p in system.planets:
+        period = max(1.0, float(p.orbital_period_days))
+        speeds.append(max(0.05, min(base_speed * 365.0 / period, 2.0)))
+    return speeds
+
+
+def angles_at(system, t, base_speed=BASE_SPEED):
+    """Углы планет через t секунд анимации."""
+    frames = t * 1000.0 / FRAME_MS
+    return [(a + s * frames) % 360.0
+            for a, s in zip(initial_angles(system), orbit_speeds(system, base_speed))]
+
+
+def rounded_image(path, size):
+    """Картинка планеты, обрезанная по кругу (QImage; работает и без экрана). None — если не читается."""
+    with metrics.timer("image.decode"):
+        img = QImage(path)
+    if img.isNull():
+        return None
+    scaled = img.scaled(
+        size, size,
+        Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+        Qt.TransformationMode.SmoothTransformation
+    )
+    rounded = QImage(size, size, QImage.Format.Format_ARGB32_Premultiplied)
+    rounded.fill(Qt.GlobalColor.transparent)
+    rp = QPainter(rounded)
+    rp.setRenderHint(QPainter.RenderHint.Antialiasing)
+    path_ = QPainterPath()
+    path_.addEllipse(0, 0, size, size)
+    rp.setClipPath(path_)
+    rp.drawImage(0, 0, scaled)
+    rp.end()
+    return rounded
+
+
+_icons = {}  # (путь, размер) -> QImage или None
+
+
+def planet_icon(path, size=PLANET_SIZE):
+    """
+    rounded_image с кэшем: картинок планет немного, каждая декодируется один раз.
+    QImage можно готовить и в фоновом потоке (прогрев в core.pool).
+    """
+    key = (path, size)
+    if key not in _icons:
+        _icons.setdefault(key, rounded_image(path, size))
+    return _icons[key]
+
+
+def draw_system(painter, rect, system, angles, stars, icons=()):
+    """
+    Рисует систему в rect: фон, звёзды, центральную звезду, орбиты, планеты, спутники.
+    icons — круглые картинки планет (QPixmap, QImage или None) по индексу.
+    Возвращает области клика: (QRect, 'star' | 'planet', индекс).
+    """
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+    # фон
+    painter.fillRect(rect, QColor(6, 10, 20))
+
+    # звезды на фоне
+    for x, y, size in stars:
+        c = QColor(255, 255, 255, 200 if size == 1 else 150 if size == 2 else 100)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(c)
+        painter.drawEllipse(x, y, size, size)
+
+    # центральная звезда
+    center = rect.center()
+    star_r = STAR_RADIUS
+
+    glow = QRadialGradient(center.x(), center.y(), star_r * 4)
+    glow.setColorAt(0.0, QColor(255, 220, 120, 220))
+    glow.setColorAt(0.5, QColor(255, 180, 80, 120))
+    glow.setColorAt(1.0, QColor(255, 180, 80, 0))
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.setBrush(glow)
+    painter.drawEllipse(center.x() - star_r * 4, center.y() - star_r * 4, star_r * 8, star_r * 8)
+
+    painter.setBrush(QColor(255, 200, 80))
+    painter.drawEllipse(center.x() - star_r, center.y() - star_r, star_r * 2, star_r * 2)
+
+    # орбиты и планеты
+    planet_size = PLANET_SIZE
+
+    click_regions = []
+    # область клика звезды
+    star_rect = QRect(center.x() - star_r, center.y() - star_r, star_r * 2, star_r * 2)
+    click_regions.append((star_rect, 'star', None))
+
+    for idx, pl in enumerate(system.planets):
+        # орбита
+        r = BASE_ORBIT + idx * ORBIT_GAP
+        pen = QPen(QColor(130, 140, 150, 170))
+        pen.setWidth(1)
+        painter.setPen(pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawEllipse(center, r, r)
+
+        # позиция планеты по углу
+        angle_deg = angles[idx] if idx < len(angles) else (45 + idx * 40)
+        rad = math.radians(angle_deg)
+        x = center.x() + r * math.cos(rad)
+        y = center.y() + r * math.sin(rad)
+
+        # изображения
+        icon = icons[idx] if idx < len(icons) else None
+        if isinstance(icon, QPixmap):
+            painter.drawPixmap(int(x - planet_size / 2), int(y - planet_size / 2), icon)
+        elif isinstance(icon, QImage):
+            painter.drawImage(int(x - planet_size / 2), int(y - planet_size / 2), icon)
+        else:
+            # простая серая планета
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(200, 200, 200))
+            painter.drawEllipse(int(x - 12), int(y - 12), 24, 24)
+
+        # подпись
+        painter.setPen(QColor(220, 220, 220))
+        painter.drawText(int(x + 18), int(y + 6), pl.name)
+
+        # спутники
+        sat_count = max(0, int(pl.satellites))
+        for s in range(sat_count):
+            sat_angle = math.radians((angle_deg * 2 + 360 / max(1, sat_count) * s) % 360)
+            sat_r = 18
+            sx = x + sat_r * math.cos(sat_angle)
+            sy = y + sat_r * math.sin(sat_angle)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(180, 180, 200))
+            painter.drawEllipse(int(sx - 3), int(sy - 3), 6, 6)
+
+        # кликабельная область планеты
+        rect_ = QRect(int(x - planet_size / 2), int(y - planet_size / 2), planet_size, planet_size)
+        click_regions.append((rect_, 'planet', idx))
+
+    return click_regions
+
+
+def render_system_image(system, t=0.0, size=256, icon_cache=None):
+    """
+    Система в момент t (секунды анимации) как квадратный QImage size x size.
+    Сцена рисуется в масштабе LAYOUT_SIZE и уменьшается; фон детерминирован по имени системы.
+    icon_cache — словарь путь -> картинка, общий для серии вызовов.
+    """
+    if icon_cache is None:
+        icon_cache = {}
+    icons = []
+    for p in system.planets:
+        if p.image_path and p.image_path not in icon_cache:
+            icon_cache[p.image_path] = rounded_image(p.image_path, PLANET_SIZE)
+        icons.append(icon_cache.get(p.image_path) if p.image_path else None)
+
+    rng = random.Random(zlib.crc32(system.name.encode("utf-8")))
+    stars = generate_stars(260, LAYOUT_SIZE, LAYOUT_SIZE, rng)
+
+    image = QImage(size, size, QImage.Format.Format_ARGB32_Premultiplied)
+    painter = QPainter(image)
+    painter.scale(size / LAYOUT_SIZE, size / LAYOUT_SIZE)
+    with metrics.timer("render.offscreen"):
+        draw_system(painter, QRect(0, 0, LAYOUT_SIZE, LAYOUT_SIZE), system, angles_at(system, t), stars, icons)
+    painter.end()
+    return image
@@ -1,15 +1,16 @@
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtGui import (
-    QPainter, QPen, QColor, QPixmap, QImage, QPainterPath, QRadialGradient
+from PyQt6.QtGui import QPainter, QColor, QPixmap
+from PyQt6.QtCore import QTimer
+import time
+from core import metrics
+from ui.render import (
+    BASE_SPEED, FRAME_MS, draw_system, generate_stars, initial_angles, orbit_speeds, planet_icon
 )
-from PyQt6.QtCore import Qt, QRect, QTimer
-import math
-import random
 
 
 class SystemView(QWidget):
     """
-    Рендерит текущую систему из manager.system:
+    Рендерит текущую систему из manager.system (снимок, взятый в refresh_system):
       фон со звездами
       центральная звезда
       орбиты
@@ -31,13 +32,21 @@ class SystemView(QWidget):
         # динамика: углы и скорости для планет (в град/кадр)
         self._angles = []
         self._speeds = []
-        self.base_speed = 0.25  # базовая скорость (чем больше — тем быстрее вся система, )
+        self.base_speed = BASE_SPEED  # базовая скорость (чем больше — тем быстрее вся система, )
         self._click_regions = []
+        self._pixmap_cache = []
+        self._system = None  # система, под которую посчитаны углы и картинки
+
+        # оверлей FPS / время кадра (скользящее среднее)
+        self.show_fps = False
+        self._frame_ms = 0.0
+        self._fps = 0.0
+        self._last_paint = None
 
         # таймер для анимации
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.tick)
-        self.timer.start(15)  # ~60 FPS
+        self.timer.start(FRAME_MS)  # ~60 FPS
 
         # инициализируем углы под текущую систему
         self.refresh_system()
@@ -47,55 +56,28 @@ class SystemView(QWidget):
            Нужно для того, чтобы визуализация была более плавной и не лагала, если будут загружены картинки с высоким разрешением.
         """
         self._pixmap_cache = []
-        sys = self.manager.system
-        planet_size = 56
-        for pl in sys.planets:
-            if pl.image_path:
-                img = QImage(pl.image_path)
-                if not img.isNull():
-                    pix = QPixmap.fromImage(img).scaled(
-                        planet_size, planet_size,
-                        Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                        Qt.TransformationMode.SmoothTransformation
-                    )
-                    rounded = QPixmap(planet_size, planet_size)
-                    rounded.fill(Qt.GlobalColor.transparent)
-                    rp = QPainter(rounded)
-                    rp.setRenderHint(QPainter.RenderHint.Antialiasing)
-                    path = QPainterPath()
-                    path.addEllipse(0, 0, planet_size, planet_size)
-                    rp.setClipPath(path)
-                    rp.drawPixmap(0, 0, pix)
-                    rp.end()
-                    self._pixmap_cache.append(rounded)
-                    continue
+        for pl in self._system.planets:
+            img = planet_icon(pl.image_path) if pl.image_path else None
             # если нет картинки
-            self._pixmap_cache.append(None)
+            self._pixmap_cache.append(QPixmap.fromImage(img) if img is not None else None)
 
     def refresh_system(self):
         """Обновление системы, чтобы планеты двигались."""
-        sys = self.manager.system
-        n = len(sys.planets)
-        self._angles = []
-        self._speeds = []
-        for i, p in enumerate(sys.planets):
-            self._angles.append((45 + i * 360.0 / max(1, n)) % 360.0)
-            period = max(1.0, float(p.orbital_period_days))
-            speed = self.base_speed * 365.0 / period
-            speed = max(0.05, min(speed, 2.0))
-            self._speeds.append(speed)
+        sys = self._system = self.manager.system
+        self._angles = initial_angles(sys)
+        self._speeds = orbit_speeds(sys, self.base_speed)
         self._stars = self.generate_stars(260)
         self._cache_images()
         self.update()
 
+    def refresh_if_changed(self):
+        """Обновляет вид, если текущая система в менеджере сменилась (например, правкой планеты)."""
+        if self.manager.system is not self._system:
+            self.refresh_system()
+
     def generate_stars(self, count):
         """Создание звезд."""
-        stars = []
-        w = max(900, self.width() or 900)
-        h = max(600, self.height() or 600)
-        for _ in range(count):
-            stars.append((random.randint(0, w), random.randint(0, h), random.choice([1, 2, 3])))
-        return stars
+        return generate_stars(count, max(900, self.width() or 900), max(600, self.height() or 600))
 
     def resizeEvent(self, event):
         self._stars = self.generate_stars(260)
@@ -108,92 +90,39 @@ class SystemView(QWidget):
         self._angles = [(a + s) % 360.0 for a, s in zip(self._angles, self._speeds)]
         self.update()
 
+    def set_fps_overlay(self, enabled):
+        """Включить / выключить оверлей с FPS и временем кадра."""
+        self.show_fps = enabled
+        self._last_paint = None
+        self.update()
+
+    def _track_frame(self, frame_ms):
+        """Обновляет скользящие средние для оверлея."""
+        now = time.perf_counter()
+        if self._last_paint is not None:
+            interval = now - self._last_paint
+            if interval > 0:
+                self._fps = 0.9 * self._fps + 0.1 * (1.0 / interval)
+        self._last_paint = now
+        self._frame_ms = 0.9 * self._frame_ms + 0.1 * frame_ms
+
+    def _draw_fps_overlay(self, painter):
+        painter.setPen(QColor(120, 255, 140))
+        painter.drawText(10, 20, f"FPS: {self._fps:.0f}   кадр: {self._frame_ms:.2f} мс")
+
     def paintEvent(self, event):
         """Создание системы."""
+        t0 = time.perf_counter()
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
-        # фон
-        painter.fillRect(self.rect(), QColor(6, 10, 20))
-
-        # звезды на фоне
-        for x, y, size in self._stars:
-            c = QColor(255, 255, 255, 200 if size == 1 else 150 if size == 2 else 100)
-            painter.setPen(Qt.PenStyle.NoPen)
-            painter.setBrush(c)
-            painter.drawEllipse(x, y, size, size)
-
-        # центральная звезда
-        center = self.rect().center()
-        star_r = 30
-
-        glow = QRadialGradient(center.x(), center.y(), star_r * 4)
-        glow.setColorAt(0.0, QColor(255, 220, 120, 220))
-        glow.setColorAt(0.5, QColor(255, 180, 80, 120))
-        glow.setColorAt(1.0, QColor(255, 180, 80, 0))
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.setBrush(glow)
-        painter.drawEllipse(center.x() - star_r * 4, center.y() - star_r * 4, star_r * 8, star_r * 8)
-
-        painter.setBrush(QColor(255, 200, 80))
-        painter.drawEllipse(center.x() - star_r, center.y() - star_r, star_r * 2, star_r * 2)
-
-        # орбиты и планеты
-        sys = self.manager.system
-        base_orbit = 90
-        gap = 55
-        planet_size = 56
-
-        click_regions = []
-        # область клика звезды
-        star_rect = QRect(center.x() - star_r, center.y() - star_r, star_r * 2, star_r * 2)
-        click_regions.append((star_rect, 'star', None))
-
-        for idx, pl in enumerate(sys.planets):
-            # орбита
-            r = base_orbit + idx * gap
-            pen = QPen(QColor(130, 140, 150, 170))
-            pen.setWidth(1)
-            painter.setPen(pen)
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.drawEllipse(center, r, r)
-
-            # позиция планеты по углу
-            angle_deg = self._angles[idx] if idx < len(self._angles) else (45 + idx * 40)
-            rad = math.radians(angle_deg)
-            x = center.x() + r * math.cos(rad)
-            y = center.y() + r * math.sin(rad)
-
-            # изображения
-            if hasattr(self, "_pixmap_cache") and idx < len(self._pixmap_cache) and self._pixmap_cache[idx]:
-                pix = self._pixmap_cache[idx]
-                painter.drawPixmap(int(x - planet_size / 2), int(y - planet_size / 2), pix)
-            else:
-                # простая серая планета
-                painter.setPen(Qt.PenStyle.NoPen)
-                painter.setBrush(QColor(200, 200, 200))
-                painter.drawEllipse(int(x - 12), int(y - 12), 24, 24)
-
-            # подпись
-            painter.setPen(QColor(220, 220, 220))
-            painter.drawText(int(x + 18), int(y + 6), pl.name)
-
-            # спутники
-            sat_count = max(0, int(pl.satellites))
-            for s in range(sat_count):
-                sat_angle = math.radians((angle_deg * 2 + 360 / max(1, sat_count) * s) % 360)
-                sat_r = 18
-                sx = x + sat_r * math.cos(sat_angle)
-                sy = y + sat_r * math.sin(sat_angle)
-                painter.setPen(Qt.PenStyle.NoPen)
-                painter.setBrush(QColor(180, 180, 200))
-                painter.drawEllipse(int(sx - 3), int(sy - 3), 6, 6)
-
-            # кликабельная область планеты
-            rect = QRect(int(x - planet_size / 2), int(y - planet_size / 2), planet_size, planet_size)
-            click_regions.append((rect, 'planet', idx))
-
-        self._click_regions = click_regions
+        self._click_regions = draw_system(painter, self.rect(), self._system,
+                                          self._angles, self._stars, self._pixmap_cache)
+
+        if self.show_fps:
+            self._draw_fps_overlay(painter)
+        frame_ms = (time.perf_counter() - t0) * 1000
+        metrics.observe("ui.frame", frame_ms)
+        if self.show_fps:
+            self._track_frame(frame_ms)
 
     def mousePressEvent(self, event):
         """Обработка клика на объект через положение курсора и объекта."""